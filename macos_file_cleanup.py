@@ -5,27 +5,102 @@ A comprehensive tool for finding and cleaning up large files on macOS systems.
 
 Features:
 - Find files 1GB or larger
+- Parallel os.scandir scan engine with work-stealing workers (--workers)
+- Per-device worker pools so slow mounts don't stall local disks (--one-file-system)
+- Several roots, or a file listing them, scanned in one pass with overlapping
+  roots collapsed and a per-root breakdown in the summary (--roots-file)
+- Persistent incremental scan index keyed by directory mtime (--incremental)
+- Bounded top-K result heap and NDJSON/CSV/Parquet streaming of every match,
+  with allocated size, inode and owner (--top-k, --output)
+- Compact struct-of-arrays storage for large result sets
+- Duplicate detection with staged size, partial-hash and full-hash filtering (--find-duplicates)
+- Bulk non-interactive deletion on a thread pool with queued logging
+- Precompiled, configurable safety rules evaluated in batches (--rules)
+- Periodic scan checkpoints and resuming interrupted scans (--checkpoint, --resume)
+- "du" mode: bottom-up apparent/allocated size rollups per directory (--aggregate-dirs)
+- Continuous watch mode driven by inotify or index polling (--watch)
+- Age filters and staleness ranking from atime/mtime/ctime captured by the
+  scan's single stat (--older-than, --not-accessed-since, --rank-by staleness)
 - Display top 10 largest files
 - Real-time file deletion during search
-- Runtime countdown display
+- Quarantine mode: constant-time same-volume renames into a staging directory
+  with a manifest for bulk restore, and a rate-limited purge after a
+  retention window (--quarantine, --restore-quarantine, --purge-quarantine)
+- Runtime progress display (files/s, dirs/s, bytes/s, queue depth, ETA) with
+  optional JSON progress frames on a file descriptor (--progress-json)
+- Per-phase timing (scan, stat, index, safety, unlink, logging) with p50/p99
+  stat and unlink latency in the summary JSON, and cProfile output (--timings, --profile)
+- Library API: side-effect-free construction with an injectable logger and
+  CancelToken, and iter_scan() yielding matches while the scan runs
+- asyncio API: AsyncScanner.scan() async generator and AsyncDeleter.delete_many()
+  on a bounded executor, stopped by task cancellation
+- Throttling for busy hosts: shared token buckets for stats, unlinks and hashed
+  bytes, lower CPU/I/O priority, and scan workers that back off when stat
+  latency rises (--max-stats-per-sec, --nice, --io-priority, --adaptive-workers)
+- Space by file type (video, VM images, archives, build caches, logs, ...) from
+  an extension table and optional magic-number sniffing, with type filters
+  applied before the stat (--include-type, --exclude-type, --sniff-types)
+- Fleet mode: a coordinator fans one scan out to agents on many hosts over a
+  JSON-lines stdio protocol (ssh or local subprocesses), with a cap on hosts
+  scanned at once, and merges a fleet-wide top-K and per-host breakdown
+  (--coordinate, --agent-command, --max-hosts, --agent)
 - Comprehensive error handling
-- Detailed summary logging
+- Detailed summary logging, with size-capped log segments compressed (zstd or
+  gzip) in the background, opt-in age and total-size pruning of cleanup_logs,
+  and a run index for listing recent summaries (--log-segment-mb, --list-runs)
+
+Safety rule config (--rules), JSON. Deny rules always win; allow rules lift
+the hidden-file and system-extension checks but never the built-in critical
+system paths. In globs ``*`` also matches across directories.
+  
+  {
+    "deny_globs": ["*/Photos Library.photoslibrary/*"],
+    "deny_regex": ["/backups?/"],
+    "allow_globs": ["*/node_modules/*", "*/.next/*",
+                    "*/Library/Developer/Xcode/DerivedData/*"],
+    "allow_regex": []
+  }
 """
 
 import os
 import sys
 import time
 import threading
-import argparse
 import logging
+import queue
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, AsyncIterator, Deque, Iterator, Union
 from dataclasses import dataclass
+from bisect import bisect_right
+from collections import deque
+from contextlib import contextmanager
+from array import array
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import signal
-import json
-import traceback
+import errno
+import heapq
+import itertools
+import math
+import re
+import stat
+# argparse, csv, ctypes, fcntl, gzip, hashlib, json, mmap, platform, select,
+# shlex, shutil, socket, sqlite3, struct, subprocess, tempfile, traceback and
+# zstandard are imported where they are used, so importing this module as a
+# library only pays for what the caller actually runs
+
+try:
+    import xxhash  # Optional: faster full-content hashing for --find-duplicates
+except ImportError:
+    xxhash = None
+
+try:
+    import pwd  # Owner names in --output; Unix only
+except ImportError:
+    pwd = None
+
+# Silent as a library unless the application configures logging
+logging.getLogger(__name__).addHandler(logging.NullHandler())
 
 
 @dataclass
@@ -36,6 +111,20 @@ class FileInfo:
     modified_time: float
     is_accessible: bool = True
     error_message: Optional[str] = None
+    allocated_size: Optional[int] = None  # st_blocks * 512; None when unknown
+    device: int = 0
+    inode: int = 0
+    nlink: int = 1
+    uid: Optional[int] = None
+    accessed_time: Optional[float] = None
+    changed_time: Optional[float] = None
+    
+    @property
+    def reclaimable_size(self) -> int:
+        """Bytes released by unlinking this path: nothing while other hard links remain."""
+        if self.nlink > 1:
+            return 0
+        return self.allocated_size if self.allocated_size is not None else self.size
 
 
 class FileCleanupStats:
@@ -44,11 +133,44 @@ class FileCleanupStats:
     def __init__(self):
         self.start_time = datetime.now()
         self.files_scanned = 0
+        self.bytes_scanned = 0
+        self.allocated_bytes = 0
         self.files_deleted = 0
         self.bytes_freed = 0
+        self.logical_bytes_deleted = 0
+        self.shared_links_deleted = 0
+        self.files_quarantined = 0
+        self.bytes_quarantined = 0
+        self.quarantine_dirs: List[str] = []
+        self.files_purged = 0
+        self.bytes_purged = 0
+        self.hard_links_skipped = 0
+        self.mount_points_skipped = 0
+        self.age_filtered = 0
+        self.type_filtered = 0
+        # category -> [files, apparent bytes, allocated bytes]
+        self.file_types: Dict[str, List[int]] = {}
+        self.devices: List[Dict[str, Any]] = []
+        self.roots: List[Dict[str, Any]] = []
         self.errors_encountered = 0
         self.directories_scanned = 0
+        self.directories_from_cache = 0
+        self.directories_rescanned = 0
         self.large_files_found = 0
+        self.duplicate_groups = 0
+        self.duplicate_files = 0
+        self.reclaimable_duplicate_bytes = 0
+        self.deletion_seconds = 0.0
+        self.resumed_from: Optional[str] = None
+        self.resumed_directories = 0
+        self.resumed_files = 0
+        self.resumed_bytes = 0
+        self.checkpoints_written = 0
+        self.top_directories: List[Dict[str, Any]] = []
+        self.watch_events = 0
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.profile_path: Optional[str] = None
+        self.throttling: Dict[str, Any] = {}
         self.permission_errors = 0
         self.io_errors = 0
         self.other_errors = 0
@@ -63,10 +185,56 @@ class FileCleanupStats:
             "runtime_seconds": runtime.total_seconds(),
             "completion_status": self.completion_status,
             "files_scanned": self.files_scanned,
+            "bytes_scanned": self.bytes_scanned,
+            "allocated_bytes_scanned": self.allocated_bytes,
             "files_deleted": self.files_deleted,
             "bytes_freed": self.bytes_freed,
+            "logical_bytes_deleted": self.logical_bytes_deleted,
+            "shared_links_deleted": self.shared_links_deleted,
+            "quarantine": {
+                "files": self.files_quarantined,
+                "bytes": self.bytes_quarantined,
+                "directories": self.quarantine_dirs,
+                "purged_files": self.files_purged,
+                "purged_bytes": self.bytes_purged
+            },
+            "hard_links_skipped": self.hard_links_skipped,
+            "mount_points_skipped": self.mount_points_skipped,
+            "age_filtered_files": self.age_filtered,
+            "type_filtered_files": self.type_filtered,
+            "file_types": {category: {"files": files, "bytes": apparent, "allocated_bytes": allocated}
+                           for category, (files, apparent, allocated)
+                           in sorted(self.file_types.items(), key=lambda item: item[1][2], reverse=True)},
+            "devices": self.devices,
+            "roots": self.roots,
             "large_files_found": self.large_files_found,
             "directories_scanned": self.directories_scanned,
+            "directories_from_cache": self.directories_from_cache,
+            "directories_rescanned": self.directories_rescanned,
+            "deletion": {
+                "seconds": self.deletion_seconds,
+                "files_per_second": (self.files_deleted / self.deletion_seconds
+                                     if self.deletion_seconds else 0.0),
+                "bytes_per_second": (self.bytes_freed / self.deletion_seconds
+                                     if self.deletion_seconds else 0.0)
+            },
+            "duplicates": {
+                "groups": self.duplicate_groups,
+                "redundant_files": self.duplicate_files,
+                "reclaimable_bytes": self.reclaimable_duplicate_bytes
+            },
+            "resume": {
+                "checkpoint": self.resumed_from,
+                "skipped_directories": self.resumed_directories,
+                "skipped_files": self.resumed_files,
+                "skipped_bytes": self.resumed_bytes,
+                "checkpoints_written": self.checkpoints_written
+            },
+            "top_directories": self.top_directories,
+            "watch_events": self.watch_events,
+            "phases": self.phases,
+            "profile": self.profile_path,
+            "throttling": self.throttling,
             "errors": {
                 "total": self.errors_encountered,
                 "permission_errors": self.permission_errors,
@@ -75,6 +243,122 @@ class FileCleanupStats:
             },
             "interrupted": self.interrupted
         }
+    
+    def merge(self, counters: 'ScanCounters'):
+        """Fold per-directory scan counters into the run totals."""
+        self.files_scanned += counters.files_scanned
+        self.bytes_scanned += counters.bytes_scanned
+        self.allocated_bytes += counters.allocated_bytes
+        self.directories_scanned += counters.directories_scanned
+        self.directories_from_cache += counters.directories_from_cache
+        self.directories_rescanned += counters.directories_rescanned
+        self.large_files_found += counters.large_files_found
+        self.hard_links_skipped += counters.hard_links_skipped
+        self.mount_points_skipped += counters.mount_points_skipped
+        self.age_filtered += counters.age_filtered
+        self.type_filtered += counters.type_filtered
+        if counters.file_types:
+            for category, (files, apparent, allocated) in counters.file_types.items():
+                totals = self.file_types.get(category)
+                if totals is None:
+                    self.file_types[category] = [files, apparent, allocated]
+                else:
+                    totals[0] += files
+                    totals[1] += apparent
+                    totals[2] += allocated
+        self.permission_errors += counters.permission_errors
+        self.io_errors += counters.io_errors
+        self.other_errors += counters.other_errors
+        self.errors_encountered += (counters.permission_errors + counters.io_errors +
+                                    counters.other_errors)
+
+
+class ScanCounters:
+    """Counters collected while scanning one directory, before they are committed."""
+    
+    # The integer totals, mirrored by FileCleanupStats attributes of the same name
+    TOTALS = ('files_scanned', 'bytes_scanned', 'allocated_bytes', 'directories_scanned',
+              'directories_from_cache', 'directories_rescanned', 'large_files_found',
+              'hard_links_skipped', 'mount_points_skipped', 'age_filtered', 'type_filtered',
+              'permission_errors', 'io_errors', 'other_errors')
+    __slots__ = TOTALS + ('hard_links', 'file_types')
+    
+    def __init__(self):
+        # (inode key, size, allocated bytes, FileInfo if it matched, category)
+        # for every file with st_nlink > 1; resolved against HardLinkSet at commit time
+        self.hard_links: Optional[List[Tuple[int, int, int, Optional[FileInfo], Optional[str]]]] = None
+        # category -> [files, apparent bytes, allocated bytes] for the directory
+        self.file_types: Optional[Dict[str, List[int]]] = None
+        self.files_scanned = 0
+        self.bytes_scanned = 0
+        self.allocated_bytes = 0
+        self.directories_scanned = 0
+        self.directories_from_cache = 0
+        self.directories_rescanned = 0
+        self.large_files_found = 0
+        self.hard_links_skipped = 0
+        self.mount_points_skipped = 0
+        self.age_filtered = 0
+        self.type_filtered = 0
+        self.permission_errors = 0
+        self.io_errors = 0
+        self.other_errors = 0
+    
+    def add_hard_link(self, device: int, inode: int, size: int, allocated: int,
+                      file_info: Optional[FileInfo] = None, category: Optional[str] = None):
+        if self.hard_links is None:
+            self.hard_links = []
+        self.hard_links.append(((device << 64) | inode, size, allocated, file_info, category))
+
+
+class HardLinkSet:
+    """
+    Inodes with more than one link that have already been counted.
+    
+    Only multiply-linked files are recorded, each as a single packed
+    ``(st_dev << 64) | st_ino`` int, so ordinary files cost nothing. Claims
+    happen when a directory is committed, under the engine's commit lock,
+    so a directory dropped by an interrupted scan never marks an inode as
+    seen.
+    """
+    
+    def __init__(self, keys: Optional[List[int]] = None):
+        self._seen = set(keys or ())
+    
+    def __len__(self) -> int:
+        return len(self._seen)
+    
+    def claim(self, counters: ScanCounters, matches: List[FileInfo]) -> List[FileInfo]:
+        """
+        Drop every link in ``counters`` whose inode was already counted.
+        
+        Their bytes come off the directory and file type totals and their
+        matches are removed, so each inode is counted, listed and offered for
+        deletion once.
+        
+        Returns:
+            The remaining matches
+        """
+        dropped = set()
+        for key, size, allocated, file_info, category in counters.hard_links:
+            if key not in self._seen:
+                self._seen.add(key)
+                continue
+            counters.hard_links_skipped += 1
+            counters.bytes_scanned -= size
+            counters.allocated_bytes -= allocated
+            if counters.file_types and category in counters.file_types:
+                counters.file_types[category][1] -= size
+                counters.file_types[category][2] -= allocated
+            if file_info is not None:
+                dropped.add(id(file_info))
+                counters.large_files_found -= 1
+        if dropped:
+            matches = [f for f in matches if id(f) not in dropped]
+        return matches
+    
+    def state(self) -> List[int]:
+        return list(self._seen)
 
 
 class CountdownTimer:
@@ -109,293 +393,4523 @@ class CountdownTimer:
             time.sleep(1)
 
 
-class MacOSFileCleanup:
-    """Main class for macOS file cleanup operations."""
+class ProgressReporter(CountdownTimer):
+    """
+    Progress display driven by one sampling thread.
     
-    def __init__(self, target_directory: str, min_size_gb: float = 1.0, 
-                 interactive: bool = True, dry_run: bool = False):
-        self.target_directory = Path(target_directory).resolve()
-        self.min_size_bytes = int(min_size_gb * 1024 * 1024 * 1024)  # Convert GB to bytes
-        self.interactive = interactive
-        self.dry_run = dry_run
-        self.stats = FileCleanupStats()
-        self.large_files: List[FileInfo] = []
-        self.timer = CountdownTimer()
-        self.shutdown_requested = False
-        
-        # Setup logging
-        self.setup_logging()
-        
-        # Setup signal handlers for graceful shutdown
-        signal.signal(signal.SIGINT, self.signal_handler)
-        signal.signal(signal.SIGTERM, self.signal_handler)
+    Scan workers only bump plain integer counters (merged into
+    FileCleanupStats once per directory); this thread reads them at a fixed
+    interval without taking any lock and derives files/s, dirs/s and bytes/s
+    from the difference between samples. Each sample can be rendered as the
+    runtime line on stdout and/or written as a JSON frame to a file
+    descriptor for orchestration tools.
+    """
     
-    def setup_logging(self):
-        """Setup comprehensive logging configuration."""
-        log_filename = f"file_cleanup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-        
-        # Create logs directory if it doesn't exist
-        log_dir = Path("cleanup_logs")
-        log_dir.mkdir(exist_ok=True)
-        log_path = log_dir / log_filename
+    def __init__(self, cleanup: 'MacOSFileCleanup', interval: float = 1.0,
+                 json_fd: Optional[int] = None, show_line: bool = True):
+        super().__init__()
+        self.cleanup = cleanup
+        self.interval = interval
+        self.json_fd = json_fd
+        self.show_line = show_line
+        self.phase = "scan"
+        self.expected_directories: Optional[int] = None
+        self.stop_event = threading.Event()
+        self._last: Optional[Tuple[float, int, int, int]] = None
+    
+    def stop(self):
+        """Stop the reporter; the loop emits one final sample on its way out."""
+        super().stop()
+        self.stop_event.set()
+    
+    def sample(self) -> Dict[str, Any]:
+        """Read the counters and compute rates since the previous sample."""
+        stats = self.cleanup.stats
+        now = time.time()
+        files, dirs, scanned_bytes = stats.files_scanned, stats.directories_scanned, stats.bytes_scanned
         
-        # Configure logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_path, encoding='utf-8'),
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
+        if self._last is None:
+            last_time, last_files, last_dirs, last_bytes = self.start_time, 0, 0, 0
+        else:
+            last_time, last_files, last_dirs, last_bytes = self._last
+        self._last = (now, files, dirs, scanned_bytes)
+        window = max(now - last_time, 1e-6)
+        dirs_per_second = (dirs - last_dirs) / window
         
-        self.logger = logging.getLogger(__name__)
-        self.log_file_path = log_path
+        engine = self.cleanup.engine
+        eta = None
+        if self.expected_directories and dirs_per_second > 0:
+            eta = max(0, self.expected_directories - dirs) / dirs_per_second
         
-        self.logger.info("="*60)
-        self.logger.info("macOS File Cleanup Script Started")
-        self.logger.info(f"Target Directory: {self.target_directory}")
-        self.logger.info(f"Minimum File Size: {self.min_size_bytes / (1024**3):.2f} GB")
-        self.logger.info(f"Interactive Mode: {self.interactive}")
-        self.logger.info(f"Dry Run Mode: {self.dry_run}")
-        self.logger.info("="*60)
+        return {
+            "type": "progress",
+            "phase": self.phase,
+            "timestamp": now,
+            "elapsed_seconds": now - self.start_time,
+            "files_scanned": files,
+            "directories_scanned": dirs,
+            "bytes_scanned": scanned_bytes,
+            "large_files_found": stats.large_files_found,
+            "files_deleted": stats.files_deleted,
+            "bytes_freed": stats.bytes_freed,
+            "files_per_second": (files - last_files) / window,
+            "dirs_per_second": dirs_per_second,
+            "bytes_per_second": (scanned_bytes - last_bytes) / window,
+            "queue_depth": engine.outstanding if engine is not None else 0,
+            "eta_seconds": eta,
+        }
     
-    def signal_handler(self, signum, frame):
-        """Handle shutdown signals gracefully."""
-        self.logger.warning(f"Received signal {signum}. Initiating graceful shutdown...")
-        self.shutdown_requested = True
-        self.stats.interrupted = True
-        self.timer.stop()
+    def render(self, frame: Dict[str, Any]) -> str:
+        format_size = self.cleanup.format_size
+        line = (f"\r⏱️  Runtime: {self.get_elapsed_time()} | {frame['files_scanned']:,} files "
+                f"({frame['files_per_second']:,.0f}/s) | {frame['dirs_per_second']:,.0f} dirs/s | "
+                f"{format_size(frame['bytes_per_second'])}/s | queue {frame['queue_depth']:,}")
+        if frame["eta_seconds"] is not None:
+            line += f" | ETA {str(timedelta(seconds=int(frame['eta_seconds'])))}"
+        return line
     
-    def format_size(self, size_bytes: int) -> str:
-        """Format file size in human-readable format."""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size_bytes < 1024.0:
-                return f"{size_bytes:.2f} {unit}"
-            size_bytes /= 1024.0
-        return f"{size_bytes:.2f} PB"
+    def emit(self, frame: Dict[str, Any]):
+        if self.show_line:
+            print(self.render(frame), end="", flush=True)
+        self.write_frame(frame)
     
-    def is_safe_to_delete(self, file_path: Path) -> Tuple[bool, str]:
-        """
-        Check if a file is safe to delete based on macOS system considerations.
+    def write_frame(self, frame: Dict[str, Any]):
+        """Write one JSON line to the progress descriptor, if there is one."""
+        if self.json_fd is not None:
+            import json
+            try:
+                os.write(self.json_fd, (json.dumps(frame) + "\n").encode('utf-8'))
+            except OSError as e:
+                self.cleanup.logger.warning(f"Disabling JSON progress on fd {self.json_fd}: {str(e)}")
+                self.json_fd = None
+    
+    def display_loop(self):
+        """Sample and emit every ``interval`` seconds until stopped."""
+        while not self.stop_event.wait(self.interval):
+            self.emit(self.sample())
         
-        Returns:
-            Tuple of (is_safe, reason)
-        """
+        final = self.sample()
+        final["type"] = "done"
+        self.emit(final)
+
+
+class LatencyHistogram:
+    """Log-scale latency histogram with 16 buckets per power of two (about 4% resolution)."""
+    
+    BUCKETS_PER_OCTAVE = 16
+    
+    __slots__ = ('counts',)
+    
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * 64 * self.BUCKETS_PER_OCTAVE))
+    
+    def add(self, ns: int):
+        self.counts[int(math.log2(ns) * self.BUCKETS_PER_OCTAVE) if ns > 1 else 0] += 1
+    
+    def merge(self, other: 'LatencyHistogram'):
+        for bucket, count in enumerate(other.counts):
+            if count:
+                self.counts[bucket] += count
+    
+    def percentile(self, percent: float) -> float:
+        """Upper bound, in nanoseconds, of the bucket holding the ``percent``-th percentile."""
+        target = sum(self.counts) * percent / 100
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return 2 ** ((bucket + 1) / self.BUCKETS_PER_OCTAVE)
+        return 0.0
+
+
+class PhaseTimer:
+    """
+    Time and call counts per phase, plus latency histograms for stat and unlink.
+    
+    Every thread accumulates into its own table, so recording takes no lock;
+    tables are merged when ``summary()`` is called. Phase times recorded by
+    several threads add up, so they can exceed the wall-clock runtime.
+    """
+    
+    LATENCY_PHASES = frozenset({'stat', 'unlink', 'rename'})
+    
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._tables: List[Dict[str, list]] = []
+    
+    def _table(self) -> Dict[str, list]:
         try:
-            path_str = str(file_path).lower()
-            
-            # System critical directories and files
-            critical_paths = [
-                '/system/', '/usr/bin/', '/usr/sbin/', '/bin/', '/sbin/',
-                '/library/application support/', '/library/frameworks/',
-                '/library/system/', '/private/var/db/', '/private/etc/',
-                '/applications/', '/library/preferences/'
-            ]
-            
-            # Check if file is in critical system location
-            for critical_path in critical_paths:
-                if critical_path in path_str:
-                    return False, f"File in critical system directory: {critical_path}"
-            
-            # Check for system file extensions
-            system_extensions = {'.dylib', '.framework', '.kext', '.plist'}
-            if file_path.suffix.lower() in system_extensions:
-                return False, f"System file type: {file_path.suffix}"
-            
-            # Check if file is currently in use (basic check)
+            return self._local.table
+        except AttributeError:
+            table = self._local.table = {}
+            with self._lock:
+                self._tables.append(table)
+            return table
+    
+    def add(self, phase: str, ns: int, calls: int = 1):
+        """Record ``calls`` calls of ``phase`` that took ``ns`` nanoseconds in total."""
+        table = self._table()
+        entry = table.get(phase)
+        if entry is None:
+            entry = table[phase] = [0, 0, LatencyHistogram() if phase in self.LATENCY_PHASES else None]
+        entry[0] += calls
+        entry[1] += ns
+        if entry[2] is not None:
+            entry[2].add(ns)
+    
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as one call of ``name``."""
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter_ns() - started)
+    
+    def wrap(self, phase: str, function):
+        """Return ``function`` timed as ``phase`` on every call."""
+        def timed(*args, **kwargs):
+            started = time.perf_counter_ns()
             try:
-                with open(file_path, 'rb') as f:
-                    pass  # Just try to open for reading
-            except PermissionError:
-                return False, "File may be in use or protected"
-            
-            # Additional macOS-specific checks
-            if file_path.name.startswith('.'):
-                return False, "Hidden system file"
-            
-            return True, "Safe to delete"
-            
-        except Exception as e:
-            return False, f"Error checking file safety: {str(e)}"
+                return function(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter_ns() - started)
+        return timed
     
-    def get_file_info(self, file_path: Path) -> Optional[FileInfo]:
+    def summary(self) -> Dict[str, Dict[str, Any]]:
         """
-        Get file information with comprehensive error handling.
+        Merged totals for every phase recorded so far.
         
         Returns:
-            FileInfo object or None if file cannot be accessed
+            Dict of phase name to calls, seconds and mean_us, plus p50_us and
+            p99_us for latency phases
         """
-        try:
-            stat_info = file_path.stat()
-            
-            # Skip if file is smaller than minimum size
-            if stat_info.st_size < self.min_size_bytes:
-                return None
-            
-            return FileInfo(
-                path=str(file_path),
-                size=stat_info.st_size,
-                modified_time=stat_info.st_mtime,
-                is_accessible=True
-            )
-            
-        except PermissionError as e:
-            self.stats.permission_errors += 1
-            self.logger.warning(f"Permission denied: {file_path} - {str(e)}")
-            return FileInfo(
-                path=str(file_path),
-                size=0,
-                modified_time=0,
-                is_accessible=False,
-                error_message=f"Permission denied: {str(e)}"
-            )
-        except OSError as e:
-            self.stats.io_errors += 1
-            self.logger.warning(f"OS error accessing {file_path}: {str(e)}")
-            return FileInfo(
-                path=str(file_path),
-                size=0,
-                modified_time=0,
-                is_accessible=False,
-                error_message=f"OS error: {str(e)}"
-            )
-        except Exception as e:
-            self.stats.other_errors += 1
-            self.logger.error(f"Unexpected error accessing {file_path}: {str(e)}")
-            return FileInfo(
-                path=str(file_path),
-                size=0,
-                modified_time=0,
-                is_accessible=False,
-                error_message=f"Unexpected error: {str(e)}"
-            )
+        merged: Dict[str, list] = {}
+        with self._lock:
+            tables = list(self._tables)
+        for table in tables:
+            for phase, (calls, ns, histogram) in list(table.items()):
+                entry = merged.setdefault(phase, [0, 0, LatencyHistogram() if histogram is not None else None])
+                entry[0] += calls
+                entry[1] += ns
+                if histogram is not None:
+                    entry[2].merge(histogram)
+        
+        phases = {}
+        for phase, (calls, ns, histogram) in merged.items():
+            phases[phase] = {"calls": calls, "seconds": ns / 1e9, "mean_us": ns / calls / 1e3 if calls else 0.0}
+            if histogram is not None:
+                phases[phase]["p50_us"] = histogram.percentile(50) / 1e3
+                phases[phase]["p99_us"] = histogram.percentile(99) / 1e3
+        return phases
+
+
+class CancelToken:
+    """
+    Cooperative cancellation shared by a cleanup and whoever may stop it.
     
-    def scan_directory(self, directory: Path) -> List[FileInfo]:
+    Scan workers, hashing, deletion and the watcher poll ``cancelled``
+    between units of work, so a cancel takes effect within one directory
+    or file. One token can be handed to several cleanups to stop them all;
+    the CLI's signal handlers cancel the cleanup's token.
+    """
+    
+    def __init__(self):
+        self.cancelled = False
+        self._event = threading.Event()
+    
+    def cancel(self):
+        self.cancelled = True
+        self._event.set()
+    
+    def reset(self):
+        self.cancelled = False
+        self._event.clear()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until cancelled or ``timeout`` seconds pass; True if cancelled."""
+        return self._event.wait(timeout)
+
+
+class TokenBucket:
+    """
+    Rate limit shared by every thread doing one kind of I/O.
+    
+    ``take(n)`` reserves ``n`` tokens, going into debt when the bucket is
+    empty, and sleeps until the debt is paid off, so callers queue up in
+    arrival order without holding the lock while they wait. Up to
+    ``burst`` tokens (one second's worth by default) build up while idle.
+    Waits end early when ``cancel`` is cancelled. Each thread's own time
+    spent waiting is kept too, so callers can leave throttling out of the
+    latencies they measure.
+    """
+    
+    def __init__(self, rate: float, burst: Optional[float] = None, cancel: Optional[CancelToken] = None):
+        if rate <= 0:
+            raise ValueError("Rate must be greater than 0")
+        self.rate = float(rate)
+        self.burst = float(burst) if burst is not None else max(1.0, self.rate)
+        self.cancel = cancel
+        self.lock = threading.Lock()
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.waited_seconds = 0.0
+        self._local = threading.local()
+    
+    @property
+    def thread_waited_ns(self) -> int:
+        """Nanoseconds the calling thread has spent waiting in take()."""
+        return getattr(self._local, 'waited_ns', 0)
+    
+    def take(self, n: float = 1.0):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate) - n
+            self.updated = now
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited_seconds += wait
+        if wait > 0:
+            started = time.perf_counter_ns()
+            if self.cancel is not None:
+                self.cancel.wait(wait)
+            else:
+                time.sleep(wait)
+            self._local.waited_ns = self.thread_waited_ns + time.perf_counter_ns() - started
+
+
+class LatencyGovernor:
+    """
+    Caps how many of a device pool's scan workers are active, by metadata latency.
+    
+    Workers report the time per entry of each directory they list. Every
+    ``window`` seconds the mean is compared with the best window so far:
+    above ``threshold`` times that baseline the cap is halved, close to it
+    the cap grows by one worker. The baseline creeps up 2% per window so a
+    device that stays slower is eventually taken as normal. Workers over
+    the cap park and hand their queued directories to the active ones.
+    """
+    
+    def __init__(self, workers: int, threshold: float = 2.0, window: float = 0.5):
+        self.max_workers = max(1, workers)
+        self.allowed = self.max_workers
+        self.threshold = threshold
+        self.window = window
+        self.baseline: Optional[float] = None
+        self.adjustments = 0
+        self.lock = threading.Lock()
+        self._ns = 0
+        self._entries = 0
+        self._window_started = time.monotonic()
+    
+    def record(self, ns: int, entries: int) -> Optional[Tuple[int, float]]:
         """
-        Recursively scan directory for large files with error handling.
+        Add one directory's listing time.
         
         Returns:
-            List of FileInfo objects for large files
+            (new cap, latency relative to baseline) when the cap changed, else None
         """
-        large_files = []
-        
-        try:
-            self.stats.directories_scanned += 1
+        with self.lock:
+            self._ns += ns
+            self._entries += entries
+            now = time.monotonic()
+            if now - self._window_started < self.window or self._entries < 32:
+                return None
+            mean = self._ns / self._entries
+            self._ns = self._entries = 0
+            self._window_started = now
             
-            # Use os.walk for better performance and error handling
-            for root, dirs, files in os.walk(directory):
-                if self.shutdown_requested:
-                    break
-                
-                # Filter out system directories that should be avoided
-                dirs[:] = [d for d in dirs if not d.startswith('.') and 
-                          d not in {'System', 'private', 'dev', 'proc'}]
-                
-                root_path = Path(root)
-                
-                for filename in files:
-                    if self.shutdown_requested:
-                        break
-                    
-                    try:
-                        file_path = root_path / filename
-                        self.stats.files_scanned += 1
-                        
-                        file_info = self.get_file_info(file_path)
-                        if file_info and file_info.is_accessible and file_info.size >= self.min_size_bytes:
-                            large_files.append(file_info)
-                            self.stats.large_files_found += 1
-                            
-                            # Log discovery of large file
-                            self.logger.info(f"Large file found: {file_path} ({self.format_size(file_info.size)})")
-                        
-                        # Update progress every 1000 files
-                        if self.stats.files_scanned % 1000 == 0:
-                            self.logger.info(f"Progress: {self.stats.files_scanned} files scanned, "
-                                           f"{self.stats.large_files_found} large files found")
-                    
-                    except Exception as e:
-                        self.stats.other_errors += 1
-                        self.logger.error(f"Error processing file {filename} in {root}: {str(e)}")
-                        continue
+            if self.baseline is None or mean < self.baseline:
+                self.baseline = mean
+            ratio = mean / self.baseline
+            self.baseline *= 1.02
+            previous = self.allowed
+            if ratio > self.threshold:
+                self.allowed = max(1, self.allowed // 2)
+            elif ratio < 1.25:
+                self.allowed = min(self.max_workers, self.allowed + 1)
+            if self.allowed == previous:
+                return None
+            self.adjustments += 1
+            return self.allowed, ratio
+
+
+# ioprio_set(2) syscall numbers by architecture
+IOPRIO_SET_SYSCALLS = {'x86_64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30, 'arm64': 30,
+                       'armv7l': 314, 'ppc64le': 273, 's390x': 282, 'riscv64': 30}
+
+
+def lower_priority(niceness: Optional[int] = None, io_priority: Optional[str] = None) -> List[str]:
+    """
+    Lower this process's CPU and disk priority, like ``nice`` and ``ionice``.
+    
+    ``niceness`` is added with os.setpriority. ``io_priority`` is ``idle``
+    (only use the disk when nothing else does) or ``low`` (lowest
+    best-effort level): ioprio_set on Linux, setiopolicy_np (throttle or
+    utility) on macOS. Both are per thread on Linux and inherited by new
+    threads, so call this before any workers start.
+    
+    Returns:
+        Descriptions of what was applied; OSError if a call failed
+    """
+    applied = []
+    if niceness:
+        current = os.getpriority(os.PRIO_PROCESS, 0)
+        os.setpriority(os.PRIO_PROCESS, 0, min(19, current + niceness))
+        applied.append(f"nice {os.getpriority(os.PRIO_PROCESS, 0)}")
+    if io_priority:
+        import ctypes
+        import platform
+        libc = ctypes.CDLL(None, use_errno=True)
+        if sys.platform.startswith('linux'):
+            number = IOPRIO_SET_SYSCALLS.get(platform.machine())
+            if number is None:
+                raise OSError(errno.ENOSYS, f"ioprio_set unknown on {platform.machine()}")
+            # IOPRIO_WHO_PROCESS; class in the top bits: 3 idle, 2 best-effort (level 7 lowest)
+            value = (3 << 13) if io_priority == 'idle' else (2 << 13) | 7
+            result = libc.syscall(number, 1, 0, value)
+        elif sys.platform == 'darwin':
+            # IOPOL_TYPE_DISK, IOPOL_SCOPE_PROCESS, IOPOL_THROTTLE / IOPOL_UTILITY
+            result = libc.setiopolicy_np(0, 0, 3 if io_priority == 'idle' else 4)
+        else:
+            raise OSError(errno.ENOSYS, f"I/O priority is not supported on {sys.platform}")
+        if result != 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        applied.append(f"{io_priority} I/O")
+    return applied
+
+
+class _ScanWorker:
+    """Scheduling state owned by one scan worker."""
+    
+    __slots__ = ('index', 'pool', 'slot', 'lock', 'queue', 'overflow', 'current')
+    
+    def __init__(self, index: int, pool: '_DevicePool', slot: int):
+        self.index = index
+        self.pool = pool
+        self.slot = slot
+        self.lock = threading.Lock()
+        self.queue: Deque[str] = deque()
+        self.overflow: List[str] = []
+        self.current: Optional[str] = None
+
+
+class _DevicePool:
+    """The workers, and per-device totals, for directories on one st_dev."""
+    
+    __slots__ = ('device', 'mount_point', 'workers', 'next_worker',
+                 'directories', 'files', 'bytes_scanned', 'governor')
+    
+    def __init__(self, device: int, mount_point: str):
+        self.device = device
+        self.mount_point = mount_point
+        self.workers: List[_ScanWorker] = []
+        self.next_worker = 0
+        self.directories = 0
+        self.files = 0
+        self.bytes_scanned = 0
+        self.governor: Optional[LatencyGovernor] = None
+
+
+def glob_to_line_regex(pattern: str) -> str:
+    """
+    Translate a shell glob into a regex that never matches across a newline.
+    
+    Used for SafetyRules batches, where paths are joined with newlines and
+    matched in a single pass.
+    """
+    i, n = 0, len(pattern)
+    parts = []
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == '*':
+            parts.append(r'[^\n]*')
+        elif c == '?':
+            parts.append(r'[^\n]')
+        elif c == '[':
+            j = i
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            if j >= n:
+                parts.append('\\[')
+            else:
+                body = pattern[i:j].replace('\\', '\\\\')
+                if body[0] in '!^':
+                    body = r'^\n' + body[1:]
+                parts.append(f'[{body}]')
+                i = j + 1
+        else:
+            parts.append(re.escape(c))
+    return ''.join(parts)
+
+
+class SafetyRules:
+    """
+    Compiled deletion safety rules.
+    
+    The built-in critical system paths compile into a single trie-shaped
+    regex, and each user glob or regex rule compiles once. evaluate_batch()
+    joins a batch of paths with newlines and runs each compiled pattern over
+    the whole batch in one pass, so per-path work in Python is reduced to a
+    few dict lookups.
+    """
+    
+    DEFAULT_CRITICAL_PATHS = (
+        '/system/', '/usr/bin/', '/usr/sbin/', '/bin/', '/sbin/',
+        '/library/application support/', '/library/frameworks/',
+        '/library/system/', '/private/var/db/', '/private/etc/',
+        '/applications/', '/library/preferences/'
+    )
+    DEFAULT_SYSTEM_EXTENSIONS = frozenset({'.dylib', '.framework', '.kext', '.plist'})
+    
+    # BSD file flags that make unlink fail even for the owner
+    LOCKED_FLAGS = (getattr(stat, 'UF_IMMUTABLE', 0) | getattr(stat, 'SF_IMMUTABLE', 0) |
+                    getattr(stat, 'UF_APPEND', 0) | getattr(stat, 'SF_APPEND', 0))
+    
+    CONFIG_KEYS = ('deny_globs', 'deny_regex', 'allow_globs', 'allow_regex')
+    
+    def __init__(self, deny_globs: Optional[List[str]] = None, deny_regex: Optional[List[str]] = None,
+                 allow_globs: Optional[List[str]] = None, allow_regex: Optional[List[str]] = None):
+        self.system_extensions = self.DEFAULT_SYSTEM_EXTENSIONS
+        critical = self._trie_regex(self.DEFAULT_CRITICAL_PATHS)
+        # Deny rules match case-insensitively and allow rules case-sensitively,
+        # so case differences can only ever make a rule more conservative.
+        # Case-insensitive patterns come in two forms: a fast one run over a
+        # lowercased ASCII batch, and re.IGNORECASE for anything else.
+        self.critical = (re.compile(critical), re.compile(critical, re.IGNORECASE))
+        self.deny_globs = [(g, self._compile_glob(g.lower(), 0), self._compile_glob(g, re.IGNORECASE))
+                           for g in deny_globs or []]
+        self.allow_globs = [(g, self._compile_glob(g, 0)) for g in allow_globs or []]
+        self.deny_regex = [(p, re.compile(p, re.IGNORECASE | re.MULTILINE)) for p in deny_regex or []]
+        self.allow_regex = [(p, re.compile(p, re.MULTILINE)) for p in allow_regex or []]
+    
+    @staticmethod
+    def _trie_regex(words) -> str:
+        """Build a regex for a set of literals with shared prefixes factored out."""
+        trie: Dict[str, dict] = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = {}
         
-        except PermissionError as e:
-            self.stats.permission_errors += 1
-            self.logger.warning(f"Permission denied accessing directory {directory}: {str(e)}")
-        except Exception as e:
-            self.stats.other_errors += 1
-            self.logger.error(f"Error scanning directory {directory}: {str(e)}")
+        def emit(node: Dict[str, dict]) -> str:
+            alternatives = [re.escape(char) + emit(child) if char else ''
+                            for char, child in sorted(node.items())]
+            if len(alternatives) == 1:
+                return alternatives[0]
+            return '(?:' + '|'.join(alternatives) + ')'
         
-        return large_files
+        return emit(trie)
     
-    def display_top_files(self, files: List[FileInfo], count: int = 10):
-        """Display top largest files in a formatted table."""
-        if not files:
-            print("\n📁 No large files found.")
-            return
-        
-        # Sort files by size (descending)
-        sorted_files = sorted([f for f in files if f.is_accessible], 
-                            key=lambda x: x.size, reverse=True)
+    @staticmethod
+    def _compile_glob(glob: str, flags: int) -> 're.Pattern':
+        """
+        Compile a glob for matching against newline-joined paths.
         
-        print(f"\n📊 Top {min(count, len(sorted_files))} Largest Files:")
-        print("="*80)
-        print(f"{'#':<3} {'Size':<12} {'Path':<60}")
-        print("-"*80)
+        A leading or trailing ``*`` becomes an unanchored edge instead of a
+        ``[^\\n]*`` run, so a glob with a literal core is found with re's fast
+        literal search rather than tried at every position.
+        """
+        core = glob.strip('*')
+        regex = glob_to_line_regex(core)
+        if not glob.startswith('*'):
+            regex = '^' + regex
+        if not glob.endswith('*'):
+            regex += '$'
+        return re.compile(regex, flags | re.MULTILINE)
+    
+    @classmethod
+    def from_file(cls, rules_path: Union[Path, str]) -> 'SafetyRules':
+        """Load rules from a JSON config file."""
+        import json
+        with open(Path(rules_path).expanduser(), encoding='utf-8') as f:
+            config = json.load(f)
         
-        for i, file_info in enumerate(sorted_files[:count], 1):
-            size_str = self.format_size(file_info.size)
-            path_str = file_info.path
-            if len(path_str) > 55:
-                path_str = "..." + path_str[-52:]
-            
-            print(f"{i:<3} {size_str:<12} {path_str}")
+        unknown = set(config) - set(cls.CONFIG_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown keys in rules file {rules_path}: {', '.join(sorted(unknown))}")
+        for key in cls.CONFIG_KEYS:
+            value = config.get(key, [])
+            if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                raise ValueError(f"'{key}' in rules file {rules_path} must be a list of strings")
         
-        print("="*80)
+        try:
+            return cls(**{key: config.get(key, []) for key in cls.CONFIG_KEYS})
+        except re.error as e:
+            raise ValueError(f"Invalid pattern in rules file {rules_path}: {str(e)}")
+    
+    @staticmethod
+    def _matching_lines(pattern: 're.Pattern', text: str, line_starts: List[int],
+                        label: Optional[str] = None) -> Dict[int, str]:
+        """Map line index -> ``label`` (or the matched text) for every line ``pattern`` matches."""
+        matched: Dict[int, str] = {}
+        last_line = len(line_starts) - 1
+        position = 0
+        while True:
+            match = pattern.search(text, position)
+            if match is None:
+                return matched
+            line = bisect_right(line_starts, match.start()) - 1
+            if line < last_line and match.end() >= line_starts[line + 1]:
+                # A user regex may match across the joining newline, hiding a
+                # real match further on; try the line on its own instead
+                match = pattern.search(text, line_starts[line], line_starts[line + 1] - 1)
+            if match is not None:
+                matched[line] = label if label is not None else match.group(0)
+            if line == last_line:
+                return matched
+            # Only the first match on a line counts, so carry on from the next one
+            position = line_starts[line + 1]
     
-    def delete_file_safely(self, file_info: FileInfo) -> bool:
+    def evaluate(self, path: str, check_access: bool = True) -> Tuple[bool, str]:
+        """Evaluate a single path; see evaluate_batch()."""
+        return self.evaluate_batch([path], check_access)[0]
+    
+    def evaluate_batch(self, paths: List[str], check_access: bool = True) -> List[Tuple[bool, str]]:
         """
-        Safely delete a file with comprehensive error handling.
+        Decide for each path whether it is safe to delete.
+        
+        With ``check_access`` the files that pass every rule are also probed
+        with os.access (and BSD immutable/append-only flags where the
+        platform has them) instead of being opened.
         
         Returns:
-            True if file was deleted successfully, False otherwise
+            List of (is_safe, reason) tuples in input order
+        """
+        if not paths:
+            return []
+        
+        text = '\n'.join(paths)
+        if text.count('\n') != len(paths) - 1:
+            # Paths cannot contain NUL, so it stands in for newlines inside names
+            text = '\n'.join(p.replace('\n', '\0') for p in paths)
+        line_starts = list(itertools.accumulate(map((1).__add__, map(len, paths[:-1])), initial=0))
+        
+        # One pass of each compiled rule over the whole batch
+        ascii_batch = text.isascii()
+        folded = text.lower() if ascii_batch else text
+        critical = self._matching_lines(self.critical[0 if ascii_batch else 1], folded, line_starts)
+        
+        denied: Dict[int, str] = {}
+        for source, folded_re, ignorecase_re in self.deny_globs:
+            matches = (self._matching_lines(folded_re, folded, line_starts, source) if ascii_batch
+                       else self._matching_lines(ignorecase_re, text, line_starts, source))
+            for line, rule in matches.items():
+                denied.setdefault(line, rule)
+        for source, pattern in self.deny_regex:
+            for line, rule in self._matching_lines(pattern, text, line_starts, source).items():
+                denied.setdefault(line, rule)
+        
+        allowed: Dict[int, str] = {}
+        for source, pattern in self.allow_globs + self.allow_regex:
+            for line, rule in self._matching_lines(pattern, text, line_starts, source).items():
+                allowed.setdefault(line, rule)
+        
+        results: List[Tuple[bool, str]] = []
+        for i, path in enumerate(paths):
+            if i in critical:
+                results.append((False, f"File in critical system directory: {critical[i].lower()}"))
+                continue
+            if i in denied:
+                results.append((False, f"Denied by rule: {denied[i]}"))
+                continue
+            if i in allowed:
+                results.append((True, f"Allowed by rule: {allowed[i]}"))
+                continue
+            
+            name = path.rpartition(os.sep)[2]
+            dot = name.rfind('.')
+            suffix = name[dot:] if dot > 0 else ''
+            if suffix.lower() in self.system_extensions:
+                results.append((False, f"System file type: {suffix}"))
+            elif name.startswith('.'):
+                results.append((False, "Hidden system file"))
+            else:
+                results.append((True, "Safe to delete"))
+        
+        if check_access:
+            for i, path in enumerate(paths):
+                if results[i][0]:
+                    problem = self._access_problem(path)
+                    if problem:
+                        results[i] = (False, problem)
+        
+        return results
+    
+    def _access_problem(self, path: str) -> Optional[str]:
+        """Probe permissions without opening the file."""
+        try:
+            if not os.access(path, os.R_OK):
+                if not os.path.lexists(path):
+                    return f"Error checking file safety: no such file: {path}"
+                return "File may be in use or protected"
+            if self.LOCKED_FLAGS:
+                flags = getattr(os.lstat(path), 'st_flags', 0)
+                if flags & self.LOCKED_FLAGS:
+                    return "File is locked (immutable or append-only flag)"
+        except OSError as e:
+            return f"Error checking file safety: {str(e)}"
+        return None
+
+
+class FileClassifier:
+    """
+    Coarse file categories (video, vm_image, archive, build_cache, logs, ...).
+    
+    The name decides whenever it can: anything below a build cache
+    directory (DerivedData, node_modules, __pycache__, ...) is build_cache,
+    otherwise the lowercased extension is looked up in one dict, so most
+    files are classified without touching the disk. Files with no
+    extension are ``other``, or with ``sniff`` set, matched by the magic
+    number in their first bytes.
+    """
+    
+    CATEGORY_EXTENSIONS = {
+        'video': ('mp4', 'm4v', 'mov', 'mkv', 'avi', 'wmv', 'flv', 'webm', 'mpg', 'mpeg', 'mts', 'm2ts', '3gp'),
+        'audio': ('mp3', 'm4a', 'aac', 'wav', 'aif', 'aiff', 'flac', 'ogg', 'opus', 'wma', 'caf'),
+        'image': ('jpg', 'jpeg', 'png', 'gif', 'heic', 'heif', 'tif', 'tiff', 'bmp', 'webp', 'psd', 'svg',
+                  'ico', 'icns', 'raw', 'cr2', 'cr3', 'nef', 'arw', 'dng'),
+        'vm_image': ('vmdk', 'vdi', 'vhd', 'vhdx', 'qcow', 'qcow2', 'hdd', 'hds', 'ova', 'vmem', 'vmsn', 'vmss'),
+        'disk_image': ('dmg', 'iso', 'img', 'sparseimage', 'toast', 'cdr'),
+        'archive': ('zip', 'tar', 'gz', 'tgz', 'bz2', 'tbz', 'tbz2', 'xz', 'txz', 'zst', 'lz4', 'lzma', '7z',
+                    'rar', 'cab', 'xip', 'pkg', 'jar', 'war', 'whl', 'deb', 'rpm', 'ipa'),
+        'build_cache': ('o', 'obj', 'a', 'pyc', 'pyo', 'class', 'pch', 'gch', 'pcm', 'swiftmodule',
+                        'swiftdeps', 'swiftdoc', 'dia', 'tlog', 'ilk', 'pdb', 'idb'),
+        'logs': ('log', 'crash', 'ips', 'diag', 'spin', 'hang', 'tracev3', 'journal'),
+        'document': ('pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'pages', 'numbers', 'key', 'rtf',
+                     'odt', 'ods', 'odp', 'epub', 'txt', 'md', 'csv'),
+        'database': ('db', 'sqlite', 'sqlite3', 'realm', 'mdb', 'frm', 'ibd'),
+        'source': ('py', 'c', 'h', 'cc', 'cpp', 'hpp', 'm', 'mm', 'swift', 'js', 'ts', 'go', 'rs', 'java',
+                   'kt', 'rb', 'sh', 'php', 'cs'),
+        'binary': ('so', 'dylib', 'dll', 'exe', 'bin', 'wasm'),
+    }
+    UNKNOWN = 'other'
+    CATEGORIES = tuple(CATEGORY_EXTENSIONS) + (UNKNOWN,)
+    
+    BUILD_CACHE_DIRECTORIES = frozenset({'DerivedData', 'node_modules', '__pycache__', 'CMakeFiles',
+                                         'ModuleCache.noindex', '.build', '.gradle', '.tox', '.mypy_cache',
+                                         '.pytest_cache'})
+    
+    # (offset, magic, category), most specific first
+    MAGIC_NUMBERS = (
+        (0, b'\x7fELF', 'binary'), (0, b'\xcf\xfa\xed\xfe', 'binary'), (0, b'\xce\xfa\xed\xfe', 'binary'),
+        (0, b'\xfe\xed\xfa\xcf', 'binary'), (0, b'\xca\xfe\xba\xbe', 'binary'),
+        (0, b'\x1f\x8b', 'archive'), (0, b'PK\x03\x04', 'archive'), (0, b'7z\xbc\xaf\x27\x1c', 'archive'),
+        (0, b'\xfd7zXZ\x00', 'archive'), (0, b'BZh', 'archive'), (0, b'\x28\xb5\x2f\xfd', 'archive'),
+        (0, b'Rar!\x1a\x07', 'archive'), (0, b'\x04\x22\x4d\x18', 'archive'), (0, b'xar!', 'archive'),
+        (257, b'ustar', 'archive'),
+        (0, b'QFI\xfb', 'vm_image'), (0, b'KDMV', 'vm_image'), (0, b'# Disk DescriptorFile', 'vm_image'),
+        (0, b'vhdxfile', 'vm_image'), (0, b'conectix', 'vm_image'), (0, b'<<< Oracle VM VirtualBox', 'vm_image'),
+        (0, b'WithoutFreeSpace', 'vm_image'), (0, b'encrcdsa', 'disk_image'),
+        (0, b'\x89PNG', 'image'), (0, b'\xff\xd8\xff', 'image'), (0, b'GIF8', 'image'), (0, b'II*\x00', 'image'),
+        (0, b'MM\x00*', 'image'), (0, b'8BPS', 'image'), (8, b'WEBP', 'image'), (4, b'ftypheic', 'image'),
+        (4, b'ftypmif1', 'image'), (4, b'ftypM4A', 'audio'), (4, b'ftyp', 'video'),
+        (0, b'\x1a\x45\xdf\xa3', 'video'), (8, b'AVI ', 'video'), (0, b'\x00\x00\x01\xba', 'video'),
+        (8, b'WAVE', 'audio'), (8, b'AIFF', 'audio'), (0, b'ID3', 'audio'), (0, b'fLaC', 'audio'),
+        (0, b'OggS', 'audio'),
+        (0, b'%PDF', 'document'), (0, b'{\\rtf', 'document'), (0, b'\xd0\xcf\x11\xe0', 'document'),
+        (0, b'SQLite format 3\x00', 'database'), (0, b'#!', 'source'),
+    )
+    SNIFF_BYTES = 512
+    # Reading to sniff must not make an idle file look recently accessed
+    OPEN_FLAGS = os.O_RDONLY | getattr(os, 'O_NONBLOCK', 0) | getattr(os, 'O_NOATIME', 0)
+    
+    def __init__(self, sniff: bool = False):
+        self.sniff = sniff
+        self.extensions = {extension: category for category, extensions in self.CATEGORY_EXTENSIONS.items()
+                           for extension in extensions}
+        self.files_sniffed = 0
+    
+    def directory_category(self, directory: str) -> Optional[str]:
+        """The category every file below ``directory`` gets, if it is inside a build cache."""
+        if self.BUILD_CACHE_DIRECTORIES.isdisjoint(directory.split(os.sep)):
+            return None
+        return 'build_cache'
+    
+    def classify_name(self, name: str) -> Optional[str]:
+        """
+        Category from a file name alone.
+        
+        Returns:
+            The category, or None when only sniffing the content can tell
+        """
+        dot = name.rfind('.')
+        if dot > 0:
+            return self.extensions.get(name[dot + 1:].lower(), self.UNKNOWN)
+        return None if self.sniff else self.UNKNOWN
+    
+    def sniff_file(self, path: str) -> str:
+        """Category of the regular file at ``path`` from its first bytes."""
+        self.files_sniffed += 1
+        try:
+            try:
+                fd = os.open(path, self.OPEN_FLAGS)
+            except PermissionError:
+                # O_NOATIME is only allowed on files we own
+                fd = os.open(path, self.OPEN_FLAGS & ~getattr(os, 'O_NOATIME', 0))
+            try:
+                head = os.read(fd, self.SNIFF_BYTES)
+            finally:
+                os.close(fd)
+        except OSError:
+            return self.UNKNOWN
+        for offset, magic, category in self.MAGIC_NUMBERS:
+            if head.startswith(magic, offset):
+                return category
+        return self.UNKNOWN
+    
+    def classify(self, path: str) -> str:
+        """Category of the regular file at ``path``, sniffing it if the name is not enough."""
+        directory, _, name = path.rpartition(os.sep)
+        category = self.directory_category(directory) or self.classify_name(name)
+        return category if category is not None else self.sniff_file(path)
+
+
+class ScanEngine:
+    """
+    Parallel os.scandir walker with bounded work-stealing queues.
+    
+    Each worker owns a deque of pending directories. New subdirectories go to
+    the owner's deque until it holds ``queue_capacity`` entries; the rest stay
+    on a private overflow stack that only the owner drains. Idle workers steal
+    the oldest (shallowest) entries from other deques, so whole subtrees move
+    between threads. The matches and counters for a directory are committed in
+    one step under ``commit_lock``, which keeps FileCleanupStats exact and
+    lets a ScanCheckpoint take a consistent snapshot of the walk.
+    
+    Workers are grouped into one pool of ``workers`` threads per device
+    (``st_dev``) and only steal within their pool. A subdirectory on another
+    device is handed to that device's pool, created on first use, so a slow
+    network mount ties up its own threads and never the local disk's. With
+    ``one_file_system`` set on the cleanup, mount points are not entered.
+    
+    All roots of a multi-root scan share the same pools; a RootBreakdown
+    attributes each committed directory to the root it came from.
+    """
+    
+    def __init__(self, cleanup: 'MacOSFileCleanup', workers: int = 1,
+                 queue_capacity: int = 256, collector: Optional['ResultCollector'] = None,
+                 checkpoint: Optional['ScanCheckpoint'] = None,
+                 aggregator: Optional['DirectoryAggregator'] = None,
+                 breakdown: Optional['RootBreakdown'] = None,
+                 stats: Optional[FileCleanupStats] = None, visited: Optional[List[str]] = None):
+        self.cleanup = cleanup
+        self.cancel = cleanup.cancel
+        self.worker_count = max(1, workers)
+        self.queue_capacity = max(1, queue_capacity)
+        self.commit_lock = threading.Lock()
+        self.work_available = threading.Condition(self.commit_lock)
+        self.outstanding = 0
+        self.stopped = False
+        self.collector = collector if collector is not None else ResultCollector()
+        self.checkpoint = checkpoint
+        self.aggregator = aggregator
+        self.breakdown = breakdown
+        # Rescans in --watch mode count into their own stats and record the
+        # directories they visit so watches can be added
+        self.stats = stats if stats is not None else cleanup.stats
+        self.visited = visited
+        self.hard_links = HardLinkSet()
+        self.workers: List[_ScanWorker] = []
+        self.pools: Dict[int, _DevicePool] = {}
+        self.threads: List[threading.Thread] = []
+        self.running = False
+    
+    def run(self, roots: List[Path]) -> List[FileInfo]:
+        """
+        Scan every root and return the large files kept by the collector.
+        
+        The calling thread acts as worker 0 of the first root's device, so
+        ``workers=1`` on a single device runs without starting any extra
+        threads. Roots on the same device share that device's pool. When
+        resuming, ``roots`` is the frontier saved in the checkpoint.
+        """
+        self.workers = []
+        self.pools = {}
+        self.threads = []
+        for root in roots:
+            root = str(root)
+            self._schedule(self._pool(self._device_of(root), root), root)
+        self.outstanding = len(roots)
+        if not self.workers:
+            return self.collector.files()
+        
+        with self.commit_lock:
+            self.running = True
+            for worker in self.workers[1:]:
+                self._start(worker)
+        
+        try:
+            self._worker_loop(self.workers[0])
+        finally:
+            with self.work_available:
+                self.stopped = True
+                self.work_available.notify_all()
+                threads = list(self.threads)
+            for thread in threads:
+                thread.join()
+        
+        return self.collector.files()
+    
+    @staticmethod
+    def _device_of(path: str) -> int:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            return 0  # scan_one reports the error
+    
+    def _start(self, worker: _ScanWorker):
+        thread = threading.Thread(target=self._worker_loop, args=(worker,),
+                                  name=f"scan-worker-{worker.index}", daemon=True)
+        self.threads.append(thread)
+        thread.start()
+    
+    def _pool(self, device: int, mount_point: str) -> _DevicePool:
+        """Return the pool for ``device``, creating it (and starting its workers) on first use."""
+        pool = self.pools.get(device)
+        if pool is not None:
+            return pool
+        
+        pool = _DevicePool(device, mount_point)
+        if self.cleanup.adaptive_workers and self.worker_count > 1:
+            pool.governor = LatencyGovernor(self.worker_count)
+        for slot in range(self.worker_count):
+            worker = _ScanWorker(len(self.workers), pool, slot)
+            pool.workers.append(worker)
+            self.workers.append(worker)
+            if self.running and not self.stopped:
+                self._start(worker)
+        self.pools[device] = pool
+        if len(self.pools) > 1:
+            self.cleanup.logger.info(f"💽 Device {device} at {mount_point}: "
+                                     f"{self.worker_count} dedicated scan worker(s)")
+        return pool
+    
+    def _schedule(self, pool: _DevicePool, directory: str):
+        """Queue a root or mount point on one of ``pool``'s workers, round robin."""
+        worker = pool.workers[pool.next_worker % len(pool.workers)]
+        pool.next_worker += 1
+        with worker.lock:
+            worker.queue.append(directory)
+    
+    def device_summary(self) -> List[Dict[str, Any]]:
+        """
+        Per-device totals for the summary report.
+        
+        Returns:
+            List of dicts with device, mount_point, workers, directories, files and bytes_scanned
+        """
+        return [{"device": pool.device, "mount_point": pool.mount_point, "workers": len(pool.workers),
+                 "active_workers": pool.governor.allowed if pool.governor else len(pool.workers),
+                 "directories": pool.directories, "files": pool.files,
+                 "bytes_scanned": pool.bytes_scanned}
+                for pool in self.pools.values()]
+    
+    def _should_stop(self) -> bool:
+        return self.stopped or self.cancel.cancelled
+    
+    def _worker_loop(self, worker: _ScanWorker):
+        """Take directories until the whole tree has been committed."""
+        while True:
+            directory = self._next_directory(worker)
+            if directory is None:
+                return
+            
+            timings = self.cleanup.call_timings
+            governor = worker.pool.governor
+            limiter = self.cleanup.stat_limiter
+            if timings is not None or governor is not None:
+                started = time.perf_counter_ns()
+                throttled = limiter.thread_waited_ns if limiter is not None else 0
+            try:
+                matches, subdirs, mounts, counters = self.scan_one(directory, worker.pool.device)
+            except Exception as e:
+                counters = ScanCounters()
+                counters.other_errors += 1
+                matches, subdirs, mounts = [], [], []
+                self.cleanup.logger.error(f"Error scanning directory {directory}: {str(e)}")
+            
+            if self.cancel.cancelled:
+                # The listing may be partial; leave it in worker.current so a
+                # checkpoint records the directory as still pending
+                return
+            
+            if governor is not None and not counters.directories_from_cache:
+                # Time spent waiting on --max-stats-per-sec is not device latency
+                if limiter is not None:
+                    throttled = limiter.thread_waited_ns - throttled
+                change = governor.record(time.perf_counter_ns() - started - throttled,
+                                         counters.files_scanned + len(subdirs) + len(mounts) + 1)
+                if change is not None:
+                    self.cleanup.logger.info(f"🚦 Device {worker.pool.device}: latency {change[1]:.1f}x baseline, "
+                                             f"{change[0]} of {governor.max_workers} workers active")
+            if timings is not None:
+                listed = time.perf_counter_ns()
+                timings.add('directory', listed - started)
+            self._commit(worker, directory, matches, subdirs, mounts, counters)
+            if timings is not None:
+                timings.add('commit', time.perf_counter_ns() - listed)
+    
+    def _next_directory(self, worker: _ScanWorker) -> Optional[str]:
+        while not self._should_stop():
+            governor = worker.pool.governor
+            if governor is not None and worker.slot >= governor.allowed:
+                if self._park(worker):
+                    return None
+                continue
+            directory = self._take_local(worker)
+            if directory is None:
+                directory = self._steal(worker)
+            if directory is not None:
+                return directory
+            
+            with self.work_available:
+                if self.outstanding == 0 or self.stopped:
+                    return None
+                self.work_available.wait(0.05)
+        return None
+    
+    def _park(self, worker: _ScanWorker) -> bool:
+        """
+        Idle a worker over its pool's cap after exposing its overflow to thieves.
+        
+        Returns:
+            True once the walk is over
+        """
+        with worker.lock:
+            if worker.overflow:
+                worker.queue.extend(worker.overflow)
+                worker.overflow.clear()
+        with self.work_available:
+            if self.outstanding == 0 or self.stopped:
+                return True
+            self.work_available.wait(0.05)
+        return False
+    
+    def _take_local(self, worker: _ScanWorker) -> Optional[str]:
+        with worker.lock:
+            if worker.overflow:
+                directory = worker.overflow.pop()
+                # Keep thieves fed: expose the shallowest overflow entries
+                if not worker.queue and worker.overflow:
+                    share = min(len(worker.overflow), max(1, self.queue_capacity // 2))
+                    worker.queue.extend(worker.overflow[:share])
+                    del worker.overflow[:share]
+            elif worker.queue:
+                directory = worker.queue.pop()
+            else:
+                return None
+            worker.current = directory
+            return directory
+    
+    def _steal(self, worker: _ScanWorker) -> Optional[str]:
+        peers = worker.pool.workers
+        count = len(peers)
+        for offset in range(1, count):
+            victim = peers[(worker.slot + offset) % count]
+            with victim.lock:
+                if victim.queue:
+                    directory = victim.queue.popleft()
+                    worker.current = directory
+                    return directory
+        return None
+    
+    def _commit(self, worker: _ScanWorker, directory: str, matches: List[FileInfo],
+                subdirs: List[str], mounts: List[Tuple[str, int]], counters: ScanCounters):
+        """Publish one directory's results and schedule its subdirectories and mount points."""
+        logger = self.cleanup.logger
+        
+        with self.commit_lock:
+            if counters.hard_links:
+                matches = self.hard_links.claim(counters, matches)
+            for file_info in matches:
+                self.collector.add(file_info)
+            self.stats.merge(counters)
+            if self.visited is not None:
+                self.visited.append(directory)
+            if self.aggregator is not None:
+                self.aggregator.commit(directory, len(subdirs) + len(mounts), counters)
+            if self.breakdown is not None:
+                self.breakdown.commit(directory, counters, matches)
+            pool = worker.pool
+            pool.directories += counters.directories_scanned
+            pool.files += counters.files_scanned
+            pool.bytes_scanned += counters.bytes_scanned
+            
+            with worker.lock:
+                for subdir in subdirs:
+                    if len(worker.queue) < self.queue_capacity:
+                        worker.queue.append(subdir)
+                    else:
+                        worker.overflow.append(subdir)
+                worker.current = None
+            for mount_point, device in mounts:
+                self._schedule(self._pool(device, mount_point), mount_point)
+            
+            self.outstanding += len(subdirs) + len(mounts) - 1
+            if subdirs or mounts or self.outstanding == 0:
+                self.work_available.notify_all()
+            checkpoint_due = self.checkpoint is not None and self.checkpoint.note_commit()
+        
+        if checkpoint_due and self.outstanding:
+            self.checkpoint.save(self)
+        
+        # Progress is sampled by ProgressReporter; per-file lines only with --verbose
+        if matches and logger.isEnabledFor(logging.DEBUG):
+            for file_info in matches:
+                logger.debug(f"Large file found: {file_info.path} ({self.cleanup.format_size(file_info.size)})")
+    
+    def frontier(self) -> List[str]:
+        """
+        Every directory not yet committed: queued, on an overflow stack, or
+        being listed right now.
+        
+        The caller must hold ``commit_lock``; the worker locks are taken here
+        so no directory is in flight between two workers while reading.
+        
+        Returns:
+            List of directory paths
+        """
+        for worker in self.workers:
+            worker.lock.acquire()
+        try:
+            pending: List[str] = []
+            for worker in self.workers:
+                if worker.current is not None:
+                    pending.append(worker.current)
+                pending.extend(worker.queue)
+                pending.extend(worker.overflow)
+            return pending
+        finally:
+            for worker in reversed(self.workers):
+                worker.lock.release()
+    
+    def _route(self, directory: str, subdir_entries: List[Tuple[str, int]], device: int,
+               counters: ScanCounters) -> Tuple[List[str], List[Tuple[str, int]]]:
+        """Split (name, st_dev) subdirectories into same-device paths and mount points."""
+        subdirs: List[str] = []
+        mounts: List[Tuple[str, int]] = []
+        for name, subdir_device in subdir_entries:
+            path = os.path.join(directory, name)
+            if subdir_device == device:
+                subdirs.append(path)
+            elif self.cleanup.one_file_system:
+                counters.mount_points_skipped += 1
+                self.cleanup.logger.info(f"⏭️  Not crossing into mount point {path}")
+            else:
+                mounts.append((path, subdir_device))
+        return subdirs, mounts
+    
+    def scan_one(self, directory: str, device: int = 0) -> Tuple[List[FileInfo], List[str],
+                                                                 List[Tuple[str, int]], ScanCounters]:
+        """
+        List a single directory on ``device`` with os.scandir.
+        
+        File sizes come from the DirEntry stat cache, so each file costs one
+        stat call at most (none on platforms where readdir returns it).
+        Subdirectories cost one lstat for their st_dev, which is how mount
+        points are found. With a scan index, directories whose mtime and inode
+        are unchanged are served from the index without being listed.
+        
+        Returns:
+            Tuple of (large files, subdirectories to descend into,
+            (mount point, st_dev) pairs on other devices, counters)
+        """
+        cleanup = self.cleanup
+        index = cleanup.scan_index
+        counters = ScanCounters()
+        matches: List[FileInfo] = []
+        subdir_entries: List[Tuple[str, int]] = []
+        dir_stat = None
+        classifier = cleanup.classifier
+        has_type_filters = cleanup.has_type_filters
+        build_cache = classifier.directory_category(directory)
+        
+        if cleanup.stat_limiter is not None:
+            cleanup.stat_limiter.take()  # the directory's own stat or open
+        if index is not None:
+            try:
+                dir_stat = os.stat(directory)
+            except OSError:
+                dir_stat = None  # os.scandir below reports the error
+            
+            timings = cleanup.call_timings
+            if timings is not None:
+                started = time.perf_counter_ns()
+            cached = (index.lookup(directory, dir_stat, cleanup.min_size_bytes, classifier.sniff)
+                      if dir_stat else None)
+            if timings is not None:
+                timings.add('index', time.perf_counter_ns() - started)
+            if cached is not None:
+                cached_subdirs, cached_files, totals, file_types, cached_links = cached
+                counters.directories_scanned += 1
+                counters.directories_from_cache += 1
+                counters.files_scanned, counters.bytes_scanned, counters.allocated_bytes = totals
+                counters.file_types = file_types
+                if has_type_filters:
+                    # Same totals as a listing that skipped these files before the stat
+                    for category in [c for c in file_types if not cleanup.passes_type_filters(c)]:
+                        files, apparent, allocated = file_types.pop(category)
+                        counters.type_filtered += files
+                        counters.bytes_scanned -= apparent
+                        counters.allocated_bytes -= allocated
+                subdirs, mounts = self._route(
+                    directory, [(name, dev) for name, dev in cached_subdirs if cleanup.should_scan_directory(name)],
+                    device, counters
+                )
+                # Every multiply-linked file goes to the commit-time claim, as
+                # in a listing, so links seen elsewhere come off the totals
+                for (name, size, modified_time, allocated, file_device, inode, nlink, uid,
+                     accessed_time, changed_time) in cached_files:
+                    large = size >= cleanup.min_size_bytes
+                    if not large and nlink <= 1:
+                        continue
+                    path = os.path.join(directory, name)
+                    category = None
+                    if has_type_filters or nlink > 1:
+                        category = build_cache or classifier.classify_name(name) or classifier.sniff_file(path)
+                        if has_type_filters and not cleanup.passes_type_filters(category):
+                            continue
+                    file_info = None
+                    if large:
+                        file_info = FileInfo(path=path, size=size,
+                                             modified_time=modified_time, allocated_size=allocated,
+                                             device=file_device, inode=inode, nlink=nlink, uid=uid,
+                                             accessed_time=accessed_time, changed_time=changed_time)
+                        matches.append(file_info)
+                    if nlink > 1:
+                        counters.add_hard_link(file_device, inode, size, allocated, file_info, category)
+                for key, size, allocated, category in cached_links:
+                    if has_type_filters and not cleanup.passes_type_filters(category):
+                        continue  # already out of the totals with the rest of its type
+                    if counters.hard_links is None:
+                        counters.hard_links = []
+                    counters.hard_links.append((key, size, allocated, None, category))
+                counters.large_files_found += len(matches)
+                if cleanup.has_age_filters and matches:
+                    matches = self._filter_age(matches, counters)
+                return matches, subdirs, mounts, counters
+        
+        file_types = counters.file_types = {}
+        try:
+            with os.scandir(directory) as entries:
+                counters.directories_scanned += 1
+                for entry in entries:
+                    if self._should_stop():
+                        dir_stat = None  # partial listing, keep it out of the index
+                        break
+                    
+                    try:
+                        # Same classification as os.walk: symlinked directories
+                        # are neither descended into nor counted as files
+                        is_dir = entry.is_dir()
+                        if is_dir:
+                            if not entry.is_symlink() and cleanup.should_scan_directory(entry.name):
+                                if cleanup.stat_limiter is not None:
+                                    cleanup.stat_limiter.take()
+                                try:
+                                    subdir_device = entry.stat(follow_symlinks=False).st_dev
+                                except OSError:
+                                    subdir_device = device  # scanning it will report the error
+                                subdir_entries.append((entry.name, subdir_device))
+                            continue
+                    except OSError:
+                        pass
+                    
+                    counters.files_scanned += 1
+                    category = build_cache or classifier.classify_name(entry.name)
+                    if category is None:
+                        try:
+                            is_file = entry.is_file()
+                        except OSError:
+                            is_file = False
+                        category = classifier.sniff_file(entry.path) if is_file else classifier.UNKNOWN
+                    if has_type_filters and not cleanup.passes_type_filters(category):
+                        counters.type_filtered += 1  # decided without a stat
+                        continue
+                    
+                    apparent, allocated = counters.bytes_scanned, counters.allocated_bytes
+                    file_info = cleanup.get_file_info(entry.path, entry=entry, counters=counters,
+                                                      category=category)
+                    totals = file_types.get(category)
+                    if totals is None:
+                        totals = file_types[category] = [0, 0, 0]
+                    totals[0] += 1
+                    totals[1] += counters.bytes_scanned - apparent
+                    totals[2] += counters.allocated_bytes - allocated
+                    if file_info and file_info.is_accessible and file_info.size >= cleanup.min_size_bytes:
+                        matches.append(file_info)
+                        counters.large_files_found += 1
+            
+            # A listing that skipped files by type has incomplete totals
+            if index is not None and dir_stat is not None and not has_type_filters:
+                counters.directories_rescanned += 1
+                if cleanup.call_timings is not None:
+                    with cleanup.call_timings.phase('index'):
+                        index.record(directory, dir_stat, subdir_entries, matches, cleanup.min_size_bytes,
+                                     counters, classifier.sniff)
+                else:
+                    index.record(directory, dir_stat, subdir_entries, matches, cleanup.min_size_bytes, counters,
+                                 classifier.sniff)
+        
+        except PermissionError as e:
+            counters.permission_errors += 1
+            cleanup.logger.warning(f"Permission denied accessing directory {directory}: {str(e)}")
+        except OSError as e:
+            counters.io_errors += 1
+            cleanup.logger.warning(f"OS error accessing directory {directory}: {str(e)}")
+        
+        # The index keeps every file over the size threshold; age filters
+        # only apply to this run
+        if cleanup.has_age_filters and matches:
+            matches = self._filter_age(matches, counters)
+        subdirs, mounts = self._route(directory, subdir_entries, device, counters)
+        return matches, subdirs, mounts, counters
+    
+    def _filter_age(self, matches: List[FileInfo], counters: ScanCounters) -> List[FileInfo]:
+        """Drop matches that are too recent for --older-than / --not-accessed-since."""
+        cleanup = self.cleanup
+        kept = [f for f in matches if cleanup.passes_age_filters(f.modified_time, f.accessed_time)]
+        if len(kept) == len(matches):
+            return matches
+        counters.age_filtered += len(matches) - len(kept)
+        counters.large_files_found -= len(matches) - len(kept)
+        if counters.hard_links:
+            # A filtered file is still a link to count once, just not a match
+            kept_ids = {id(f) for f in kept}
+            counters.hard_links = [(key, size, allocated, f if f is not None and id(f) in kept_ids else None,
+                                    category)
+                                   for key, size, allocated, f, category in counters.hard_links]
+        return kept
+
+
+class DirectoryAggregator:
+    """
+    Bottom-up subtree size rollups for --aggregate-dirs.
+    
+    When a directory is committed it becomes a node holding the file count,
+    apparent bytes and allocated bytes (``st_blocks``) of its own files, plus
+    the number of subdirectories still pending. Once that number reaches zero
+    the subtree is complete: its totals are offered to a top-N heap, added to
+    the parent node and the node is dropped. Only directories with an
+    unfinished subtree are kept, i.e. the ancestors of the walk frontier, so
+    memory does not grow with the number of directories scanned.
+    """
+    
+    def __init__(self, roots: List[Union[Path, str]], top_n: int = 20):
+        self.roots = {str(root) for root in roots}
+        self.top_n = top_n
+        # path -> [pending subdirectories, files, apparent bytes, allocated bytes]
+        self._nodes: Dict[str, List[int]] = {}
+        self._heap: List[Tuple[int, int, int, str]] = []
+        self.root_totals: Dict[str, Tuple[int, int, int]] = {}
+        self.completed_directories = 0
+        self.peak_open_nodes = 0
+    
+    def commit(self, directory: str, subdir_count: int, counters: ScanCounters):
+        """Record one listed directory; called under the engine's ``commit_lock``."""
+        node = [subdir_count, counters.files_scanned, counters.bytes_scanned, counters.allocated_bytes]
+        if subdir_count:
+            self._nodes[directory] = node
+            self.peak_open_nodes = max(self.peak_open_nodes, len(self._nodes))
+            return
+        
+        # Walk up while each completed subtree finishes its parent too
+        while True:
+            _, files, apparent, allocated = node
+            self.completed_directories += 1
+            if directory in self.roots:
+                self.root_totals[directory] = (files, apparent, allocated)
+                return
+            
+            item = (allocated, apparent, files, directory)
+            if len(self._heap) < self.top_n:
+                heapq.heappush(self._heap, item)
+            elif item > self._heap[0]:
+                heapq.heapreplace(self._heap, item)
+            
+            parent_path = os.path.dirname(directory)
+            parent = self._nodes.get(parent_path)
+            if parent is None:
+                return
+            parent[0] -= 1
+            parent[1] += files
+            parent[2] += apparent
+            parent[3] += allocated
+            if parent[0]:
+                return
+            del self._nodes[parent_path]
+            directory, node = parent_path, parent
+    
+    def top(self) -> List[Dict[str, Any]]:
+        """
+        Heaviest completed subtrees by allocated size, largest first.
+        
+        Returns:
+            List of dicts with path, files, apparent_bytes and allocated_bytes
+        """
+        return [{"path": path, "files": files, "apparent_bytes": apparent, "allocated_bytes": allocated}
+                for allocated, apparent, files, path in sorted(self._heap, reverse=True)]
+    
+    def state(self) -> Dict[str, Any]:
+        """Copy of the open nodes and top-N heap, for checkpoints."""
+        return {"nodes": {path: list(node) for path, node in self._nodes.items()},
+                "heap": list(self._heap), "root_totals": dict(self.root_totals)}
+    
+    def restore(self, state: Dict[str, Any]):
+        """Reload the ``state()`` of an interrupted scan."""
+        self._nodes = {path: list(node) for path, node in state["nodes"].items()}
+        self._heap = [tuple(item) for item in state["heap"]]
+        heapq.heapify(self._heap)
+        self.root_totals = {path: tuple(totals) for path, totals in state["root_totals"].items()}
+
+
+class RootBreakdown:
+    """
+    Per-root totals for a scan over several roots.
+    
+    Roots never overlap (see ``collapse_roots``), so the root owning a
+    directory is the nearest one at or before it in sorted order; a bisect
+    over the sorted, separator-terminated root paths finds it without
+    walking up the directory's parents.
+    """
+    
+    FIELDS = ('directories', 'files', 'bytes_scanned', 'allocated_bytes', 'large_files', 'large_bytes')
+    
+    def __init__(self, roots: List[Union[Path, str]]):
+        self.roots = [str(root) for root in roots]
+        ordered = sorted(self.roots, key=self._key)
+        self._keys = [self._key(root) for root in ordered]
+        self._ordered = ordered
+        self.totals: Dict[str, List[int]] = {root: [0] * len(self.FIELDS) for root in self.roots}
+    
+    @staticmethod
+    def _key(path: str) -> str:
+        return path.rstrip(os.sep) + os.sep
+    
+    def root_of(self, directory: str) -> Optional[str]:
+        """The root ``directory`` was reached from, or None if it is outside every root."""
+        key = self._key(directory)
+        i = bisect_right(self._keys, key) - 1
+        if i >= 0 and key.startswith(self._keys[i]):
+            return self._ordered[i]
+        return None
+    
+    def commit(self, directory: str, counters: ScanCounters, matches: List[FileInfo]):
+        """Add one committed directory to its root; called under the engine's ``commit_lock``."""
+        root = self.root_of(directory)
+        if root is None:
+            return
+        totals = self.totals[root]
+        totals[0] += counters.directories_scanned
+        totals[1] += counters.files_scanned
+        totals[2] += counters.bytes_scanned
+        totals[3] += counters.allocated_bytes
+        totals[4] += counters.large_files_found
+        totals[5] += sum(f.size for f in matches)
+    
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Per-root totals in the order the roots were given.
+        
+        Returns:
+            List of dicts with root, directories, files, bytes_scanned,
+            allocated_bytes, large_files and large_bytes
+        """
+        return [dict(zip(('root',) + self.FIELDS, [root] + self.totals[root])) for root in self.roots]
+    
+    def state(self) -> Dict[str, List[int]]:
+        """Copy of the totals, for checkpoints."""
+        return {root: list(totals) for root, totals in self.totals.items()}
+    
+    def restore(self, state: Dict[str, List[int]]):
+        """Reload the ``state()`` of an interrupted scan."""
+        for root, totals in state.items():
+            if root in self.totals:
+                self.totals[root] = list(totals)
+
+
+class ScanCheckpoint:
+    """
+    Periodic on-disk snapshot of an unfinished scan, used by --resume.
+    
+    A checkpoint holds the walk frontier, the matches committed so far, the
+    scan counters and the length of the --output file at that moment. It is
+    saved every ``interval`` seconds or ``every_directories`` committed
+    directories, whichever comes first, and once more when the scan is
+    interrupted. Saves go to a temporary file that is renamed over the old
+    checkpoint, so a crash mid-save keeps the previous one intact.
+    """
+    
+    VERSION = 5
+    
+    def __init__(self, checkpoint_path: Union[Path, str], interval: float = 60.0,
+                 every_directories: int = 10000, logger: Optional[logging.Logger] = None):
+        self.checkpoint_path = Path(checkpoint_path)
+        self.interval = interval
+        self.every_directories = every_directories
+        self.logger = logger or logging.getLogger(__name__)
+        self.roots: List[str] = []
+        self.min_size_bytes = 0
+        self.age_filters: List[Optional[float]] = [None, None]
+        self.type_filters: List[Optional[List[str]]] = [None, None]
+        self.sink: Optional['MatchSink'] = None
+        self.prior_runtime_seconds = 0.0
+        self._save_lock = threading.Lock()
+        self._last_saved = time.monotonic()
+        self._directories_since_save = 0
+        self._started = time.monotonic()
+    
+    def note_commit(self) -> bool:
+        """Count one committed directory; called under ``commit_lock``. Returns True when a save is due."""
+        self._directories_since_save += 1
+        return (self._directories_since_save >= self.every_directories or
+                time.monotonic() - self._last_saved >= self.interval)
+    
+    def snapshot(self, engine: ScanEngine) -> Dict[str, Any]:
+        """Capture the engine state; the caller must hold ``engine.commit_lock``."""
+        stats = engine.cleanup.stats
+        output = None
+        if self.sink is not None:
+            output = {
+                "path": str(self.sink.output_path),
+                "format": self.sink.output_format,
+                "offset": self.sink.tell(),
+                "records": self.sink.records_written,
+            }
+        return {
+            "version": self.VERSION,
+            "saved_at": datetime.now().isoformat(),
+            "roots": self.roots,
+            "min_size_bytes": self.min_size_bytes,
+            "age_filters": self.age_filters,
+            "type_filters": self.type_filters,
+            "runtime_seconds": self.prior_runtime_seconds + time.monotonic() - self._started,
+            "frontier": engine.frontier(),
+            "counters": {name: getattr(stats, name) for name in ScanCounters.TOTALS},
+            "file_types": {category: list(totals) for category, totals in stats.file_types.items()},
+            "hard_links": engine.hard_links.state(),
+            "errors_encountered": stats.errors_encountered,
+            "index_scan_id": engine.cleanup.scan_index.scan_id if engine.cleanup.scan_index else None,
+            "aggregates": engine.aggregator.state() if engine.aggregator is not None else None,
+            "root_totals": engine.breakdown.state() if engine.breakdown is not None else None,
+            "output": output,
+            "matches": engine.collector.rows(),
+        }
+    
+    def save(self, engine: ScanEngine) -> bool:
+        """
+        Snapshot the engine and write it to ``checkpoint_path``.
+        
+        Workers are paused only while the state is copied; serialising and
+        writing happen outside ``commit_lock``. Concurrent calls are dropped.
+        
+        Returns:
+            True if a checkpoint was written
+        """
+        import json
+        if not self._save_lock.acquire(blocking=False):
+            return False
+        try:
+            with engine.commit_lock:
+                state = self.snapshot(engine)
+                self._directories_since_save = 0
+                self._last_saved = time.monotonic()
+            
+            temp_path = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.checkpoint_path)
+            
+            with engine.cleanup.stats_lock:
+                engine.cleanup.stats.checkpoints_written += 1
+            self.logger.debug(f"Checkpoint saved: {len(state['frontier']):,} pending directories, "
+                              f"{len(state['matches']):,} matches")
+            return True
+        except OSError as e:
+            self.logger.error(f"Failed to write checkpoint {self.checkpoint_path}: {str(e)}")
+            return False
+        finally:
+            self._save_lock.release()
+    
+    def discard(self):
+        """Remove the checkpoint, and any half-written save, once the scan has finished."""
+        for path in (self.checkpoint_path, self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.warning(f"Could not remove checkpoint {path}: {str(e)}")
+    
+    @classmethod
+    def load(cls, checkpoint_path: Union[Path, str]) -> Dict[str, Any]:
+        """
+        Read a checkpoint written by ``save``.
+        
+        Returns:
+            The checkpoint state dictionary
+        """
+        import json
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if not isinstance(state, dict) or state.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported checkpoint file: {checkpoint_path}")
+        return state
+
+
+class ScanIndex:
+    """
+    Persistent SQLite index of previously scanned directories.
+    
+    Each directory row stores the mtime, inode and device seen when it was
+    last listed, the subdirectories it contained, its file totals by type,
+    the large files directly inside it and the inodes of its smaller
+    multiply-linked files, so cached directories count hard links exactly
+    as a listing would. A directory whose mtime and inode are
+    unchanged has had no entries added, removed or renamed, so its cached
+    rows can be reused without listing it again. Changes to the size or
+    access time of an existing file do not touch the directory mtime and are
+    only picked up when the directory is rescanned for another reason.
+    """
+    
+    SCHEMA_VERSION = 8
+    
+    # Directories modified this close to the scan start may still change within
+    # the same timestamp tick, so they are never served from the index
+    MTIME_SLACK_NS = 2 * 1_000_000_000
+    
+    def __init__(self, index_path: Path, logger: logging.Logger, scan_id: Optional[int] = None):
+        import sqlite3
+        self.index_path = Path(index_path)
+        self.logger = logger
+        self.lock = threading.Lock()
+        # A resumed scan keeps the interrupted run's id, so directories visited
+        # before the interruption are not pruned as stale at the end
+        self.scan_id = scan_id if scan_id is not None else time.time_ns()
+        self.scan_start_ns = time.time_ns()
+        self.pending_writes = 0
+        
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.index_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._ensure_schema()
+    
+    def _ensure_schema(self):
+        """Create the tables, discarding an index written by another schema version."""
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if row is None or int(row[0]) != self.SCHEMA_VERSION:
+            if row is not None:
+                self.logger.info(f"Scan index schema changed, rebuilding {self.index_path}")
+            self.conn.execute("DROP TABLE IF EXISTS directories")
+            self.conn.execute("DROP TABLE IF EXISTS files")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('schema_version', ?)",
+                              (str(self.SCHEMA_VERSION),))
+        
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS directories (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                device INTEGER NOT NULL,
+                min_size INTEGER NOT NULL,
+                subdirs TEXT NOT NULL,
+                file_count INTEGER NOT NULL,
+                apparent_bytes INTEGER NOT NULL,
+                allocated_bytes INTEGER NOT NULL,
+                file_types TEXT NOT NULL,
+                hard_links TEXT NOT NULL,
+                sniffed INTEGER NOT NULL,
+                scan_id INTEGER NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                directory TEXT NOT NULL,
+                name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                modified_time REAL NOT NULL,
+                allocated_size INTEGER NOT NULL,
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                nlink INTEGER NOT NULL,
+                uid INTEGER,
+                accessed_time REAL,
+                changed_time REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS files_directory ON files (directory)")
+        self.conn.commit()
+    
+    def lookup(self, directory: str, dir_stat: os.stat_result, min_size: int,
+               sniffed: bool = False) -> Optional[Tuple[List[List[Any]],
+                                                        List[Tuple[str, int, float, int, int, int, int,
+                                                                   Optional[int], Optional[float], Optional[float]]],
+                                                        Tuple[int, int, int], Dict[str, List[int]],
+                                                        List[List[Any]]]]:
+        """
+        Return cached (subdirectories, file rows, totals, file types, hard links) if the directory is unchanged.
+        
+        Subdirectories are [name, st_dev] pairs. File rows are (name, size,
+        modified_time, allocated_size, device, inode, nlink, uid,
+        accessed_time, changed_time). Totals are the (file count, apparent
+        bytes, allocated bytes) of every file directly inside the directory,
+        large or not, and file types split the same totals by category.
+        Hard links are [(st_dev << 64) | st_ino, size, allocated_size,
+        category] for the multiply-linked files not among the file rows.
+        
+        Rows recorded with a higher size threshold than ``min_size``, or
+        without sniffing when ``sniffed`` is set, are incomplete for this
+        run and are treated as stale.
+        """
+        import json
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT mtime_ns, inode, device, min_size, subdirs, file_count, apparent_bytes, allocated_bytes, "
+                "file_types, sniffed, hard_links FROM directories WHERE path = ?",
+                (directory,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            mtime_ns, inode, device, cached_min_size, subdirs = row[:5]
+            if (mtime_ns != dir_stat.st_mtime_ns or inode != dir_stat.st_ino or
+                    device != dir_stat.st_dev or cached_min_size > min_size or row[9] < sniffed):
+                return None
+            
+            files = self.conn.execute(
+                "SELECT name, size, modified_time, allocated_size, device, inode, nlink, uid, "
+                "accessed_time, changed_time FROM files WHERE directory = ?",
+                (directory,)
+            ).fetchall()
+            self.conn.execute("UPDATE directories SET scan_id = ? WHERE path = ?",
+                              (self.scan_id, directory))
+            self._count_write()
+        
+        return json.loads(subdirs), files, tuple(row[5:8]), json.loads(row[8]), json.loads(row[10])
+    
+    def record(self, directory: str, dir_stat: os.stat_result, subdirs: List[Tuple[str, int]],
+               matches: List[FileInfo], min_size: int, counters: ScanCounters, sniffed: bool = False):
+        """Store the result of a full listing of ``directory``."""
+        import json
+        mtime_ns = dir_stat.st_mtime_ns
+        if mtime_ns >= self.scan_start_ns - self.MTIME_SLACK_NS:
+            mtime_ns = -1  # never matches, so the directory is listed again next run
+        
+        rows = [(directory, os.path.basename(f.path), f.size, f.modified_time,
+                 f.allocated_size if f.allocated_size is not None else f.size, f.device, f.inode, f.nlink,
+                 f.uid, f.accessed_time, f.changed_time)
+                for f in matches]
+        # Links below the size threshold have no FileInfo and no file row
+        hard_links = [[key, size, allocated, category]
+                      for key, size, allocated, file_info, category in counters.hard_links or ()
+                      if file_info is None]
+        
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (directory, mtime_ns, dir_stat.st_ino, dir_stat.st_dev, min_size,
+                 json.dumps(subdirs), counters.files_scanned, counters.bytes_scanned,
+                 counters.allocated_bytes, json.dumps(counters.file_types or {}), json.dumps(hard_links),
+                 int(sniffed), self.scan_id)
+            )
+            self.conn.execute("DELETE FROM files WHERE directory = ?", (directory,))
+            if rows:
+                self.conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._count_write()
+    
+    def directory_count(self, roots: List[Path]) -> int:
+        """Number of indexed directories under ``roots``, used as the expected total for ETAs."""
+        total = 0
+        with self.lock:
+            for root in roots:
+                root_str = str(root)
+                lower, upper = root_str.rstrip(os.sep) + os.sep, root_str.rstrip(os.sep) + '0'
+                total += self.conn.execute(
+                    "SELECT COUNT(*) FROM directories WHERE path = ? OR (path >= ? AND path < ?)",
+                    (root_str, lower, upper)
+                ).fetchone()[0]
+        return total
+    
+    def _count_write(self):
+        # Caller holds self.lock; commit in batches to keep transactions short
+        self.pending_writes += 1
+        if self.pending_writes >= 1000:
+            self.conn.commit()
+            self.pending_writes = 0
+    
+    def close(self, roots: List[Path], completed: bool):
+        """
+        Commit outstanding writes and close the index.
+        
+        After a complete scan, rows under ``roots`` that were not visited are
+        removed; an interrupted scan keeps them for the next run.
+        """
+        with self.lock:
+            try:
+                if completed:
+                    for root in roots:
+                        root_str = str(root)
+                        # '/' sorts directly before '0', so this range is every
+                        # path strictly below root
+                        lower, upper = root_str.rstrip(os.sep) + os.sep, root_str.rstrip(os.sep) + '0'
+                        stale = "(path = ? OR (path >= ? AND path < ?)) AND scan_id != ?"
+                        args = (root_str, lower, upper, self.scan_id)
+                        self.conn.execute(
+                            f"DELETE FROM files WHERE directory IN (SELECT path FROM directories WHERE {stale})",
+                            args
+                        )
+                        self.conn.execute(f"DELETE FROM directories WHERE {stale}", args)
+                self.conn.commit()
+            finally:
+                self.conn.close()
+
+AGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400, 'y': 365 * 86400}
+
+
+def parse_age_cutoff(value: str, now: Optional[float] = None) -> float:
+    """
+    Turn an age such as ``90d``, ``12h``, ``6w`` or ``1y`` (a bare number is
+    days), or an ISO date such as ``2024-01-31``, into an epoch cutoff.
+    
+    Returns:
+        Epoch seconds; a file last touched before this is old enough
+    """
+    text = value.strip().lower()
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([smhdwy]?)', text)
+    if match:
+        seconds = float(match.group(1)) * AGE_UNITS[match.group(2) or 'd']
+        return (now if now is not None else time.time()) - seconds
+    try:
+        return datetime.fromisoformat(value.strip()).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid age or date: {value!r} (use e.g. 90d, 12h, 6w, 1y or 2024-01-31)") from None
+
+
+class StalenessScore:
+    """
+    Ranking key for --rank-by staleness: reclaimable bytes x idle days ** weight.
+    
+    A file's idle time runs from the later of its access and modification
+    times, since atime is never updated on noatime mounts and at most daily
+    under relatime. ``age_weight`` 0 ranks by reclaimable bytes alone; higher
+    weights favour old files over big ones. Hard links that free nothing on
+    deletion score 0.
+    """
+    
+    def __init__(self, age_weight: float = 1.0, now: Optional[float] = None):
+        self.age_weight = age_weight
+        self.now = now if now is not None else time.time()
+    
+    @staticmethod
+    def last_used(modified_time: float, accessed_time: Optional[float]) -> float:
+        return max(modified_time, accessed_time) if accessed_time is not None else modified_time
+    
+    def idle_days(self, file_info: FileInfo) -> float:
+        return max(0.0, (self.now - self.last_used(file_info.modified_time, file_info.accessed_time)) / 86400)
+    
+    def __call__(self, file_info: FileInfo) -> float:
+        return file_info.reclaimable_size * self.idle_days(file_info) ** self.age_weight
+
+
+class ResultCollector:
+    """Keeps every large file found, optionally streaming each one to a sink."""
+    
+    def __init__(self, sink: Optional['MatchSink'] = None):
+        self.sink = sink
+        self._files: List[FileInfo] = []
+    
+    def add(self, file_info: FileInfo):
+        if self.sink is not None:
+            self.sink.write(file_info)
+        self._files.append(file_info)
+    
+    def files(self) -> List[FileInfo]:
+        return self._files
+    
+    ROW_FIELDS = ('path', 'size', 'modified_time', 'allocated_size', 'device', 'inode', 'nlink', 'uid',
+                  'accessed_time', 'changed_time')
+    
+    def rows(self) -> List[Tuple]:
+        """Kept files as tuples of ROW_FIELDS, for checkpoints."""
+        return [tuple(getattr(f, field) for field in self.ROW_FIELDS) for f in self.files()]
+    
+    def restore(self, rows):
+        """Re-add rows from a checkpoint; they already reached the sink last run."""
+        sink, self.sink = self.sink, None
+        try:
+            for row in rows:
+                self.add(FileInfo(**dict(zip(self.ROW_FIELDS, row))))
+        finally:
+            self.sink = sink
+
+
+class TopKCollector(ResultCollector):
+    """
+    Keeps only the ``k`` highest-ranked files in a fixed-size min-heap.
+    
+    Files are ranked by size, or by ``key`` (e.g. a StalenessScore) when
+    given. Memory stays proportional to ``k`` however many files match;
+    every match still reaches the sink, if one is configured.
+    """
+    
+    def __init__(self, k: int, sink: Optional['MatchSink'] = None, key=None):
+        super().__init__(sink)
+        self.k = k
+        self.key = key
+        self._heap: List[Tuple[int, int, FileInfo]] = []
+        self._sequence = itertools.count()
+    
+    def add(self, file_info: FileInfo):
+        if self.sink is not None:
+            self.sink.write(file_info)
+        
+        rank = self.key(file_info) if self.key is not None else file_info.size
+        item = (rank, next(self._sequence), file_info)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif rank > self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+    
+    def files(self) -> List[FileInfo]:
+        """Return the kept files, highest ranked first."""
+        return [item[2] for item in sorted(self._heap, reverse=True)]
+
+
+class CompactFileInfo:
+    """Read-only FileInfo view over one row of a CompactFileStore."""
+    
+    __slots__ = ('_store', '_row')
+    
+    # Only accessible files are ever stored
+    is_accessible = True
+    error_message = None
+    
+    def __init__(self, store: 'CompactFileStore', row: int):
+        self._store = store
+        self._row = row
+    
+    @property
+    def path(self) -> str:
+        return self._store.path(self._row)
+    
+    @property
+    def size(self) -> int:
+        return self._store.sizes[self._row]
+    
+    @property
+    def modified_time(self) -> float:
+        return self._store.mtimes_ns[self._row] / 1e9
+    
+    @property
+    def allocated_size(self) -> Optional[int]:
+        allocated = self._store.allocated[self._row]
+        return allocated if allocated >= 0 else None
+    
+    @property
+    def device(self) -> int:
+        return self._store.devices[self._row]
+    
+    @property
+    def inode(self) -> int:
+        return self._store.inodes[self._row]
+    
+    @property
+    def nlink(self) -> int:
+        return self._store.nlinks[self._row]
+    
+    @property
+    def uid(self) -> Optional[int]:
+        uid = self._store.uids[self._row]
+        return uid if uid >= 0 else None
+    
+    @property
+    def accessed_time(self) -> Optional[float]:
+        accessed = self._store.atimes_ns[self._row]
+        return accessed / 1e9 if accessed != CompactFileStore.UNKNOWN_TIME else None
+    
+    @property
+    def changed_time(self) -> Optional[float]:
+        changed = self._store.ctimes_ns[self._row]
+        return changed / 1e9 if changed != CompactFileStore.UNKNOWN_TIME else None
+    
+    @property
+    def reclaimable_size(self) -> int:
+        if self.nlink > 1:
+            return 0
+        allocated = self.allocated_size
+        return allocated if allocated is not None else self.size
+    
+    def __repr__(self) -> str:
+        return f"CompactFileInfo(path={self.path!r}, size={self.size}, modified_time={self.modified_time})"
+
+
+class CompactFileStore:
+    """
+    Struct-of-arrays storage for large result sets.
+    
+    Parent directories are interned once, basenames are packed UTF-8 in a
+    single bytearray, and sizes, m/a/ctimes (in nanoseconds), allocated
+    sizes, devices, inodes, link counts and owners live in typed ``array``
+    columns. A row costs roughly the basename length plus 80 bytes instead
+    of a FileInfo dataclass with its own ``__dict__`` and full path string.
+    Indexing and iteration yield CompactFileInfo views, so the store can be
+    passed wherever a list of FileInfo is expected.
+    """
+    
+    UNKNOWN_TIME = -(1 << 63)
+    
+    def __init__(self):
+        self._directory_ids: Dict[str, int] = {}
+        self.directories: List[str] = []
+        self.parents = array('I')
+        self.name_offsets = array('q', [0])
+        self.names = bytearray()
+        self.sizes = array('q')
+        self.mtimes_ns = array('q')
+        self.allocated = array('q')  # -1 when unknown
+        self.devices = array('Q')
+        self.inodes = array('Q')
+        self.nlinks = array('I')
+        self.uids = array('q')  # -1 when unknown
+        self.atimes_ns = array('q')  # UNKNOWN_TIME when unknown
+        self.ctimes_ns = array('q')
+    
+    def append(self, path: str, size: int, modified_time: float, allocated_size: Optional[int] = None,
+               device: int = 0, inode: int = 0, nlink: int = 1, uid: Optional[int] = None,
+               accessed_time: Optional[float] = None, changed_time: Optional[float] = None):
+        directory, name = os.path.split(path)
+        directory_id = self._directory_ids.get(directory)
+        if directory_id is None:
+            directory_id = len(self.directories)
+            self._directory_ids[directory] = directory_id
+            self.directories.append(directory)
+        
+        self.parents.append(directory_id)
+        self.names += name.encode('utf-8', 'surrogateescape')
+        self.name_offsets.append(len(self.names))
+        self.sizes.append(size)
+        self.mtimes_ns.append(round(modified_time * 1e9))
+        self.allocated.append(allocated_size if allocated_size is not None else -1)
+        self.devices.append(device)
+        self.inodes.append(inode)
+        self.nlinks.append(nlink)
+        self.uids.append(uid if uid is not None else -1)
+        self.atimes_ns.append(round(accessed_time * 1e9) if accessed_time is not None else self.UNKNOWN_TIME)
+        self.ctimes_ns.append(round(changed_time * 1e9) if changed_time is not None else self.UNKNOWN_TIME)
+    
+    def path(self, row: int) -> str:
+        name = self.names[self.name_offsets[row]:self.name_offsets[row + 1]]
+        return os.path.join(self.directories[self.parents[row]],
+                            name.decode('utf-8', 'surrogateescape'))
+    
+    def __len__(self) -> int:
+        return len(self.sizes)
+    
+    def __getitem__(self, row: int) -> CompactFileInfo:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("CompactFileStore index out of range")
+        return CompactFileInfo(self, row)
+    
+    def __iter__(self):
+        for row in range(len(self)):
+            yield CompactFileInfo(self, row)
+
+
+class CompactResultCollector(ResultCollector):
+    """Keeps every large file in a CompactFileStore instead of a list of dataclasses."""
+    
+    def __init__(self, sink: Optional['MatchSink'] = None):
+        super().__init__(sink)
+        self._store = CompactFileStore()
+    
+    def add(self, file_info: FileInfo):
+        if self.sink is not None:
+            self.sink.write(file_info)
+        self._store.append(file_info.path, file_info.size, file_info.modified_time,
+                           file_info.allocated_size, file_info.device, file_info.inode, file_info.nlink,
+                           file_info.uid, file_info.accessed_time, file_info.changed_time)
+    
+    def files(self) -> CompactFileStore:
+        return self._store
+
+
+class StreamingCollector(ResultCollector):
+    """
+    Hands each large file to a consumer through a bounded queue, for iter_scan.
+    
+    Nothing is kept. A full queue blocks the committing worker while it
+    holds ``commit_lock``, which pauses the whole walk until the consumer
+    catches up; cancelling the token releases it and drops the file.
+    """
+    
+    DONE = object()
+    
+    def __init__(self, cancel: CancelToken, sink: Optional['MatchSink'] = None, maxsize: int = 1024):
+        super().__init__(sink)
+        self.cancel = cancel
+        self.queue: 'queue.Queue' = queue.Queue(max(1, maxsize))
+    
+    def _put(self, item) -> bool:
+        while not self.cancel.cancelled:
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def add(self, file_info: FileInfo):
+        if self.sink is not None:
+            self.sink.write(file_info)
+        self._put(file_info)
+    
+    def close(self):
+        """Tell the consumer the scan is over."""
+        self._put(self.DONE)
+
+
+class MatchSink:
+    """
+    Buffered writer receiving every matching file as it is found.
+    
+    NDJSON and CSV go through a 1 MiB write buffer. Parquet, which needs
+    pyarrow, is written in row groups of ``ROW_GROUP_ROWS`` rows, so memory
+    stays bounded however many files match; it cannot be appended to and
+    is therefore not available with checkpoints. Owner names are looked up
+    once per uid.
+    """
+    
+    FORMATS = ('ndjson', 'csv', 'parquet')
+    FIELDS = ('path', 'size', 'modified_time', 'accessed_time', 'changed_time', 'allocated_size', 'device',
+              'inode', 'nlink', 'uid', 'owner')
+    ROW_GROUP_ROWS = 65536
+    
+    def __init__(self, output_path: Union[Path, str], output_format: Optional[str] = None,
+                 resume: Optional[Dict[str, Any]] = None):
+        self.output_path = Path(output_path)
+        output_format = self.infer_format(self.output_path, output_format)
+        if output_format not in self.FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        
+        self.output_format = output_format
+        self.records_written = 0
+        self._owners: Dict[int, Optional[str]] = {}
+        if output_format == 'parquet':
+            if resume is not None:
+                raise ValueError("Parquet output cannot be resumed from a checkpoint")
+            self._open_parquet()
+            return
+        
+        if resume is not None:
+            # Drop anything written after the checkpoint and append from there
+            self._file = open(self.output_path, 'r+', encoding='utf-8', newline='',
+                              buffering=1024 * 1024)
+            self._file.seek(resume["offset"])
+            self._file.truncate()
+            self.records_written = resume["records"]
+            if output_format == 'csv':
+                import csv
+                self._csv = csv.writer(self._file)
+            return
+        
+        self._file = open(self.output_path, 'w', encoding='utf-8', newline='',
+                          buffering=1024 * 1024)
+        if output_format == 'csv':
+            import csv
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.FIELDS)
+    
+    @staticmethod
+    def infer_format(output_path: Union[Path, str], output_format: Optional[str] = None) -> str:
+        """``output_format`` if given, else the format named by the file extension, else ndjson."""
+        if output_format is not None:
+            return output_format
+        suffix = Path(output_path).suffix.lower()
+        return {'.csv': 'csv', '.parquet': 'parquet'}.get(suffix, 'ndjson')
+    
+    @staticmethod
+    def parquet_available() -> bool:
+        import importlib.util
+        return importlib.util.find_spec('pyarrow') is not None
+    
+    def _open_parquet(self):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError("Parquet output needs pyarrow (pip install pyarrow)") from None
+        
+        self._arrow = pyarrow
+        self._schema = pyarrow.schema([
+            ("path", pyarrow.string()),
+            ("size", pyarrow.int64()),
+            ("modified_time", pyarrow.float64()),
+            ("accessed_time", pyarrow.float64()),
+            ("changed_time", pyarrow.float64()),
+            ("allocated_size", pyarrow.int64()),
+            ("device", pyarrow.uint64()),
+            ("inode", pyarrow.uint64()),
+            ("nlink", pyarrow.uint32()),
+            ("uid", pyarrow.int64()),
+            ("owner", pyarrow.string()),
+        ])
+        self._parquet = pyarrow.parquet.ParquetWriter(str(self.output_path), self._schema,
+                                                      compression='zstd')
+        self._columns: List[List[Any]] = [[] for _ in self.FIELDS]
+    
+    def owner(self, uid: Optional[int]) -> Optional[str]:
+        """User name for ``uid``, or None when it is unknown."""
+        if uid is None or pwd is None:
+            return None
+        if uid not in self._owners:
+            try:
+                self._owners[uid] = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                self._owners[uid] = None
+        return self._owners[uid]
+    
+    def write(self, file_info: FileInfo):
+        record = (file_info.path, file_info.size, file_info.modified_time, file_info.accessed_time,
+                  file_info.changed_time, file_info.allocated_size, file_info.device, file_info.inode,
+                  file_info.nlink, file_info.uid, self.owner(file_info.uid))
+        if self.output_format == 'csv':
+            self._csv.writerow(record)
+        elif self.output_format == 'parquet':
+            for column, value in zip(self._columns, record):
+                column.append(value)
+            if len(self._columns[0]) >= self.ROW_GROUP_ROWS:
+                self._flush_row_group()
+        else:
+            import json
+            self._file.write(json.dumps(dict(zip(self.FIELDS, record)), ensure_ascii=False))
+            self._file.write("\n")
+        self.records_written += 1
+    
+    def _flush_row_group(self):
+        if self._columns[0]:
+            self._parquet.write_table(self._arrow.Table.from_arrays(
+                [self._arrow.array(column, type=field.type)
+                 for column, field in zip(self._columns, self._schema)],
+                schema=self._schema
+            ))
+            self._columns = [[] for _ in self.FIELDS]
+    
+    def tell(self) -> int:
+        """Flush and return the current length of the output file."""
+        self._file.flush()
+        return self._file.tell()
+    
+    def close(self):
+        if self.output_format == 'parquet':
+            self._flush_row_group()
+            self._parquet.close()
+        else:
+            self._file.close()
+
+
+@dataclass
+class DuplicateGroup:
+    """Files with identical content."""
+    size: int
+    digest: str
+    files: List[FileInfo]
+    
+    @property
+    def reclaimable_bytes(self) -> int:
+        """Bytes freed by keeping a single copy; hard-linked copies free nothing."""
+        return sum(f.reclaimable_size for f in self.split_keeper()[1])
+    
+    def split_keeper(self) -> Tuple[FileInfo, List[FileInfo]]:
+        """Return (copy to keep, redundant copies); the oldest file is kept."""
+        ordered = sorted(self.files, key=lambda f: (f.modified_time, len(f.path), f.path))
+        return ordered[0], ordered[1:]
+
+    def keeper_is_regular_file(self) -> bool:
+        """True if the copy to keep is still a regular file, not a symlink or gone."""
+        try:
+            return stat.S_ISREG(os.lstat(self.split_keeper()[0].path).st_mode)
+        except OSError:
+            return False
+
+
+class DuplicateFinder:
+    """
+    Staged duplicate detection over a set of candidate files.
+    
+    1. Group by size; a file with a unique size cannot have a duplicate.
+       Symlinks are dropped (the scan follows them, so they look like a
+       copy of their target), and paths to the same inode count once.
+    2. Hash the first and last ``PARTIAL_BYTES`` of each remaining file.
+    3. Hash the full content of files that still collide. Files no larger
+       than two partial blocks were already read completely in stage 2.
+    
+    Hashing runs on a thread pool; hashlib and xxhash release the GIL on
+    large buffers, and full hashes read through mmap where possible.
+    """
+    
+    PARTIAL_BYTES = 64 * 1024
+    READ_BUFFER_BYTES = 4 * 1024 * 1024
+    
+    def __init__(self, cleanup: 'MacOSFileCleanup', workers: int = 4):
+        self.cleanup = cleanup
+        self.workers = max(1, workers)
+        self.hash_name = 'xxh3_128' if xxhash is not None else 'blake2b'
+    
+    def _new_full_hash(self):
+        if xxhash is not None:
+            return xxhash.xxh3_128()
+        import hashlib
+        return hashlib.blake2b(digest_size=32)
+    
+    def partial_hash(self, file_info: FileInfo) -> str:
+        """Hash of the first and last PARTIAL_BYTES of a file."""
+        import hashlib
+        limiter = self.cleanup.hash_limiter
+        if limiter is not None:
+            limiter.take(min(file_info.size, 2 * self.PARTIAL_BYTES))
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_info.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size != file_info.size:
+                raise OSError(f"File changed size during scan ({file_info.size} -> {size})")
+            digest.update(f.read(self.PARTIAL_BYTES))
+            if size > self.PARTIAL_BYTES:
+                f.seek(max(self.PARTIAL_BYTES, size - self.PARTIAL_BYTES))
+                digest.update(f.read(self.PARTIAL_BYTES))
+        return digest.hexdigest()
+    
+    def full_hash(self, file_info: FileInfo) -> str:
+        """Streaming hash of the whole file, through mmap when the file allows it."""
+        import mmap
+        digest = self._new_full_hash()
+        limiter = self.cleanup.hash_limiter
+        with open(file_info.path, 'rb') as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                mapped = None
+            
+            if mapped is not None:
+                with mapped:
+                    if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                        mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    with memoryview(mapped) as view:
+                        for offset in range(0, len(view), self.READ_BUFFER_BYTES):
+                            # The slice must be released before the mmap closes
+                            with view[offset:offset + self.READ_BUFFER_BYTES] as chunk:
+                                if limiter is not None:
+                                    limiter.take(len(chunk))
+                                digest.update(chunk)
+            else:
+                buffer = bytearray(self.READ_BUFFER_BYTES)
+                with memoryview(buffer) as view:
+                    while True:
+                        read = f.readinto(buffer)
+                        if not read:
+                            break
+                        if limiter is not None:
+                            limiter.take(read)
+                        digest.update(view[:read])
+        return digest.hexdigest()
+    
+    def _hash_groups(self, groups: List[List[FileInfo]], hash_fn,
+                     stage: str) -> List[Tuple[str, List[FileInfo]]]:
+        """Split each group by ``hash_fn`` and keep (digest, files) for 2+ files."""
+        buckets: Dict[Tuple[int, str], List[FileInfo]] = {}
+        candidates = [file_info for group in groups for file_info in group]
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hash") as pool:
+            futures = {pool.submit(hash_fn, file_info): file_info for file_info in candidates}
+            for future in as_completed(futures):
+                file_info = futures[future]
+                if self.cleanup.shutdown_requested:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    return []
+                try:
+                    digest = future.result()
+                except PermissionError as e:
+                    self.cleanup.stats.permission_errors += 1
+                    self.cleanup.stats.errors_encountered += 1
+                    self.cleanup.logger.warning(f"Permission denied hashing {file_info.path}: {str(e)}")
+                    continue
+                except OSError as e:
+                    self.cleanup.stats.io_errors += 1
+                    self.cleanup.stats.errors_encountered += 1
+                    self.cleanup.logger.warning(f"OS error hashing {file_info.path}: {str(e)}")
+                    continue
+                buckets.setdefault((file_info.size, digest), []).append(file_info)
+        
+        survivors = [(digest, group) for (_, digest), group in buckets.items() if len(group) > 1]
+        self.cleanup.logger.info(f"Duplicate scan ({stage}): {len(candidates):,} files hashed, "
+                                 f"{sum(len(g) for _, g in survivors):,} still colliding")
+        return survivors
+    
+    @staticmethod
+    def _distinct_files(group: List[FileInfo]) -> List[FileInfo]:
+        """Regular files in ``group``, one path per (st_dev, st_ino)."""
+        distinct: Dict[Tuple[int, int], FileInfo] = {}
+        for file_info in group:
+            try:
+                link_stat = os.lstat(file_info.path)
+            except OSError:
+                continue
+            if stat.S_ISREG(link_stat.st_mode):
+                distinct.setdefault((link_stat.st_dev, link_stat.st_ino), file_info)
+        return list(distinct.values())
+    
+    def find(self, files) -> List[DuplicateGroup]:
+        """
+        Find groups of identical files among ``files``.
+        
+        Returns:
+            DuplicateGroup list, most reclaimable bytes first
+        """
+        by_size: Dict[int, List[FileInfo]] = {}
+        for file_info in files:
+            if file_info.is_accessible and file_info.size > 0:
+                by_size.setdefault(file_info.size, []).append(file_info)
+        groups = [self._distinct_files(group) for group in by_size.values() if len(group) > 1]
+        groups = [group for group in groups if len(group) > 1]
+        self.cleanup.logger.info(f"Duplicate scan (size): {sum(len(g) for g in groups):,} files "
+                                 f"share a size with another file")
+        
+        partial = self._hash_groups(groups, self.partial_hash, "partial hash")
+        
+        # Files up to two partial blocks long were hashed in full already
+        confirmed = [(d, g) for d, g in partial if g[0].size <= 2 * self.PARTIAL_BYTES]
+        needs_full = [g for _, g in partial if g[0].size > 2 * self.PARTIAL_BYTES]
+        if needs_full and not self.cleanup.shutdown_requested:
+            confirmed.extend(self._hash_groups(needs_full, self.full_hash, f"full {self.hash_name}"))
+        
+        duplicates = [DuplicateGroup(size=group[0].size, digest=digest, files=group)
+                      for digest, group in confirmed]
+        duplicates.sort(key=lambda g: g.reclaimable_bytes, reverse=True)
+        return duplicates
+
+
+@contextmanager
+def queued_logging():
+    """
+    Route root logger output through a QueueListener for the duration of the block.
+    
+    Threads that log only enqueue the record; the file and console handlers
+    run on the listener thread, so log I/O never stalls the caller.
+    """
+    from logging.handlers import QueueHandler, QueueListener
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    root.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    try:
+        yield
+    finally:
+        listener.stop()
+        root.handlers = handlers
+
+
+def try_flock(fd: int, shared: bool = False) -> bool:
+    """
+    Take a non-blocking flock on ``fd``.
+    
+    Returns:
+        False if another process holds a conflicting lock; True otherwise,
+        including on platforms without flock
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    try:
+        fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class SegmentedFileHandler(logging.FileHandler):
+    """
+    FileHandler that starts a new segment once the current one reaches ``max_bytes``.
+    
+    The active segment keeps the base name, so the log path printed at the
+    end of a run stays valid; closed segments are renamed to
+    ``<stem>.<n><suffix>`` and passed to ``on_rotate``. The open segment
+    holds a shared flock, which tells other runs tidying the directory
+    that it is still being written.
+    """
+    
+    def __init__(self, filename: Union[Path, str], max_bytes: int = 0, on_rotate=None):
+        super().__init__(filename, encoding='utf-8')
+        self.max_bytes = max_bytes
+        self.on_rotate = on_rotate
+        self.segments = 0
+        try_flock(self.stream.fileno(), shared=True)
+    
+    def emit(self, record: logging.LogRecord):
+        super().emit(record)
+        if self.max_bytes and self.stream is not None and self.stream.tell() >= self.max_bytes:
+            self.rotate()
+    
+    def rotate(self):
+        """Close the current segment and continue in a new one; called with the handler lock held."""
+        self.stream.close()
+        self.segments += 1
+        base = Path(self.baseFilename)
+        closed = base.with_name(f"{base.stem}.{self.segments:03d}{base.suffix}")
+        try:
+            os.rename(base, closed)
+        except OSError:
+            closed = None  # keep appending to the same file
+        self.stream = self._open()
+        try_flock(self.stream.fileno(), shared=True)
+        if closed is not None and self.on_rotate is not None:
+            self.on_rotate(closed)
+
+
+class LogArchive:
+    """
+    Rotation, compression, pruning and the run index for LOG_DIRECTORY.
+    
+    Logs are written in segments of at most ``segment_bytes``. Closed
+    segments are compressed on a background thread with zstd when the
+    zstandard module is installed, otherwise gzip, so the run never waits
+    on it. Pruning is opt-in, since it also removes logs from before the
+    upgrade: with ``retention`` or ``max_total_bytes`` set, earlier runs'
+    logs that no process holds open are compressed too, then files older
+    than ``retention`` seconds are removed, and the oldest ones after that
+    until the directory fits in ``max_total_bytes``. This run's files, the
+    index and logs still being written are never removed. Every run
+    appends one line to INDEX_NAME with the headline numbers of its
+    summary, so recent runs can be listed from the tail of one small file
+    instead of opening every summary or log.
+    """
+    
+    INDEX_NAME = "summary_index.ndjson"
+    # Only files named the way this tool names them are compressed or pruned
+    MANAGED_NAME = re.compile(r'(?:file_cleanup|summary|fleet_summary)_\d{8}_\d{6}(?:\.\d{3})?\.(?:log|json)'
+                              r'(?:\.gz|\.zst)?(?:\.\d+\.tmp)?')
+    COMPRESSIONS = ('auto', 'zstd', 'gzip', 'none')
+    SUFFIXES = {'zstd': '.zst', 'gzip': '.gz'}
+    
+    def __init__(self, directory: Union[Path, str], segment_bytes: int = 50 * 1024 * 1024,
+                 retention: Optional[float] = None, max_total_bytes: Optional[int] = None,
+                 compression: str = 'auto', logger: Optional[logging.Logger] = None):
+        import importlib.util
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"Unknown log compression: {compression}")
+        zstd_available = importlib.util.find_spec('zstandard') is not None
+        if compression == 'auto':
+            compression = 'zstd' if zstd_available else 'gzip'
+        elif compression == 'zstd' and not zstd_available:
+            raise ValueError("zstd log compression needs the zstandard module (pip install zstandard)")
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.retention = retention
+        self.max_total_bytes = max_total_bytes
+        self.compression = compression
+        self.logger = logger or logging.getLogger(__name__)
+        self.protected: set = {self.index_path}
+        self.handler: Optional[SegmentedFileHandler] = None
+        self.files_compressed = 0
+        self.bytes_saved = 0
+        self.files_pruned = 0
+        self._queue: 'queue.SimpleQueue[Optional[Path]]' = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def index_path(self) -> Path:
+        return self.directory / self.INDEX_NAME
+    
+    def open_log(self, log_path: Union[Path, str]) -> SegmentedFileHandler:
+        """Create the handler for this run's log; its closed segments are compressed in the background."""
+        self.protected.add(Path(log_path))
+        self.handler = SegmentedFileHandler(log_path, self.segment_bytes, on_rotate=self._queue.put)
+        return self.handler
+    
+    @property
+    def prunes(self) -> bool:
+        return self.retention is not None or self.max_total_bytes is not None
+    
+    def start(self):
+        """Start the background thread, which compresses earlier runs' logs and prunes first when pruning is on."""
+        self._thread = threading.Thread(target=self._run, name="log-archive", daemon=True)
+        self._thread.start()
+    
+    def close(self):
+        """Wait for queued compression and pruning to finish."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self.files_compressed or self.files_pruned:
+            self.logger.info(f"🗜️  Logs: {self.files_compressed:,} files compressed with {self.compression} "
+                             f"({self.bytes_saved / (1024 * 1024):.1f} MB saved), {self.files_pruned:,} pruned")
+    
+    def _run(self):
+        if self.prunes:
+            try:
+                for path in sorted(self.directory.glob('file_cleanup_*.log')):
+                    if path not in self.protected and self.MANAGED_NAME.fullmatch(path.name):
+                        self.compress(path)
+                self.prune()
+            except Exception as e:
+                self.logger.warning(f"Log archive maintenance failed: {str(e)}")
+        while True:
+            path = self._queue.get()
+            if path is None:
+                return
+            self.compress(path)
+    
+    def compress(self, path: Path) -> Optional[Path]:
+        """
+        Replace a closed log with a compressed copy carrying the same mtime.
+        
+        Returns:
+            The compressed file, or None if compression is off or the log is
+            missing, in use by another run, or could not be compressed
+        """
+        if self.compression == 'none':
+            return None
+        target = path.with_name(path.name + self.SUFFIXES[self.compression])
+        temp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            with open(path, 'rb') as source:
+                if not try_flock(source.fileno()):
+                    return None  # another run is still writing it
+                source_stat = os.fstat(source.fileno())
+                with open(temp, 'wb') as out:
+                    if self.compression == 'zstd':
+                        import zstandard
+                        zstandard.ZstdCompressor(level=3).copy_stream(source, out)
+                    else:
+                        import gzip
+                        import shutil
+                        with gzip.GzipFile(filename=path.name, mode='wb', fileobj=out, compresslevel=6,
+                                           mtime=int(source_stat.st_mtime)) as compressed:
+                            shutil.copyfileobj(source, compressed, 1024 * 1024)
+                os.utime(temp, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+                os.replace(temp, target)
+                os.unlink(path)
+        except OSError as e:
+            if not isinstance(e, FileNotFoundError):
+                self.logger.warning(f"Could not compress log {path}: {str(e)}")
+            try:
+                temp.unlink()
+            except OSError:
+                pass
+            return None
+        self.files_compressed += 1
+        self.bytes_saved += max(0, source_stat.st_size - target.stat().st_size)
+        self.logger.debug(f"Compressed {path.name} -> {target.name}")
+        return target
+    
+    @staticmethod
+    def _in_use(path: Path) -> bool:
+        try:
+            with open(path, 'rb') as f:
+                return not try_flock(f.fileno())
+        except OSError:
+            return False
+    
+    def prune(self):
+        """Remove logs and summaries past ``retention``, then the oldest until under ``max_total_bytes``."""
+        now = time.time()
+        files = []
+        for path in self.directory.iterdir():
+            if not self.MANAGED_NAME.fullmatch(path.name):
+                continue
+            try:
+                path_stat = path.stat()
+            except OSError:
+                continue
+            files.append((path_stat.st_mtime, path_stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        
+        for modified_time, size, path in files:
+            expired = self.retention is not None and now - modified_time > self.retention
+            if not expired and (self.max_total_bytes is None or total <= self.max_total_bytes):
+                break
+            if path in self.protected or (path.suffix == '.log' and self._in_use(path)):
+                continue
+            if path.name.endswith('.tmp') and not expired:
+                continue  # may be another run's compression in progress
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            self.files_pruned += 1
+        if self.retention is not None:
+            self._compact_index(now - self.retention)
+    
+    def record_run(self, summary: Dict[str, Any], summary_path: Optional[Path], log_path: Optional[Path],
+                   roots: List[str]):
+        """Append this run's headline numbers to the index."""
+        import json
+        record = {
+            "time": datetime.now().isoformat(timespec='seconds'),
+            "status": summary["completion_status"],
+            "runtime_seconds": round(summary["runtime_seconds"], 3),
+            "roots": roots,
+            "files_scanned": summary["files_scanned"],
+            "bytes_scanned": summary["bytes_scanned"],
+            "large_files_found": summary["large_files_found"],
+            "files_deleted": summary["files_deleted"],
+            "bytes_freed": summary["bytes_freed"],
+            "errors": summary["errors"]["total"],
+            "interrupted": summary["interrupted"],
+            "summary": summary_path.name if summary_path else None,
+            "log": log_path.name if log_path else None,
+            "log_segments": self.handler.segments + 1 if self.handler else None,
+        }
+        if summary_path is not None:
+            self.protected.add(summary_path)
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            try_flock(f.fileno())
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    
+    def _compact_index(self, cutoff: float):
+        """Drop index lines older than ``cutoff``, keeping the file small."""
+        import json
+        try:
+            with open(self.index_path, 'r+', encoding='utf-8') as f:
+                if not try_flock(f.fileno()):
+                    return
+                first = f.readline()
+                try:
+                    if datetime.fromisoformat(json.loads(first)["time"]).timestamp() >= cutoff:
+                        return
+                except (ValueError, KeyError, TypeError):
+                    pass
+                f.seek(0)
+                kept = []
+                for line in f:
+                    try:
+                        if datetime.fromisoformat(json.loads(line)["time"]).timestamp() >= cutoff:
+                            kept.append(line)
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                f.seek(0)
+                f.writelines(kept)
+                f.truncate()
+        except FileNotFoundError:
+            pass
+    
+    @classmethod
+    def recent_runs(cls, directory: Union[Path, str], count: int = 10) -> List[Dict[str, Any]]:
+        """
+        The last ``count`` runs from the index, reading only the end of the file.
+        
+        Returns:
+            Index records, oldest first
+        """
+        import json
+        path = Path(directory) / cls.INDEX_NAME
+        try:
+            with open(path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                position = f.tell()
+                data = b''
+                while position > 0 and data.count(b'\n') <= count:
+                    step = min(64 * 1024, position)
+                    position -= step
+                    f.seek(position)
+                    data = f.read(step) + data
+        except FileNotFoundError:
+            return []
+        records = []
+        for line in data.splitlines()[-count:] if count else []:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # a line cut by the block boundary, or a torn write
+        return records
+
+
+class BulkDeleter:
+    """
+    Non-interactive deletion engine for large batches.
+    
+    Safety is checked once per file up front, then files are grouped by
+    parent directory and each group is unlinked on a worker thread, which
+    keeps directory updates on one thread per directory. Logging goes
+    through queued_logging() while the workers run.
+    """
+    
+    def __init__(self, cleanup: 'MacOSFileCleanup', workers: int = 8):
+        self.cleanup = cleanup
+        self.workers = max(1, workers)
+    
+    def validate(self, files) -> List[FileInfo]:
+        """Return the files that pass the safety rules, logging the rest."""
+        candidates = [f for f in files if f.is_accessible]
+        verdicts = self.cleanup.check_safety_batch([f.path for f in candidates])
+        
+        targets = []
+        for file_info, (is_safe, reason) in zip(candidates, verdicts):
+            if is_safe:
+                targets.append(file_info)
+            else:
+                self.cleanup.logger.warning(f"Skipping unsafe file {file_info.path}: {reason}")
+        return targets
+    
+    def _delete_group(self, group: List[FileInfo]) -> Tuple[int, int]:
+        deleted = 0
+        deleted_bytes = 0
+        for file_info in group:
+            if self.cleanup.shutdown_requested:
+                break
+            if self.cleanup.delete_file_safely(file_info, validated=True):
+                deleted += 1
+                deleted_bytes += file_info.reclaimable_size
+        return deleted, deleted_bytes
+    
+    def delete(self, files) -> Tuple[int, int, float]:
+        """
+        Validate and delete ``files``.
+        
+        Returns:
+            Tuple of (files deleted, bytes deleted, elapsed seconds)
+        """
+        started = time.perf_counter()
+        targets = self.validate(files)
+        
+        by_parent: Dict[str, List[FileInfo]] = {}
+        for file_info in targets:
+            by_parent.setdefault(os.path.dirname(file_info.path), []).append(file_info)
+        
+        deleted = 0
+        deleted_bytes = 0
+        with queued_logging():
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="unlink") as pool:
+                futures = [pool.submit(self._delete_group, group) for group in by_parent.values()]
+                for future in as_completed(futures):
+                    group_deleted, group_bytes = future.result()
+                    deleted += group_deleted
+                    deleted_bytes += group_bytes
+        
+        elapsed = time.perf_counter() - started
+        return deleted, deleted_bytes, elapsed
+
+
+class _AsyncOffload:
+    """
+    Runs blocking calls for asyncio code on a bounded thread pool.
+    
+    At most ``concurrency`` calls are in flight; callers await a slot
+    before submitting more, which is the backpressure. On cancellation
+    calls that have not started are dropped and running ones are awaited,
+    so nothing touches the cleanup after the coroutine has returned.
+    """
+    
+    def __init__(self, cleanup: 'MacOSFileCleanup', concurrency: int = 8,
+                 executor: Optional[ThreadPoolExecutor] = None, thread_name_prefix: str = "async"):
+        self.cleanup = cleanup
+        self.concurrency = max(1, concurrency)
+        self.executor = executor
+        self.thread_name_prefix = thread_name_prefix
+    
+    @contextmanager
+    def _pool(self):
+        """The shared executor if one was given, else a private one for the call."""
+        if self.executor is not None:
+            yield self.executor
+            return
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=self.thread_name_prefix)
+        try:
+            yield pool
+        finally:
+            pool.shutdown(wait=False)
+    
+    @staticmethod
+    async def _settle(calls):
+        """Drop calls that have not started and wait for the running ones."""
+        import asyncio
+        running = []
+        for call in calls:
+            if not call.cancel():
+                running.append(asyncio.wrap_future(call))
+        if running:
+            await asyncio.wait(running)
+
+
+class AsyncScanner(_AsyncOffload):
+    """
+    asyncio front end to the scan engine.
+    
+    Each directory is listed by ScanEngine.scan_one on the executor and
+    its results are committed on the event loop, so stats, hard-link
+    claims, per-root totals and ``output_path`` streaming work as in a
+    threaded scan. New listings are only started while the consumer keeps
+    pulling, with at most ``concurrency`` in flight. Cancelling the task
+    (or leaving ``async for`` early) stops the walk; the cleanup's
+    CancelToken is honoured as well. One scan at a time per cleanup;
+    several cleanups can scan concurrently on one loop and share an
+    executor. Checkpoints, top-K and directory aggregation are threaded
+    scan features only.
+    """
+    
+    def __init__(self, cleanup: 'MacOSFileCleanup', concurrency: int = 8,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        super().__init__(cleanup, concurrency, executor, thread_name_prefix="async-scan")
+    
+    async def scan(self, roots: Optional[List[Union[Path, str]]] = None) -> AsyncIterator[FileInfo]:
+        """
+        Yield large files under ``roots`` (default: the cleanup's roots) as directories finish.
+        
+        Returns:
+            Async iterator of FileInfo objects
+        """
+        import asyncio
+        cleanup = self.cleanup
+        if cleanup.checkpoint_path:
+            raise ValueError("Async scans cannot checkpoint or resume")
+        roots = collapse_roots(roots)[0] if roots is not None else cleanup.target_directories
+        loop = asyncio.get_running_loop()
+        cleanup.root_breakdown = RootBreakdown(roots)
+        engine = ScanEngine(cleanup, workers=1, breakdown=cleanup.root_breakdown)
+        sink = None
+        calls: Dict[Any, Any] = {}
+        completed = False
+        
+        with self._pool() as pool:
+            try:
+                if cleanup.incremental:
+                    cleanup.scan_index = await loop.run_in_executor(
+                        pool, lambda: ScanIndex(cleanup.index_path, cleanup.logger))
+                if cleanup.output_path:
+                    sink = MatchSink(cleanup.output_path, cleanup.output_format)
+                
+                # Depth-first like the threaded workers, so the stack stays small
+                pending: List[Tuple[str, int]] = []
+                for root in roots:
+                    root = str(root)
+                    pending.append((root, await loop.run_in_executor(pool, ScanEngine._device_of, root)))
+                pending.reverse()
+                
+                while (pending or calls) and not cleanup.cancel.cancelled:
+                    while pending and len(calls) < self.concurrency:
+                        directory, device = pending.pop()
+                        call = pool.submit(engine.scan_one, directory, device)
+                        calls[asyncio.wrap_future(call)] = (call, directory, device)
+                    done, _ = await asyncio.wait(calls, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        matches = self._commit(engine, *calls.pop(future), pending)
+                        for file_info in matches:
+                            if sink is not None:
+                                sink.write(file_info)
+                            yield file_info
+                completed = not cleanup.cancel.cancelled
+            finally:
+                # Listings already running see the stop flag and return early
+                engine.stopped = True
+                await self._settle(call for call, _, _ in calls.values())
+                cleanup.stats.roots = cleanup.root_breakdown.summary()
+                if sink is not None:
+                    sink.close()
+                    cleanup.logger.info(f"Wrote {sink.records_written:,} matches to {sink.output_path}")
+                if cleanup.scan_index is not None:
+                    index, cleanup.scan_index = cleanup.scan_index, None
+                    await loop.run_in_executor(pool, index.close, roots, completed)
+    
+    def _commit(self, engine: ScanEngine, call, directory: str, device: int,
+                pending: List[Tuple[str, int]]) -> List[FileInfo]:
+        """Merge one finished listing into the stats and queue its subdirectories."""
+        try:
+            matches, subdirs, mounts, counters = call.result()
+        except Exception as e:
+            counters = ScanCounters()
+            counters.other_errors += 1
+            matches, subdirs, mounts = [], [], []
+            self.cleanup.logger.error(f"Error scanning directory {directory}: {str(e)}")
+        
+        if counters.hard_links:
+            matches = engine.hard_links.claim(counters, matches)
+        with self.cleanup.stats_lock:
+            self.cleanup.stats.merge(counters)
+        engine.breakdown.commit(directory, counters, matches)
+        pending.extend((subdir, device) for subdir in subdirs)
+        pending.extend(mounts)
+        return matches
+
+
+class AsyncDeleter(_AsyncOffload):
+    """
+    asyncio front end to BulkDeleter.
+    
+    Files, from a list or an async iterator such as AsyncScanner.scan(),
+    are taken in batches of ``batch_size``. Each batch is safety-checked
+    on the executor, then unlinked one parent directory per call with at
+    most ``concurrency`` calls in flight. Cancelling the task stops
+    taking files; directories already being unlinked are finished.
+    """
+    
+    def __init__(self, cleanup: 'MacOSFileCleanup', concurrency: int = 8,
+                 executor: Optional[ThreadPoolExecutor] = None, batch_size: int = 256):
+        super().__init__(cleanup, concurrency, executor, thread_name_prefix="async-unlink")
+        self.batch_size = max(1, batch_size)
+    
+    async def _batches(self, files):
+        batch = []
+        if hasattr(files, '__aiter__'):
+            async for file_info in files:
+                batch.append(file_info)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        else:
+            for file_info in files:
+                batch.append(file_info)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+    
+    async def delete_many(self, files) -> Tuple[int, int]:
+        """
+        Validate and delete ``files``; dry runs only log.
+        
+        Returns:
+            Tuple of (files deleted, bytes deleted)
+        """
+        import asyncio
+        cleanup = self.cleanup
+        bulk = BulkDeleter(cleanup, workers=self.concurrency)
+        loop = asyncio.get_running_loop()
+        calls: Dict[Any, Any] = {}
+        deleted = 0
+        deleted_bytes = 0
+        started = time.perf_counter()
+        
+        def tally(done):
+            nonlocal deleted, deleted_bytes
+            for future in done:
+                group_deleted, group_bytes = calls.pop(future).result()
+                deleted += group_deleted
+                deleted_bytes += group_bytes
+        
+        with self._pool() as pool:
+            batches = self._batches(files)
+            try:
+                async for batch in batches:
+                    if cleanup.cancel.cancelled:
+                        break
+                    targets = await loop.run_in_executor(pool, bulk.validate, batch)
+                    by_parent: Dict[str, List[FileInfo]] = {}
+                    for file_info in targets:
+                        by_parent.setdefault(os.path.dirname(file_info.path), []).append(file_info)
+                    for group in by_parent.values():
+                        if len(calls) >= self.concurrency:
+                            done, _ = await asyncio.wait(calls, return_when=asyncio.FIRST_COMPLETED)
+                            tally(done)
+                        call = pool.submit(bulk._delete_group, group)
+                        calls[asyncio.wrap_future(call)] = call
+                if calls:
+                    done, _ = await asyncio.wait(calls)
+                    tally(done)
+            finally:
+                await batches.aclose()
+                await self._settle(calls.values())
+                for future, call in list(calls.items()):
+                    if not call.cancelled() and call.exception() is None:
+                        tally([future])
+                cleanup.stats.deletion_seconds += time.perf_counter() - started
+        return deleted, deleted_bytes
+
+
+class Quarantine:
+    """
+    Rename-based staging area used instead of unlink with --quarantine.
+    
+    Files move with os.rename into ``.cleanup_quarantine/<run>/`` on their
+    own volume: under the home directory when the file shares its device,
+    otherwise at the root of the file's mount point. A rename within one
+    device costs the same for any file size and copies nothing. Each move
+    is appended to the run directory's manifest before it is made, so
+    restore() can put everything back and QuarantinePurger knows what to
+    delete and when. Nothing is created until the first file is moved.
+    
+    A run directory belongs to one Quarantine: if ``<run>`` is already
+    taken, by another process or another instance started in the same
+    second, ``<run>_2``, ``<run>_3``, ... are used instead. Moves never
+    replace an existing path.
+    """
+    
+    DIRECTORY_NAME = ".cleanup_quarantine"
+    MANIFEST_NAME = "manifest.ndjson"
+    # link() failures meaning the filesystem cannot hard link this file
+    NO_LINK_ERRNOS = frozenset(getattr(errno, name) for name in ('EPERM', 'EMLINK', 'ENOSYS', 'ENOTSUP', 'EOPNOTSUPP')
+                               if hasattr(errno, name))
+    
+    def __init__(self, logger: Optional[logging.Logger] = None, run_id: Optional[str] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.lock = threading.Lock()
+        self._runs: Dict[int, Tuple[Path, Any]] = {}  # st_dev -> (run directory, open manifest)
+        self._sequence = itertools.count(1)
+    
+    @staticmethod
+    def mount_point(path: Union[Path, str], device: int) -> Path:
+        """Topmost ancestor of ``path`` that is still on ``device``."""
+        current = Path(os.path.abspath(path))
+        while current.parent != current:
+            try:
+                if os.lstat(current.parent).st_dev != device:
+                    break
+            except OSError:
+                break
+            current = current.parent
+        return current
+    
+    @classmethod
+    def base_for(cls, path: Union[Path, str], device: int) -> Path:
+        """The .cleanup_quarantine directory used for files on ``device``."""
+        home = Path.home()
+        try:
+            if os.stat(home).st_dev == device:
+                return home / cls.DIRECTORY_NAME
+        except OSError:
+            pass
+        return cls.mount_point(path, device) / cls.DIRECTORY_NAME
+    
+    def _run_for(self, path: str, device: int) -> Tuple[Path, Any]:
+        """This run's directory and manifest on ``device``, created on first use; call with ``lock`` held."""
+        entry = self._runs.get(device)
+        if entry is None:
+            base = self.base_for(path, device)
+            base.mkdir(parents=True, exist_ok=True)
+            for attempt in itertools.count(1):
+                run_dir = base / (self.run_id if attempt == 1 else f"{self.run_id}_{attempt}")
+                try:
+                    run_dir.mkdir(mode=0o700)
+                    break
+                except FileExistsError:
+                    continue
+            if os.stat(run_dir).st_dev != device:
+                raise OSError(errno.EXDEV, "Quarantine directory is on another device", str(run_dir))
+            manifest = open(run_dir / self.MANIFEST_NAME, 'a', encoding='utf-8')
+            entry = self._runs[device] = (run_dir, manifest)
+            self.logger.info(f"🗄️  Quarantine for device {device}: {run_dir}")
+        return entry
+    
+    def stash(self, file_info: FileInfo) -> Path:
+        """
+        Move ``file_info.path`` into this run's quarantine on the same device.
+        
+        Returns:
+            The path the file now lives at
+        """
+        import json
+        device = os.lstat(file_info.path).st_dev
+        with self.lock:
+            run_dir, manifest = self._run_for(file_info.path, device)
+            # Keep the original name readable without exceeding NAME_MAX
+            staged = run_dir / f"{next(self._sequence):07d}_{os.path.basename(file_info.path)[:200]}"
+            manifest.write(json.dumps({"original": file_info.path, "quarantined": str(staged),
+                                       "size": file_info.size, "reclaimable_size": file_info.reclaimable_size,
+                                       "quarantined_at": time.time()}, ensure_ascii=False) + "\n")
+            manifest.flush()
+        self.move_no_replace(file_info.path, staged)
+        return staged
+    
+    @classmethod
+    def move_no_replace(cls, source: Union[Path, str], target: Union[Path, str]):
+        """
+        Rename ``source`` to ``target`` on the same device, raising
+        FileExistsError instead of replacing whatever is at ``target``.
+        
+        os.rename silently replaces the target, so the move is a hard link
+        then an unlink of the source. On filesystems without hard links it
+        falls back to a rename after checking that ``target`` is free.
+        """
+        try:
+            os.link(source, target, follow_symlinks=False)
+        except FileExistsError:
+            raise
+        except OSError as e:
+            if e.errno not in cls.NO_LINK_ERRNOS:
+                raise
+            if os.path.lexists(target):
+                raise FileExistsError(errno.EEXIST, "Path already exists", str(target))
+            os.rename(source, target)
+            return
+        os.unlink(source)
+    
+    @property
+    def run_directories(self) -> List[str]:
+        return [str(run_dir) for run_dir, _ in self._runs.values()]
+    
+    def close(self):
+        with self.lock:
+            for _, manifest in self._runs.values():
+                manifest.close()
+    
+    @classmethod
+    def find_runs(cls, path: Union[Path, str]) -> List[Path]:
+        """``path`` if it is a run directory, else every run directory directly under it."""
+        path = Path(path).expanduser()
+        if (path / cls.MANIFEST_NAME).is_file():
+            return [path]
+        if not path.is_dir():
+            return []
+        return sorted(child for child in path.iterdir() if (child / cls.MANIFEST_NAME).is_file())
+    
+    @classmethod
+    def read_manifest(cls, run_dir: Path) -> List[Dict[str, Any]]:
+        import json
+        entries = []
+        with open(run_dir / cls.MANIFEST_NAME, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # A record cut short by a crash
+        return entries
+    
+    @classmethod
+    def remove_if_empty(cls, run_dir: Path) -> bool:
+        """Drop a run directory once only its manifest is left."""
+        try:
+            if any(child.name != cls.MANIFEST_NAME for child in run_dir.iterdir()):
+                return False
+            (run_dir / cls.MANIFEST_NAME).unlink()
+            run_dir.rmdir()
+            return True
+        except OSError:
+            return False
+    
+    @classmethod
+    def restore(cls, path: Union[Path, str], logger: Optional[logging.Logger] = None) -> Tuple[int, int]:
+        """
+        Move every quarantined file under ``path`` (a run directory or a
+        .cleanup_quarantine directory) back to where it came from. Files
+        whose original path has been taken again stay in quarantine.
+        
+        Returns:
+            Tuple of (files restored, files left in quarantine)
+        """
+        logger = logger or logging.getLogger(__name__)
+        restored = 0
+        skipped = 0
+        for run_dir in cls.find_runs(path):
+            for entry in cls.read_manifest(run_dir):
+                staged, original = entry["quarantined"], entry["original"]
+                if not os.path.lexists(staged):
+                    continue  # Purged, or the move never happened
+                if os.path.lexists(original):
+                    logger.warning(f"Not restoring {staged}: {original} exists")
+                    skipped += 1
+                    continue
+                try:
+                    os.makedirs(os.path.dirname(original), exist_ok=True)
+                    cls.move_no_replace(staged, original)
+                    restored += 1
+                except OSError as e:
+                    logger.error(f"❌ Failed to restore {original}: {str(e)}")
+                    skipped += 1
+            cls.remove_if_empty(run_dir)
+        return restored, skipped
+
+
+class QuarantinePurger:
+    """
+    Deletes quarantined files once they are older than the retention window.
+    
+    Unlinks are paced to ``rate`` bytes of reclaimable space per second so
+    a large purge does not saturate the disk; the pacing waits on a
+    CancelToken, so stop() takes effect at once. Run directories are
+    removed when nothing is left in them. Runs as a background thread
+    during --quarantine cleanups, or to completion with --purge-quarantine.
+    """
+    
+    def __init__(self, bases: List[Union[Path, str]], retention_seconds: float, rate: float,
+                 logger: Optional[logging.Logger] = None, cancel: Optional[CancelToken] = None):
+        self.bases = [Path(base) for base in bases]
+        self.retention_seconds = retention_seconds
+        self.rate = rate
+        self.logger = logger or logging.getLogger(__name__)
+        self.cancel = cancel if cancel is not None else CancelToken()
+        self.files_purged = 0
+        self.bytes_purged = 0
+        self._thread: Optional[threading.Thread] = None
+    
+    def run(self) -> Tuple[int, int]:
+        """
+        Purge every expired entry under ``bases``.
+        
+        Returns:
+            Tuple of (files purged, reclaimable bytes purged)
+        """
+        cutoff = time.time() - self.retention_seconds
+        started = time.monotonic()
+        for base in self.bases:
+            for run_dir in Quarantine.find_runs(base):
+                for entry in Quarantine.read_manifest(run_dir):
+                    if self.cancel.cancelled:
+                        return self.files_purged, self.bytes_purged
+                    if entry.get("quarantined_at", cutoff) >= cutoff:
+                        continue
+                    try:
+                        os.unlink(entry["quarantined"])
+                    except FileNotFoundError:
+                        continue  # Restored or already purged
+                    except OSError as e:
+                        self.logger.warning(f"Could not purge {entry['quarantined']}: {str(e)}")
+                        continue
+                    self.files_purged += 1
+                    self.bytes_purged += entry.get("reclaimable_size", 0)
+                    # Sleep off any lead over the byte budget
+                    ahead = self.bytes_purged / self.rate - (time.monotonic() - started)
+                    if ahead > 0 and self.cancel.wait(ahead):
+                        return self.files_purged, self.bytes_purged
+                if Quarantine.remove_if_empty(run_dir):
+                    self.logger.debug(f"Removed empty quarantine run {run_dir}")
+        return self.files_purged, self.bytes_purged
+    
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="quarantine-purge", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self.cancel.cancel()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class Inotify:
+    """
+    Minimal ctypes binding for Linux inotify, used by --watch.
+    
+    Only ``inotify_init1``, ``inotify_add_watch`` and ``inotify_rm_watch``
+    are bound; events are read from the non-blocking descriptor and decoded
+    with ``struct``.
+    """
+    
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_DONT_FOLLOW = 0x02000000
+    IN_ISDIR = 0x40000000
+    
+    DIRECTORY_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+                      IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+    
+    # struct inotify_event header: wd, mask, cookie, len; the name follows
+    EVENT_FORMAT = 'iIII'
+    
+    def __init__(self):
+        import ctypes
+        import struct
+        self._event = struct.Struct(self.EVENT_FORMAT)
+        self._get_errno = ctypes.get_errno
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            code = self._get_errno()
+            raise OSError(code, os.strerror(code))
+    
+    @staticmethod
+    def available() -> bool:
+        if not sys.platform.startswith('linux'):
+            return False
+        import ctypes
+        try:
+            return hasattr(ctypes.CDLL(None), 'inotify_init1')
+        except OSError:
+            return False
+    
+    def add_watch(self, path: str) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), self.DIRECTORY_MASK)
+        if wd < 0:
+            code = self._get_errno()
+            raise OSError(code, os.strerror(code), path)
+        return wd
+    
+    def rm_watch(self, wd: int):
+        self._rm_watch(self.fd, wd)  # Fails harmlessly if the kernel already dropped it
+    
+    def read_events(self) -> List[Tuple[int, int, int, str]]:
+        """
+        Drain every queued event without blocking.
+        
+        Returns:
+            List of (watch descriptor, mask, cookie, name) tuples
+        """
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = self._event.unpack_from(data, offset)
+                offset += self._event.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                events.append((wd, mask, cookie, os.fsdecode(name)))
+    
+    def close(self):
+        os.close(self.fd)
+
+
+class LargeFileWatcher:
+    """
+    Keeps the large-file set current after the initial scan (--watch).
+    
+    On Linux every scanned directory gets an inotify watch and only the
+    paths named in events are stat'ed again, in short batches, so an idle
+    volume costs a blocked select() and nothing else. Elsewhere, or once the
+    inotify watch limit is hit, the tree is re-walked every ``interval``
+    seconds through the scan index, which only lists directories whose mtime
+    changed. Files crossing the size threshold are reported as events in the
+    log and as JSON frames on the --progress-json descriptor; with --top-k a
+    ``top_k`` frame follows whenever the K largest files change.
+    """
+    
+    # Let a burst of writes to the same file settle into one stat call
+    COALESCE_SECONDS = 0.5
+    
+    def __init__(self, cleanup: 'MacOSFileCleanup', interval: float = 60.0):
+        self.cleanup = cleanup
+        self.interval = interval
+        self.files: Dict[str, Tuple[int, float]] = {}
+        self.backend: Optional[str] = None
+        self._inotify: Optional[Inotify] = None
+        self._watches: Dict[int, str] = {}
+        self._top: List[str] = []
+    
+    def run(self, initial_files, directories: List[str]):
+        """Track ``initial_files`` and watch ``directories`` until shutdown is requested."""
+        logger = self.cleanup.logger
+        for file_info in initial_files:
+            self.files[file_info.path] = (file_info.size, file_info.modified_time)
+        
+        if Inotify.available():
+            try:
+                self._inotify = Inotify()
+                self._add_watches(directories)
+            except OSError as e:
+                logger.warning(f"inotify unavailable ({str(e)}); polling the scan index instead")
+                self._close_inotify()
+        self.backend = "inotify" if self._inotify is not None else "poll"
+        
+        roots = self.cleanup.target_directories
+        label = str(roots[0]) if len(roots) == 1 else f"{len(roots)} roots"
+        logger.info(f"👀 Watching {label} ({self.backend}, "
+                    f"{len(self.files):,} large files tracked). Press Ctrl-C to stop.")
+        self._publish_top()
+        try:
+            if self._inotify is not None:
+                self._inotify_loop()
+            if not self.cleanup.shutdown_requested:
+                self._poll_loop()
+        finally:
+            self._close_inotify()
+    
+    def _close_inotify(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+            self._watches.clear()
+    
+    def _add_watches(self, directories: List[str]):
+        """Watch ``directories``; only running out of watches (ENOSPC) is fatal."""
+        for directory in directories:
+            try:
+                self._watches[self._inotify.add_watch(directory)] = directory
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    raise
+                self.cleanup.logger.debug(f"Not watching {directory}: {str(e)}")
+    
+    def _inotify_loop(self):
+        import select
+        logger = self.cleanup.logger
+        fd = self._inotify.fd
+        while not self.cleanup.shutdown_requested:
+            ready, _, _ = select.select([fd], [], [], 1.0)
+            if not ready:
+                continue
+            time.sleep(self.COALESCE_SECONDS)
+            
+            changed: Dict[str, None] = {}
+            new_dirs: List[str] = []
+            gone_dirs: List[str] = []
+            overflowed = False
+            for wd, mask, _cookie, name in self._inotify.read_events():
+                if mask & Inotify.IN_Q_OVERFLOW:
+                    overflowed = True
+                    continue
+                if mask & Inotify.IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & (Inotify.IN_DELETE_SELF | Inotify.IN_MOVE_SELF):
+                    gone_dirs.append(directory)
+                    continue
+                
+                path = os.path.join(directory, name)
+                if mask & Inotify.IN_ISDIR:
+                    if mask & (Inotify.IN_CREATE | Inotify.IN_MOVED_TO):
+                        new_dirs.append(path)
+                    elif mask & (Inotify.IN_DELETE | Inotify.IN_MOVED_FROM):
+                        gone_dirs.append(path)
+                else:
+                    changed[path] = None
+            
+            try:
+                if overflowed:
+                    logger.warning("⚠️  inotify queue overflowed, rescanning the whole tree")
+                    for wd in list(self._watches):
+                        self._inotify.rm_watch(wd)
+                    self._watches.clear()
+                    for root in self.cleanup.target_directories:
+                        self._scan_tree(str(root))
+                else:
+                    for directory in gone_dirs:
+                        self._drop_tree(directory)
+                    for directory in new_dirs:
+                        if (os.path.isdir(directory) and
+                                self.cleanup.should_scan_directory(os.path.basename(directory))):
+                            self._scan_tree(directory)
+                    for path in changed:
+                        self._restat(path)
+            except OSError as e:
+                if e.errno != errno.ENOSPC:
+                    raise
+                logger.warning("⚠️  Out of inotify watches (fs.inotify.max_user_watches); "
+                               "polling the scan index instead")
+                self._close_inotify()
+                self.backend = "poll"
+                return
+            self._publish_top()
+    
+    def _poll_loop(self):
+        cleanup = self.cleanup
+        while not cleanup.shutdown_requested:
+            deadline = time.monotonic() + self.interval
+            while not cleanup.shutdown_requested and time.monotonic() < deadline:
+                time.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+            if cleanup.shutdown_requested:
+                return
+            
+            cleanup.scan_index = ScanIndex(cleanup.index_path, cleanup.logger)
+            try:
+                current = self._rescan([str(root) for root in cleanup.target_directories])[0]
+            finally:
+                cleanup.scan_index.close(cleanup.target_directories,
+                                         completed=not cleanup.shutdown_requested)
+                cleanup.scan_index = None
+            if cleanup.shutdown_requested:
+                return  # A partial walk would look like mass deletions
+            
+            self._diff(current)
+            self._publish_top()
+    
+    def _rescan(self, roots: List[str]) -> Tuple[Dict[str, Tuple[int, float]], List[str]]:
+        """
+        Walk ``roots`` with a throwaway collector and stats.
+        
+        Returns:
+            Tuple of (large files keyed by path, directories visited)
+        """
+        visited: List[str] = []
+        engine = ScanEngine(self.cleanup, workers=self.cleanup.workers, collector=ResultCollector(),
+                            stats=FileCleanupStats(), visited=visited)
+        matches = engine.run(roots)
+        return {f.path: (f.size, f.modified_time) for f in matches}, visited
+    
+    def _scan_tree(self, root: str):
+        """Scan a new (or resynchronised) subtree and watch its directories."""
+        current, visited = self._rescan([root])
+        self._add_watches(visited)
+        self._diff(current, root)
+    
+    def _drop_tree(self, root: str):
+        """Forget a directory that was deleted or moved away, with everything below it."""
+        prefix = root.rstrip(os.sep) + os.sep
+        for wd, directory in list(self._watches.items()):
+            if directory == root or directory.startswith(prefix):
+                self._inotify.rm_watch(wd)
+                del self._watches[wd]
+        for path in [p for p in self.files if p.startswith(prefix)]:
+            self._update(path, None, None)
+    
+    def _diff(self, current: Dict[str, Tuple[int, float]], root: Optional[str] = None):
+        """Reconcile the tracked files under ``root`` (default: everything) with ``current``."""
+        prefix = root.rstrip(os.sep) + os.sep if root else None
+        for path in [p for p in self.files if p not in current and (prefix is None or p.startswith(prefix))]:
+            self._update(path, None, None)
+        for path, (size, modified_time) in current.items():
+            self._update(path, size, modified_time)
+    
+    def _restat(self, path: str):
+        try:
+            stat_info = os.stat(path)
+        except OSError:
+            self._update(path, None, None)
+            return
+        if not stat.S_ISDIR(stat_info.st_mode):
+            # A file written to again drops out of --older-than like a small one
+            size = (stat_info.st_size if self.cleanup.passes_age_filters(stat_info.st_mtime, stat_info.st_atime)
+                    else 0)
+            if (size and self.cleanup.has_type_filters and
+                    not self.cleanup.passes_type_filters(self.cleanup.classifier.classify(path))):
+                size = 0
+            self._update(path, size, stat_info.st_mtime)
+    
+    def _update(self, path: str, size: Optional[int], modified_time: Optional[float]):
+        """Apply a new size for ``path`` (None if it is gone) and emit any threshold crossing."""
+        previous = self.files.get(path)
+        if size is not None and size >= self.cleanup.min_size_bytes:
+            self.files[path] = (size, modified_time)
+            if previous is None:
+                self._emit("above_threshold", path, size, None)
+            elif previous[0] != size:
+                self._emit("resized", path, size, previous[0])
+        elif previous is not None:
+            del self.files[path]
+            self._emit("below_threshold" if size is not None else "removed", path, size, previous[0])
+    
+    def _emit(self, event: str, path: str, size: Optional[int], previous_size: Optional[int]):
+        cleanup = self.cleanup
+        cleanup.stats.watch_events += 1
+        if event == "above_threshold":
+            cleanup.logger.info(f"📈 Large file: {path} ({cleanup.format_size(size)})")
+        elif event == "resized":
+            cleanup.logger.info(f"📏 Resized: {path} ({cleanup.format_size(previous_size)} → "
+                                f"{cleanup.format_size(size)})")
+        else:
+            cleanup.logger.info(f"📉 No longer large ({event.replace('_', ' ')}): {path}")
+        cleanup.timer.write_frame({
+            "type": "event",
+            "event": event,
+            "timestamp": time.time(),
+            "path": path,
+            "size": size,
+            "previous_size": previous_size,
+        })
+    
+    def _publish_top(self):
+        """Emit a ``top_k`` frame when the K largest tracked files change."""
+        k = self.cleanup.top_k
+        if not k:
+            return
+        top = heapq.nlargest(k, self.files.items(), key=lambda item: item[1][0])
+        paths = [path for path, _ in top]
+        if paths == self._top:
+            return
+        self._top = paths
+        self.cleanup.timer.write_frame({
+            "type": "top_k",
+            "timestamp": time.time(),
+            "files": [{"path": path, "size": size} for path, (size, _) in top],
+        })
+
+
+def collapse_roots(roots: List[Union[Path, str]]) -> Tuple[List[Path], List[Tuple[Path, Path]]]:
+    """
+    Resolve scan roots and drop the ones another root already covers.
+    
+    In sorted order every path below a root follows it directly, so one
+    pass comparing each root with the last one kept finds all overlaps,
+    including exact duplicates. The remaining roots keep their given order.
+    
+    Returns:
+        Tuple of (roots to scan, (dropped root, covering root) pairs)
+    """
+    resolved = [Path(root).expanduser().resolve() for root in roots]
+    def key(path: Path) -> str:
+        return str(path).rstrip(os.sep) + os.sep
+    
+    covering: Dict[Path, Path] = {}
+    kept: Optional[Path] = None
+    for path in sorted(resolved, key=key):
+        if path == kept:
+            continue
+        if kept is not None and key(path).startswith(key(kept)):
+            covering[path] = kept
+        else:
+            kept = path
+    
+    keep: List[Path] = []
+    dropped: List[Tuple[Path, Path]] = []
+    for path in resolved:
+        if path in covering or path in keep:
+            dropped.append((path, covering.get(path, path)))
+        else:
+            keep.append(path)
+    return keep, dropped
+
+
+class MacOSFileCleanup:
+    """
+    Main class for macOS file cleanup operations.
+    
+    Construction has no side effects: nothing is written, no logging is
+    configured and no signal handlers are installed, so one process can
+    create many cleanups. Log records go to ``logger`` (this module's
+    logger by default, silent until logging is configured) and ``cancel``
+    stops whatever is running. The CLI adds setup_logging() and
+    install_signal_handlers(); library callers use scan_roots() or
+    iter_scan(), or AsyncScanner and AsyncDeleter under asyncio.
+    """
+    
+    # Directory names never descended into, in addition to hidden directories
+    SKIPPED_DIRECTORIES = frozenset({'System', 'private', 'dev', 'proc'})
+    # Default home of log files, summaries and the scan index
+    LOG_DIRECTORY = Path("cleanup_logs")
+    
+    def __init__(self, target_directory: Union[str, List[str]], min_size_gb: float = 1.0, 
+                 interactive: bool = True, dry_run: bool = False, workers: int = 1,
+                 incremental: bool = False, index_path: Optional[str] = None,
+                 top_k: Optional[int] = None, output_path: Optional[str] = None,
+                 output_format: Optional[str] = None, find_duplicates: bool = False,
+                 hash_workers: int = 4, delete_workers: int = 8,
+                 rules_path: Optional[str] = None, progress_interval: float = 1.0,
+                 progress_fd: Optional[int] = None, verbose: bool = False,
+                 checkpoint_path: Optional[str] = None, checkpoint_interval: float = 60.0,
+                 checkpoint_every: int = 10000, resume_path: Optional[str] = None,
+                 aggregate_dirs: Optional[int] = None, watch: bool = False,
+                 watch_interval: float = 60.0, one_file_system: bool = False,
+                 modified_before: Optional[float] = None, accessed_before: Optional[float] = None,
+                 rank_by: str = 'size', age_weight: float = 1.0, timings: bool = False,
+                 profile_path: Optional[str] = None, logger: Optional[logging.Logger] = None,
+                 cancel: Optional[CancelToken] = None, quarantine: bool = False,
+                 quarantine_retention: float = 7 * 86400, purge_rate: float = 50 * 1024 * 1024,
+                 max_stats_per_sec: Optional[float] = None, max_unlinks_per_sec: Optional[float] = None,
+                 max_hash_bytes_per_sec: Optional[float] = None, niceness: Optional[int] = None,
+                 io_priority: Optional[str] = None, adaptive_workers: bool = False,
+                 include_types: Optional[List[str]] = None, exclude_types: Optional[List[str]] = None,
+                 sniff_types: bool = False, log_segment_bytes: int = 50 * 1024 * 1024,
+                 log_retention: Optional[float] = None, log_max_total_bytes: Optional[int] = None,
+                 log_compression: str = 'auto'):
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.cancel = cancel if cancel is not None else CancelToken()
+        self.log_file_path: Optional[Path] = None
+        roots = [target_directory] if isinstance(target_directory, (str, Path)) else target_directory
+        self.target_directories, self.overlapping_roots = collapse_roots(roots)
+        if not self.target_directories:
+            raise ValueError("At least one target directory is required")
+        # The first root, for callers that only ever pass one
+        self.target_directory = self.target_directories[0]
+        self.min_size_bytes = int(min_size_gb * 1024 * 1024 * 1024)  # Convert GB to bytes
+        self.interactive = interactive
+        self.dry_run = dry_run
+        self.workers = max(1, workers)
+        self.one_file_system = one_file_system
+        # Shared by every worker, so the limits hold for the whole process
+        self.stat_limiter = TokenBucket(max_stats_per_sec, cancel=self.cancel) if max_stats_per_sec else None
+        self.unlink_limiter = TokenBucket(max_unlinks_per_sec, cancel=self.cancel) if max_unlinks_per_sec else None
+        self.hash_limiter = (TokenBucket(max_hash_bytes_per_sec, cancel=self.cancel)
+                             if max_hash_bytes_per_sec else None)
+        if io_priority not in (None, 'idle', 'low'):
+            raise ValueError(f"Unknown I/O priority: {io_priority}")
+        self.niceness = niceness
+        self.io_priority = io_priority
+        self.adaptive_workers = adaptive_workers
+        # Epoch cutoffs from --older-than / --not-accessed-since
+        self.modified_before = modified_before
+        self.accessed_before = accessed_before
+        self.has_age_filters = modified_before is not None or accessed_before is not None
+        self.classifier = FileClassifier(sniff=sniff_types)
+        for name in (include_types or []) + (exclude_types or []):
+            if name not in FileClassifier.CATEGORIES:
+                raise ValueError(f"Unknown file type: {name} (known: {', '.join(FileClassifier.CATEGORIES)})")
+        self.include_types = frozenset(include_types) if include_types else None
+        self.exclude_types = frozenset(exclude_types or ())
+        self.has_type_filters = self.include_types is not None or bool(self.exclude_types)
+        if rank_by not in ('size', 'staleness'):
+            raise ValueError(f"Unknown ranking: {rank_by}")
+        self.rank_by = rank_by
+        self.scorer = StalenessScore(age_weight) if rank_by == 'staleness' else None
+        self.incremental = incremental
+        self.scan_index: Optional[ScanIndex] = None
+        self.index_path = (Path(index_path).expanduser() if index_path
+                           else self.LOG_DIRECTORY / "scan_index.sqlite3")
+        self.top_k = top_k
+        self.output_path = Path(output_path).expanduser() if output_path else None
+        self.output_format = output_format
+        self.find_duplicates = find_duplicates
+        self.hash_workers = max(1, hash_workers)
+        self.duplicate_groups: List[DuplicateGroup] = []
+        self.delete_workers = max(1, delete_workers)
+        # Renames into per-volume staging directories instead of unlinks
+        self.quarantine = Quarantine(self.logger) if quarantine else None
+        self.quarantine_retention = quarantine_retention
+        self.purge_rate = purge_rate
+        if log_compression not in LogArchive.COMPRESSIONS:
+            raise ValueError(f"Unknown log compression: {log_compression}")
+        self.log_segment_bytes = log_segment_bytes
+        self.log_retention = log_retention
+        self.log_max_total_bytes = log_max_total_bytes
+        self.log_compression = log_compression
+        self.log_archive: Optional[LogArchive] = None
+        self.rules_path = rules_path
+        self.safety_rules = SafetyRules.from_file(rules_path) if rules_path else SafetyRules()
+        self.stats = FileCleanupStats()
+        self.stats_lock = threading.Lock()
+        # Whole phases are always timed; per-call timings only with --timings
+        self.timings = PhaseTimer()
+        self.call_timings: Optional[PhaseTimer] = self.timings if timings else None
+        self.profile_path = Path(profile_path).expanduser() if profile_path else None
+        self.large_files: List[FileInfo] = []
+        self.engine: Optional[ScanEngine] = None
+        self.verbose = verbose
+        self.aggregate_dirs = aggregate_dirs
+        self.aggregator: Optional[DirectoryAggregator] = None
+        self.root_breakdown: Optional[RootBreakdown] = None
+        self.watch = watch
+        self.watch_interval = watch_interval
+        self.watch_directories: List[str] = []
+        if watch and not Inotify.available():
+            # The polling fallback re-walks through the index, so seed it now
+            self.incremental = True
+        self.resume_path = Path(resume_path).expanduser() if resume_path else None
+        self.resume_state = ScanCheckpoint.load(self.resume_path) if self.resume_path else None
+        if self.resume_state is not None:
+            self._check_resume_state(self.resume_state)
+        # Keep checkpointing into the file being resumed unless told otherwise
+        checkpoint_path = checkpoint_path or resume_path
+        self.checkpoint_path = Path(checkpoint_path).expanduser() if checkpoint_path else None
+        if self.output_path and MatchSink.infer_format(self.output_path, self.output_format) == 'parquet':
+            if self.checkpoint_path:
+                raise ValueError("Parquet --output cannot be combined with --checkpoint or --resume")
+            if not MatchSink.parquet_available():
+                raise ValueError("Parquet output needs pyarrow (pip install pyarrow)")
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_every = max(1, checkpoint_every)
+        show_line = True
+        if progress_fd is not None:
+            import io
+            # A human progress line would interleave with JSON frames written to stdout
+            try:
+                show_line = progress_fd != sys.stdout.fileno()
+            except (AttributeError, ValueError, io.UnsupportedOperation):
+                pass  # stdout is None or not backed by a descriptor, so it cannot be progress_fd
+        self.timer = ProgressReporter(self, interval=progress_interval, json_fd=progress_fd, show_line=show_line)
+        
+    @property
+    def shutdown_requested(self) -> bool:
+        return self.cancel.cancelled
+        
+    @shutdown_requested.setter
+    def shutdown_requested(self, value: bool):
+        if value:
+            self.cancel.cancel()
+        else:
+            self.cancel.reset()
+    
+    def setup_logging(self):
+        """
+        Log to a timestamped file under LOG_DIRECTORY and to stdout.
+        
+        The file is written in size-capped segments, and earlier logs are
+        compressed and pruned in the background (see LogArchive). Configures
+        the root logger, so it is for the CLI; an embedding application
+        configures logging itself or passes ``logger``.
+        """
+        log_filename = f"file_cleanup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+        
+        # Create logs directory if it doesn't exist
+        log_dir = self.LOG_DIRECTORY
+        log_dir.mkdir(exist_ok=True)
+        log_path = log_dir / log_filename
+        self.log_archive = LogArchive(log_dir, self.log_segment_bytes, self.log_retention,
+                                      self.log_max_total_bytes, self.log_compression, logger=self.logger)
+        
+        # Configure logging
+        logging.basicConfig(
+            level=logging.DEBUG if self.verbose else logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                self.log_archive.open_log(log_path),
+                logging.StreamHandler(sys.stdout)
+            ]
+        )
+        
+        self.log_file_path = log_path
+        self.log_archive.start()
+        if self.call_timings is not None:
+            for handler in logging.getLogger().handlers:
+                handler.emit = self.call_timings.wrap('logging', handler.emit)
+        
+    def install_signal_handlers(self):
+        """Turn SIGINT and SIGTERM into a graceful shutdown; main thread only."""
+        signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+    
+    def log_configuration(self):
+        """Log the settings this cleanup runs with."""
+        self.logger.info("="*60)
+        self.logger.info("macOS File Cleanup Script Started")
+        if len(self.target_directories) == 1:
+            self.logger.info(f"Target Directory: {self.target_directory}")
+        else:
+            self.logger.info(f"Target Directories: {len(self.target_directories)}")
+            for root in self.target_directories:
+                self.logger.info(f"  {root}")
+        for root, parent in self.overlapping_roots:
+            self.logger.info(f"Skipping Root {root}: already covered by {parent}")
+        self.logger.info(f"Minimum File Size: {self.min_size_bytes / (1024**3):.2f} GB")
+        self.logger.info(f"Interactive Mode: {self.interactive}")
+        self.logger.info(f"Dry Run Mode: {self.dry_run}")
+        self.logger.info(f"Scan Workers: {self.workers} per device")
+        if self.one_file_system:
+            self.logger.info("One File System: not crossing mount points")
+        if self.adaptive_workers:
+            self.logger.info("Adaptive Workers: fewer active workers while stat latency is high")
+        if self.include_types is not None:
+            self.logger.info(f"Include Types: {', '.join(sorted(self.include_types))}")
+        if self.exclude_types:
+            self.logger.info(f"Exclude Types: {', '.join(sorted(self.exclude_types))}")
+        if self.classifier.sniff:
+            self.logger.info("Type Sniffing: files without an extension are matched by magic number")
+        for name, limiter, unit in (("Stat", self.stat_limiter, "/s"), ("Unlink", self.unlink_limiter, "/s"),
+                                    ("Hash", self.hash_limiter, " bytes/s")):
+            if limiter is not None:
+                self.logger.info(f"{name} Limit: {limiter.rate:,.0f}{unit}")
+        if self.modified_before is not None:
+            self.logger.info(f"Modified Before: {datetime.fromtimestamp(self.modified_before):%Y-%m-%d %H:%M}")
+        if self.accessed_before is not None:
+            self.logger.info(f"Not Used Since: {datetime.fromtimestamp(self.accessed_before):%Y-%m-%d %H:%M}")
+        if self.scorer is not None:
+            self.logger.info(f"Ranking: reclaimable bytes x idle days ** {self.scorer.age_weight:g}")
+        if self.incremental:
+            self.logger.info(f"Scan Index: {self.index_path}")
+        if self.top_k:
+            self.logger.info(f"Keeping Top {self.top_k} Files In Memory")
+        if self.output_path:
+            self.logger.info(f"Streaming Matches To: {self.output_path}")
+        if self.find_duplicates:
+            self.logger.info(f"Duplicate Detection: {self.hash_workers} hash workers")
+        if self.rules_path:
+            self.logger.info(f"Safety Rules: {self.rules_path}")
+        if self.quarantine is not None:
+            self.logger.info(f"Quarantine: renaming into {Quarantine.DIRECTORY_NAME}/{self.quarantine.run_id}, "
+                             f"purged after {self.quarantine_retention / 86400:g} days "
+                             f"at up to {self.format_size(self.purge_rate)}/s")
+        if self.aggregate_dirs:
+            self.logger.info(f"Directory Aggregation: top {self.aggregate_dirs} subtrees")
+        if self.watch:
+            self.logger.info("Watch Mode: keep tracking changes after the initial scan")
+        if self.resume_path:
+            self.logger.info(f"Resuming From: {self.resume_path}")
+        if self.call_timings is not None:
+            self.logger.info("Per-Call Timings: stat, index, safety, unlink and logging")
+        if self.profile_path:
+            self.logger.info(f"cProfile Output: {self.profile_path}")
+        if self.checkpoint_path:
+            self.logger.info(f"Checkpoint: {self.checkpoint_path} "
+                             f"(every {self.checkpoint_interval:g}s or {self.checkpoint_every:,} directories)")
+        self.logger.info("="*60)
+    
+    def signal_handler(self, signum, frame):
+        """Handle shutdown signals gracefully."""
+        self.logger.warning(f"Received signal {signum}. Initiating graceful shutdown...")
+        self.cancel.cancel()
+        self.stats.interrupted = True
+        self.timer.stop()
+    
+    def _check_resume_state(self, state: Dict[str, Any]):
+        """Refuse to resume a checkpoint taken with different roots, size, age or type filters, or output."""
+        roots = [str(root) for root in self.target_directories]
+        if state["roots"] != roots:
+            raise ValueError(f"Checkpoint is for {', '.join(state['roots'])}, not {', '.join(roots)}")
+        if state["min_size_bytes"] != self.min_size_bytes:
+            raise ValueError("Checkpoint was taken with a different --size")
+        modified_before, accessed_before = state["age_filters"]
+        if ((modified_before is None) != (self.modified_before is None) or
+                (accessed_before is None) != (self.accessed_before is None)):
+            raise ValueError("Checkpoint and this run disagree on --older-than / --not-accessed-since")
+        # Relative ages have moved on since the checkpoint; keep its cutoffs
+        self.modified_before, self.accessed_before = modified_before, accessed_before
+        if state["type_filters"] != self.type_filter_state():
+            raise ValueError("Checkpoint and this run disagree on --include-type / --exclude-type")
+        if (state.get("aggregates") is None) != (self.aggregate_dirs is None):
+            raise ValueError("Checkpoint and this run disagree on --aggregate-dirs")
+        
+        output = state.get("output")
+        if output is None:
+            if self.output_path is not None:
+                raise ValueError("Checkpoint was taken without --output")
+            return
+        if self.output_path is None:
+            self.output_path = Path(output["path"])
+        elif self.output_path.resolve() != Path(output["path"]).resolve():
+            raise ValueError(f"Checkpoint was streaming matches to {output['path']}")
+        self.output_format = output["format"]
+    
+    def _restore_scan_state(self, state: Dict[str, Any], collector: ResultCollector):
+        """Seed the collector and counters with the work done before the checkpoint."""
+        collector.restore(state["matches"])
+        if self.aggregator is not None:
+            self.aggregator.restore(state["aggregates"])
+        if self.root_breakdown is not None and state["root_totals"] is not None:
+            self.root_breakdown.restore(state["root_totals"])
+        for name, value in state["counters"].items():
+            setattr(self.stats, name, value)
+        self.stats.file_types = {category: list(totals) for category, totals in state["file_types"].items()}
+        self.stats.errors_encountered = state["errors_encountered"]
+        self.stats.resumed_from = str(self.resume_path)
+        self.stats.resumed_directories = self.stats.directories_scanned
+        self.stats.resumed_files = self.stats.files_scanned
+        self.stats.resumed_bytes = self.stats.bytes_scanned
+        self.logger.info(f"⏩ Resuming scan: {self.stats.resumed_directories:,} directories already done, "
+                         f"{len(state['frontier']):,} pending")
+    
+    @staticmethod
+    def format_size(size_bytes: int) -> str:
+        """Format file size in human-readable format."""
+        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+            if size_bytes < 1024.0:
+                return f"{size_bytes:.2f} {unit}"
+            size_bytes /= 1024.0
+        return f"{size_bytes:.2f} PB"
+    
+    def is_safe_to_delete(self, file_path: Path) -> Tuple[bool, str]:
+        """
+        Check if a file is safe to delete based on macOS system considerations.
+        
+        Returns:
+            Tuple of (is_safe, reason)
+        """
+        started = time.perf_counter_ns()
+        try:
+            return self.safety_rules.evaluate(str(file_path))
+        except Exception as e:
+            return False, f"Error checking file safety: {str(e)}"
+        finally:
+            if self.call_timings is not None:
+                self.call_timings.add('safety', time.perf_counter_ns() - started)
+    
+    def check_safety_batch(self, paths: List[str]) -> List[Tuple[bool, str]]:
+        """Batch form of is_safe_to_delete() for many paths at once."""
+        started = time.perf_counter_ns()
+        try:
+            return self.safety_rules.evaluate_batch(paths)
+        except Exception as e:
+            return [(False, f"Error checking file safety: {str(e)}")] * len(paths)
+        finally:
+            if self.call_timings is not None:
+                self.call_timings.add('safety', time.perf_counter_ns() - started, calls=len(paths))
+    
+    def should_scan_directory(self, name: str) -> bool:
+        """Filter out system directories that should be avoided."""
+        return not name.startswith('.') and name not in self.SKIPPED_DIRECTORIES
+    
+    def passes_age_filters(self, modified_time: float, accessed_time: Optional[float]) -> bool:
+        """
+        Check a file against --older-than and --not-accessed-since.
+        
+        "Not accessed" means neither read nor written since the cutoff, so
+        a frozen atime (noatime mounts) cannot make a fresh file look idle.
+        """
+        if self.modified_before is not None and modified_time >= self.modified_before:
+            return False
+        if (self.accessed_before is not None and
+                StalenessScore.last_used(modified_time, accessed_time) >= self.accessed_before):
+            return False
+        return True
+    
+    def passes_type_filters(self, category: str) -> bool:
+        """Check a file category against --include-type and --exclude-type."""
+        if self.include_types is not None and category not in self.include_types:
+            return False
+        return category not in self.exclude_types
+    
+    def type_filter_state(self) -> List[Optional[List[str]]]:
+        """The type filters as sorted lists, for checkpoints."""
+        return [sorted(self.include_types) if self.include_types is not None else None,
+                sorted(self.exclude_types)]
+    
+    def get_file_info(self, file_path: Union[Path, str], entry: Optional[os.DirEntry] = None,
+                      counters: Optional[ScanCounters] = None, category: Optional[str] = None) -> Optional[FileInfo]:
+        """
+        Get file information with comprehensive error handling.
+        
+        When ``entry`` is given its cached stat result is used instead of a
+        fresh ``stat()`` call. Error counters go to ``counters`` (the run
+        stats by default); files with several hard links are noted there too
+        so the engine can count each inode once, under ``category`` in the
+        per-type totals.
+        
+        Returns:
+            FileInfo object or None if file cannot be accessed
+        """
+        if counters is None:
+            counters = self.stats
+        timings = self.call_timings
+        if self.stat_limiter is not None:
+            self.stat_limiter.take()
+        
+        try:
+            if timings is not None:
+                started = time.perf_counter_ns()
+                stat_info = entry.stat() if entry is not None else os.stat(file_path)
+                timings.add('stat', time.perf_counter_ns() - started)
+            else:
+                stat_info = entry.stat() if entry is not None else os.stat(file_path)
+            counters.bytes_scanned += stat_info.st_size
+            # st_blocks is in 512-byte units regardless of the filesystem block size
+            blocks = getattr(stat_info, 'st_blocks', None)
+            allocated = blocks * 512 if blocks is not None else stat_info.st_size
+            counters.allocated_bytes += allocated
+            
+            # Skip if file is smaller than minimum size
+            if stat_info.st_size < self.min_size_bytes:
+                file_info = None
+            else:
+                file_info = FileInfo(
+                    path=str(file_path),
+                    size=stat_info.st_size,
+                    modified_time=stat_info.st_mtime,
+                    is_accessible=True,
+                    allocated_size=allocated,
+                    device=stat_info.st_dev,
+                    inode=stat_info.st_ino,
+                    nlink=stat_info.st_nlink,
+                    uid=stat_info.st_uid,
+                    accessed_time=stat_info.st_atime,
+                    changed_time=stat_info.st_ctime
+                )
+            
+            # Other links to the same inode are dropped when the directory is committed
+            if stat_info.st_nlink > 1 and isinstance(counters, ScanCounters):
+                counters.add_hard_link(stat_info.st_dev, stat_info.st_ino, stat_info.st_size,
+                                       allocated, file_info, category)
+            return file_info
+            
+        except PermissionError as e:
+            counters.permission_errors += 1
+            self.logger.warning(f"Permission denied: {file_path} - {str(e)}")
+            return FileInfo(
+                path=str(file_path),
+                size=0,
+                modified_time=0,
+                is_accessible=False,
+                error_message=f"Permission denied: {str(e)}"
+            )
+        except OSError as e:
+            counters.io_errors += 1
+            self.logger.warning(f"OS error accessing {file_path}: {str(e)}")
+            return FileInfo(
+                path=str(file_path),
+                size=0,
+                modified_time=0,
+                is_accessible=False,
+                error_message=f"OS error: {str(e)}"
+            )
+        except Exception as e:
+            counters.other_errors += 1
+            self.logger.error(f"Unexpected error accessing {file_path}: {str(e)}")
+            return FileInfo(
+                path=str(file_path),
+                size=0,
+                modified_time=0,
+                is_accessible=False,
+                error_message=f"Unexpected error: {str(e)}"
+            )
+    
+    def scan_directory(self, directory: Path) -> List[FileInfo]:
+        """
+        Recursively scan directory for large files with error handling.
+        
+        Returns:
+            List of FileInfo objects for large files
+        """
+        return self.scan_roots([directory])
+    
+    def scan_roots(self, roots: List[Path], collector: Optional[ResultCollector] = None) -> List[FileInfo]:
+        """
+        Scan several non-overlapping roots in one pass.
+        
+        Directory subtrees are spread across ``self.workers`` threads per
+        device by ScanEngine, shared by every root. With ``top_k`` set only
+        the largest files are kept in memory; with ``output_path`` set every
+        match is streamed to disk. Per-root totals end up in ``stats.roots``.
+        A ``collector`` given by the caller replaces the one these settings
+        would pick.
+        
+        Returns:
+            List of FileInfo objects for large files
+        """
+        sink = None
+        resume = self.resume_state
+        try:
+            if self.incremental:
+                self.scan_index = ScanIndex(self.index_path, self.logger,
+                                            scan_id=resume.get("index_scan_id") if resume else None)
+                self.timer.expected_directories = self.scan_index.directory_count(roots) or None
+            if self.output_path:
+                sink = MatchSink(self.output_path, self.output_format,
+                                 resume=resume["output"] if resume else None)
+            
+            # --watch needs every match to notice files dropping below the threshold
+            if collector is not None:
+                collector.sink = sink
+            elif self.top_k and not self.watch:
+                collector = TopKCollector(self.top_k, sink, key=self.scorer)
+            else:
+                collector = CompactResultCollector(sink)
+            
+            checkpoint = None
+            if self.checkpoint_path:
+                checkpoint = ScanCheckpoint(self.checkpoint_path, interval=self.checkpoint_interval,
+                                            every_directories=self.checkpoint_every, logger=self.logger)
+                checkpoint.roots = [str(root) for root in roots]
+                checkpoint.min_size_bytes = self.min_size_bytes
+                checkpoint.age_filters = [self.modified_before, self.accessed_before]
+                checkpoint.type_filters = self.type_filter_state()
+                checkpoint.sink = sink
+            
+            if self.aggregate_dirs:
+                self.aggregator = DirectoryAggregator(roots, top_n=self.aggregate_dirs)
+            self.root_breakdown = RootBreakdown(roots)
+            
+            pending = roots
+            if resume is not None:
+                self._restore_scan_state(resume, collector)
+                pending = resume["frontier"]
+                if checkpoint is not None:
+                    checkpoint.prior_runtime_seconds = resume["runtime_seconds"]
+            
+            self.engine = ScanEngine(self, workers=self.workers, collector=collector,
+                                     checkpoint=checkpoint, aggregator=self.aggregator,
+                                     breakdown=self.root_breakdown,
+                                     visited=self.watch_directories if self.watch else None)
+            if resume is not None:
+                self.engine.hard_links = HardLinkSet(resume["hard_links"])
+            files = self.engine.run(pending)
+            self.stats.devices = self.engine.device_summary()
+            self.stats.roots = self.root_breakdown.summary()
+            
+            if checkpoint is not None:
+                if self.shutdown_requested:
+                    if checkpoint.save(self.engine):
+                        self.logger.info(f"💾 Checkpoint saved to {self.checkpoint_path}; "
+                                         f"continue with --resume {self.checkpoint_path}")
+                else:
+                    checkpoint.discard()
+            return files
+        except Exception as e:
+            self.stats.other_errors += 1
+            self.logger.error(f"Error scanning {', '.join(str(root) for root in roots)}: {str(e)}")
+            return []
+        finally:
+            if sink is not None:
+                sink.close()
+                self.logger.info(f"Wrote {sink.records_written:,} matches to {sink.output_path}")
+            if self.scan_index is not None:
+                import sqlite3
+                try:
+                    self.scan_index.close(roots, completed=not self.shutdown_requested)
+                except sqlite3.Error as e:
+                    self.logger.error(f"Failed to update scan index {self.index_path}: {str(e)}")
+                self.scan_index = None
+    
+    def iter_scan(self, roots: Optional[List[Union[Path, str]]] = None,
+                  buffer_size: int = 1024) -> Iterator[FileInfo]:
+        """
+        Yield large files while the scan is still running.
+        
+        The scan runs on a background thread and stalls once ``buffer_size``
+        files are waiting, so a slow consumer slows the walk instead of
+        growing memory. Leaving the loop early cancels the scan and waits
+        for its threads. Stats, per-root totals and ``output_path``
+        streaming behave as in scan_roots(); ``top_k`` does not apply and
+        checkpoints are not supported.
+        
+        Returns:
+            Iterator of FileInfo objects in the order they were found
+        """
+        if self.checkpoint_path:
+            raise ValueError("iter_scan cannot checkpoint or resume; use scan_roots")
+        roots = collapse_roots(roots)[0] if roots is not None else self.target_directories
+        collector = StreamingCollector(self.cancel, maxsize=buffer_size)
+        
+        def produce():
+            try:
+                self.scan_roots(roots, collector=collector)
+            finally:
+                collector.close()
+        
+        thread = threading.Thread(target=produce, name="iter-scan", daemon=True)
+        thread.start()
+        finished = False
+        try:
+            while True:
+                try:
+                    item = collector.queue.get(timeout=0.25)
+                except queue.Empty:
+                    if thread.is_alive():
+                        continue
+                    break  # Cancelled from outside before the end marker fitted
+                if item is StreamingCollector.DONE:
+                    break
+                yield item
+            finished = True
+        finally:
+            # Only a token cancelled here is reset; a caller's cancel stands
+            stopped_here = not finished and not self.cancel.cancelled
+            if stopped_here:
+                self.cancel.cancel()
+            thread.join()
+            if stopped_here:
+                self.cancel.reset()
+    
+    def display_top_files(self, files: List[FileInfo], count: int = 10):
+        """Display the top files, by size or --rank-by staleness, in a formatted table."""
+        if not files:
+            print("\n📁 No large files found.")
+            return
+        
+        # Select the top files with a bounded heap instead of sorting the whole list
+        sorted_files = heapq.nlargest(count, (f for f in files if f.is_accessible),
+                                      key=self.scorer or (lambda x: x.size))
+        
+        if self.scorer is not None:
+            print(f"\n📊 Top {min(count, len(sorted_files))} Stalest Files (bytes x idle days):")
+        else:
+            print(f"\n📊 Top {min(count, len(sorted_files))} Largest Files:")
+        print("="*80)
+        print(f"{'#':<3} {'Size':<12} {'On Disk':<12} {'Idle':>6}  {'Path':<52}")
+        print("-"*80)
+        
+        for i, file_info in enumerate(sorted_files[:count], 1):
+            size_str = self.format_size(file_info.size)
+            allocated = file_info.allocated_size
+            disk_str = self.format_size(allocated) if allocated is not None else "-"
+            idle_days = (time.time() - StalenessScore.last_used(file_info.modified_time,
+                                                                 file_info.accessed_time)) / 86400
+            idle_str = f"{max(0, int(idle_days))}d"
+            path_str = file_info.path
+            if len(path_str) > 47:
+                path_str = "..." + path_str[-44:]
+            if file_info.nlink > 1:
+                path_str += f" [{file_info.nlink} links]"
+            
+            print(f"{i:<3} {size_str:<12} {disk_str:<12} {idle_str:>6}  {path_str}")
+        
+        print("="*80)
+    
+    def display_directory_totals(self, aggregator: DirectoryAggregator):
+        """Display the heaviest subtrees found by --aggregate-dirs."""
+        top = aggregator.top()
+        self.stats.top_directories = top
+        
+        print(f"\n📁 Top {len(top)} directories by allocated size:")
+        print("-" * 80)
+        for root, (files, apparent, allocated) in aggregator.root_totals.items():
+            print(f"  Total: {self.format_size(allocated)} allocated, "
+                  f"{self.format_size(apparent)} apparent, {files:,} files in {root}")
+        if self.shutdown_requested:
+            print("  ⚠️  Scan was interrupted; only completed subtrees are listed")
+        
+        for i, entry in enumerate(top, 1):
+            print(f"{i:2d}. {self.format_size(entry['allocated_bytes']):>10} "
+                  f"({self.format_size(entry['apparent_bytes'])} apparent, {entry['files']:,} files) "
+                  f"{entry['path']}")
+        self.logger.info(f"Aggregated {aggregator.completed_directories:,} directories "
+                         f"with at most {aggregator.peak_open_nodes:,} open at once")
+    
+    def display_duplicate_groups(self, groups: List[DuplicateGroup], count: int = 10):
+        """Display the duplicate groups that free the most space."""
+        if not groups:
+            print("\n📁 No duplicate files found.")
+            return
+        
+        total = sum(g.reclaimable_bytes for g in groups)
+        print(f"\n👯 Duplicate Groups: {len(groups):,} ({self.format_size(total)} reclaimable)")
+        print("="*80)
+        
+        for i, group in enumerate(groups[:count], 1):
+            keeper, redundant = group.split_keeper()
+            print(f"{i:<3} {len(group.files)} copies x {self.format_size(group.size)} "
+                  f"-> {self.format_size(group.reclaimable_bytes)} reclaimable")
+            print(f"    keep:   {keeper.path}")
+            for file_info in redundant:
+                print(f"    delete: {file_info.path}")
+        
+        if len(groups) > count:
+            print(f"... and {len(groups) - count:,} more groups")
+        print("="*80)
+    
+    def delete_duplicates(self, groups: List[DuplicateGroup]):
+        """Delete every copy but the oldest in each group, prompting per group when interactive."""
+        print(f"\n🗑️  Duplicate Deletion: {len(groups):,} groups")
+        intact = []
+        for group in groups:
+            if group.keeper_is_regular_file():
+                intact.append(group)
+            else:
+                self.logger.warning(f"Skipping duplicate group: {group.split_keeper()[0].path} "
+                                    f"is no longer a regular file")
+        groups = intact
+        if not self.interactive:
+            self.bulk_delete([f for group in groups for f in group.split_keeper()[1]])
+            return
+        
+        delete_all = False
+        
+        for i, group in enumerate(groups, 1):
+            if self.shutdown_requested:
+                break
+            
+            keeper, redundant = group.split_keeper()
+            if not delete_all:
+                print(f"\n[{i}/{len(groups)}] Keeping: {keeper.path}")
+                for file_info in redundant:
+                    print(f"  Redundant copy: {file_info.path}")
+                
+                try:
+                    choice = input(f"Delete {len(redundant)} redundant copies "
+                                   f"({self.format_size(group.reclaimable_bytes)})? (y/n/q/a): ").lower().strip()
+                except KeyboardInterrupt:
+                    print("\nInterrupted by user.")
+                    self.shutdown_requested = True
+                    return
+                
+                if choice == 'q':
+                    print("Quitting duplicate deletion.")
+                    return
+                if choice == 'a':
+                    delete_all = True
+                elif choice != 'y':
+                    print("Skipping group.")
+                    continue
+            
+            for file_info in redundant:
+                if self.shutdown_requested:
+                    break
+                self.delete_file_safely(file_info)
+    
+    def delete_file_safely(self, file_info: FileInfo, validated: bool = False) -> bool:
+        """
+        Safely delete a file with comprehensive error handling.
+        
+        Safe to call from several threads. Pass ``validated=True`` when the
+        caller has already run is_safe_to_delete on this file.
+        
+        Returns:
+            True if file was deleted successfully, False otherwise
         """
         try:
             file_path = Path(file_info.path)
             
             # Double-check file safety before deletion
-            is_safe, reason = self.is_safe_to_delete(file_path)
-            if not is_safe:
-                self.logger.warning(f"Skipping unsafe file {file_path}: {reason}")
-                return False
+            if not validated:
+                is_safe, reason = self.is_safe_to_delete(file_path)
+                if not is_safe:
+                    self.logger.warning(f"Skipping unsafe file {file_path}: {reason}")
+                    return False
             
             if self.dry_run:
-                self.logger.info(f"DRY RUN: Would delete {file_path} ({self.format_size(file_info.size)})")
+                verb = "quarantine" if self.quarantine is not None else "delete"
+                self.logger.info(f"DRY RUN: Would {verb} {file_path} ({self.format_size(file_info.size)})")
+                return True
+            
+            if self.unlink_limiter is not None:
+                self.unlink_limiter.take()
+            
+            if self.quarantine is not None:
+                if self.call_timings is not None:
+                    with self.call_timings.phase('rename'):
+                        staged = self.quarantine.stash(file_info)
+                else:
+                    staged = self.quarantine.stash(file_info)
+                with self.stats_lock:
+                    self.stats.files_quarantined += 1
+                    self.stats.bytes_quarantined += file_info.reclaimable_size
+                self.logger.info(f"🗄️  Quarantined: {file_path} -> {staged} ({self.format_size(file_info.size)})")
                 return True
             
             # Attempt to delete the file
-            file_path.unlink()
+            if self.call_timings is not None:
+                with self.call_timings.phase('unlink'):
+                    file_path.unlink()
+            else:
+                file_path.unlink()
             
-            self.stats.files_deleted += 1
-            self.stats.bytes_freed += file_info.size
+            # Space only comes back once the last link is gone, and then it is
+            # the allocated blocks, not the logical size of a sparse file
+            freed = file_info.reclaimable_size
+            with self.stats_lock:
+                self.stats.files_deleted += 1
+                self.stats.bytes_freed += freed
+                self.stats.logical_bytes_deleted += file_info.size
+                if file_info.nlink > 1:
+                    self.stats.shared_links_deleted += 1
             
-            self.logger.info(f"✅ Deleted: {file_path} ({self.format_size(file_info.size)})")
+            if file_info.nlink > 1:
+                self.logger.info(f"✅ Deleted: {file_path} ({self.format_size(file_info.size)}; "
+                                 f"{file_info.nlink - 1} other hard link(s) keep the data)")
+            else:
+                self.logger.info(f"✅ Deleted: {file_path} ({self.format_size(freed)} freed)")
             return True
             
         except PermissionError as e:
-            self.stats.permission_errors += 1
+            with self.stats_lock:
+                self.stats.permission_errors += 1
             self.logger.error(f"❌ Permission denied deleting {file_info.path}: {str(e)}")
             return False
         except OSError as e:
-            self.stats.io_errors += 1
+            with self.stats_lock:
+                self.stats.io_errors += 1
             self.logger.error(f"❌ OS error deleting {file_info.path}: {str(e)}")
             return False
         except Exception as e:
-            self.stats.other_errors += 1
+            with self.stats_lock:
+                self.stats.other_errors += 1
             self.logger.error(f"❌ Unexpected error deleting {file_info.path}: {str(e)}")
             return False
     
+    def bulk_delete(self, files):
+        """Delete ``files`` with BulkDeleter and report throughput."""
+        deleter = BulkDeleter(self, workers=self.delete_workers)
+        deleted, deleted_bytes, elapsed = deleter.delete(files)
+        self.stats.deletion_seconds += elapsed
+        
+        rate = deleted / elapsed if elapsed else 0.0
+        byte_rate = deleted_bytes / elapsed if elapsed else 0.0
+        verb = "Quarantined" if self.quarantine is not None else "Deleted"
+        verb = f"Would {verb.lower()[:-1]}" if self.dry_run else verb
+        self.logger.info(f"⚡ {verb} {deleted:,} files ({self.format_size(deleted_bytes)}) in {elapsed:.2f}s: "
+                         f"{rate:,.1f} files/s, {self.format_size(byte_rate)}/s")
+    
     def interactive_deletion(self, files: List[FileInfo]):
         """Handle interactive file deletion with user prompts."""
         if not files:
@@ -406,6 +4920,9 @@ class MacOSFileCleanup:
             print("\n⚠️  No accessible files to delete.")
             return
         
+        if self.scorer is not None:
+            accessible_files.sort(key=self.scorer, reverse=True)
+        
         print(f"\n🗑️  Interactive Deletion Mode")
         print(f"Found {len(accessible_files)} large files that can be deleted.")
         
@@ -418,7 +4935,13 @@ class MacOSFileCleanup:
             
             print(f"\n[{i}/{len(accessible_files)}] File: {file_path}")
             print(f"Size: {size_str}")
+            if file_info.allocated_size is not None and file_info.allocated_size != file_info.size:
+                print(f"On Disk: {self.format_size(file_info.allocated_size)}")
+            if file_info.nlink > 1:
+                print(f"Hard Links: {file_info.nlink} (deleting this path frees no space)")
             print(f"Modified: {datetime.fromtimestamp(file_info.modified_time).strftime('%Y-%m-%d %H:%M:%S')}")
+            if file_info.accessed_time is not None:
+                print(f"Accessed: {datetime.fromtimestamp(file_info.accessed_time).strftime('%Y-%m-%d %H:%M:%S')}")
             
             # Check if file is safe to delete
             is_safe, reason = self.is_safe_to_delete(file_path)
@@ -436,10 +4959,7 @@ class MacOSFileCleanup:
                     elif choice == 'a':
                         print("Deleting all remaining files...")
                         # Delete current file and all remaining
-                        for remaining_file in accessible_files[i-1:]:
-                            if self.shutdown_requested:
-                                break
-                            self.delete_file_safely(remaining_file)
+                        self.bulk_delete(accessible_files[i-1:])
                         return
                     elif choice == 'y':
                         self.delete_file_safely(file_info)
@@ -460,34 +4980,71 @@ class MacOSFileCleanup:
     
     def run_cleanup(self):
         """Main cleanup execution method."""
+        self.log_configuration()
+        self.apply_priority()
+        purger = None
+        profiler = None
+        if self.profile_path:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
         try:
-            # Validate target directory
-            if not self.target_directory.exists():
-                raise FileNotFoundError(f"Target directory does not exist: {self.target_directory}")
+            self.validate_roots()
             
-            if not self.target_directory.is_dir():
-                raise NotADirectoryError(f"Target path is not a directory: {self.target_directory}")
+            # Earlier runs' expired quarantine drains slowly while this one works
+            if self.quarantine is not None and not self.dry_run:
+                purger = QuarantinePurger(self.quarantine_bases(), self.quarantine_retention,
+                                          self.purge_rate, logger=self.logger)
+                purger.start()
             
-            # Start countdown timer in separate thread
-            timer_thread = threading.Thread(target=self.timer.display_loop, daemon=True)
+            # Start progress reporter in separate thread
+            timer_thread = threading.Thread(target=self.timer.display_loop, name="progress", daemon=True)
             timer_thread.start()
             
             self.logger.info("🔍 Starting file scan...")
             
             # Scan for large files
-            self.large_files = self.scan_directory(self.target_directory)
+            with self.timings.phase('scan'):
+                self.large_files = self.scan_roots(self.target_directories)
             
             # Stop timer
             self.timer.stop()
-            print()  # New line after timer
+            timer_thread.join(timeout=5)
+            if self.timer.show_line:
+                print()  # New line after timer
             
-            self.logger.info(f"📊 Scan completed. Found {len(self.large_files)} large files.")
+            self.logger.info(f"📊 Scan completed. Found {self.stats.large_files_found} large files.")
+            if self.top_k and self.stats.large_files_found > len(self.large_files):
+                self.logger.info(f"Kept the {len(self.large_files)} largest files for display and deletion.")
             
             # Display top 10 largest files
             self.display_top_files(self.large_files, 10)
+            if self.aggregator is not None:
+                self.display_directory_totals(self.aggregator)
+            
+            if self.watch:
+                # Watch mode only reports; it never deletes
+                if not self.shutdown_requested:
+                    self.watch_for_changes()
+            
+            elif self.find_duplicates and not self.shutdown_requested:
+                if self.top_k:
+                    self.logger.warning(f"Duplicate detection only covers the {self.top_k} files kept by --top-k")
+                self.logger.info("👯 Searching for duplicate files...")
+                finder = DuplicateFinder(self, workers=self.hash_workers)
+                with self.timings.phase('duplicates'):
+                    self.duplicate_groups = finder.find(self.large_files)
+                self.stats.duplicate_groups = len(self.duplicate_groups)
+                self.stats.duplicate_files = sum(len(g.files) - 1 for g in self.duplicate_groups)
+                self.stats.reclaimable_duplicate_bytes = sum(g.reclaimable_bytes for g in self.duplicate_groups)
+                self.display_duplicate_groups(self.duplicate_groups, 10)
+                
+                # Only redundant copies are deleted in duplicate mode
+                if self.duplicate_groups and not self.shutdown_requested:
+                    self.delete_duplicates(self.duplicate_groups)
             
             # Handle file deletion
-            if self.large_files and not self.shutdown_requested:
+            elif self.large_files and not self.shutdown_requested:
                 accessible_files = [f for f in self.large_files if f.is_accessible]
                 
                 if accessible_files:
@@ -495,10 +5052,8 @@ class MacOSFileCleanup:
                         self.interactive_deletion(accessible_files)
                     else:
                         print(f"\n🗑️  Auto-deletion mode: Deleting {len(accessible_files)} files...")
-                        for file_info in accessible_files:
-                            if self.shutdown_requested:
-                                break
-                            self.delete_file_safely(file_info)
+                        with self.timings.phase('deletion'):
+                            self.bulk_delete(accessible_files)
                 else:
                     print("\n⚠️  No accessible files found for deletion.")
             
@@ -511,13 +5066,156 @@ class MacOSFileCleanup:
             self.stats.interrupted = True
             self.shutdown_requested = True
         except Exception as e:
+            import traceback
             self.logger.error(f"Fatal error during cleanup: {str(e)}")
             self.logger.error(f"Traceback: {traceback.format_exc()}")
             self.stats.completion_status = "ERROR"
             raise
         finally:
             self.timer.stop()
+            if purger is not None:
+                purger.stop()
+                self.stats.files_purged += purger.files_purged
+                self.stats.bytes_purged += purger.bytes_purged
+            if self.quarantine is not None:
+                self.quarantine.close()
+                self.stats.quarantine_dirs = self.quarantine.run_directories
+            if profiler is not None:
+                profiler.disable()
+                self.write_profile(profiler)
             self.generate_summary_report()
+            if self.log_archive is not None:
+                self.log_archive.close()
+    
+    def validate_roots(self):
+        """
+        Check the target directories; with several roots, skip the bad ones.
+        
+        Each skipped root counts as an error. A single bad root, or no good
+        one, raises FileNotFoundError or NotADirectoryError.
+        """
+        roots = []
+        for root in self.target_directories:
+            if not root.exists():
+                problem = FileNotFoundError(f"Target directory does not exist: {root}")
+            elif not root.is_dir():
+                problem = NotADirectoryError(f"Target path is not a directory: {root}")
+            else:
+                roots.append(root)
+                continue
+            if len(self.target_directories) == 1:
+                raise problem
+            self.logger.error(f"Skipping root: {str(problem)}")
+            self.stats.other_errors += 1
+            self.stats.errors_encountered += 1
+        if not roots:
+            raise FileNotFoundError("None of the target directories can be scanned")
+        self.target_directories = roots
+        self.target_directory = roots[0]
+    
+    def apply_priority(self):
+        """Apply ``niceness`` and ``io_priority``; threads started afterwards inherit them."""
+        if not self.niceness and not self.io_priority:
+            return
+        try:
+            applied = lower_priority(self.niceness, self.io_priority)
+            self.logger.info(f"🐢 Running at lower priority: {', '.join(applied)}")
+        except OSError as e:
+            self.logger.warning(f"Could not lower priority: {str(e)}")
+    
+    def throttle_summary(self) -> Dict[str, Any]:
+        """
+        Time spent waiting on each rate limit, and worker cap changes.
+        
+        Returns:
+            Dict of limiter name to wait seconds, plus worker_cap_changes
+        """
+        summary = {name + "_wait_seconds": limiter.waited_seconds
+                   for name, limiter in (("stat", self.stat_limiter), ("unlink", self.unlink_limiter),
+                                         ("hash", self.hash_limiter))
+                   if limiter is not None}
+        if self.adaptive_workers and self.engine is not None:
+            summary["worker_cap_changes"] = sum(pool.governor.adjustments
+                                                for pool in self.engine.pools.values() if pool.governor)
+        return summary
+    
+    def quarantine_bases(self) -> List[Path]:
+        """The .cleanup_quarantine directories on the volumes of the target directories."""
+        bases = []
+        for root in self.target_directories:
+            try:
+                base = Quarantine.base_for(root, os.stat(root).st_dev)
+            except OSError:
+                continue
+            if base not in bases:
+                bases.append(base)
+        return bases
+    
+    def purge_quarantine(self) -> Tuple[int, int]:
+        """
+        Purge expired quarantined files on the target directories' volumes, to completion.
+        
+        Returns:
+            Tuple of (files purged, reclaimable bytes purged)
+        """
+        purger = QuarantinePurger(self.quarantine_bases(), self.quarantine_retention, self.purge_rate,
+                                  logger=self.logger, cancel=self.cancel)
+        files, freed = purger.run()
+        self.stats.files_purged += files
+        self.stats.bytes_purged += freed
+        return files, freed
+    
+    def write_profile(self, profiler):
+        """
+        Save cProfile stats for ``pstats``/snakeviz and log the top functions.
+        
+        Only the main thread is profiled, which with ``--workers 1`` includes
+        the whole scan; hashing and bulk-deletion threads are not.
+        """
+        import io
+        import pstats
+        try:
+            profiler.dump_stats(str(self.profile_path))
+        except OSError as e:
+            self.logger.error(f"Failed to write profile {self.profile_path}: {str(e)}")
+            return
+        self.stats.profile_path = str(self.profile_path)
+        
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(20)
+        self.logger.info(f"🔬 Profile written to {self.profile_path} (top 20 by cumulative time):\n"
+                         f"{report.getvalue()}")
+    
+    def phase_summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-phase totals from the PhaseTimer, with directory listing split out.
+        
+        With --timings, ``list`` is the time spent in scan workers outside
+        stat and the scan index: opening and reading directories and the
+        per-entry bookkeeping.
+        
+        Returns:
+            Dict of phase name to calls, seconds and latency figures
+        """
+        phases = self.timings.summary()
+        directory = phases.get('directory')
+        if directory is not None:
+            other = sum(phases[name]["seconds"] for name in ('stat', 'index') if name in phases)
+            seconds = max(0.0, directory["seconds"] - other)
+            phases['list'] = {"calls": directory["calls"], "seconds": seconds,
+                              "mean_us": seconds / directory["calls"] * 1e6 if directory["calls"] else 0.0}
+        return phases
+    
+    def watch_for_changes(self):
+        """Keep the large-file set current until Ctrl-C or SIGTERM."""
+        watcher = LargeFileWatcher(self, interval=self.watch_interval)
+        watcher.run(self.large_files, self.watch_directories)
+        self.watch_directories = []
+        
+        # A signal is the normal way to leave watch mode, not an interruption
+        self.shutdown_requested = False
+        self.stats.interrupted = False
+        self.logger.info(f"👀 Stopped watching after {self.stats.watch_events:,} events ({watcher.backend})")
     
     def generate_summary_report(self):
         """Generate comprehensive summary report."""
@@ -529,14 +5227,56 @@ class MacOSFileCleanup:
         
         print(f"Status: {self.stats.completion_status}")
         print(f"Runtime: {str(runtime).split('.')[0]}")
-        print(f"Target Directory: {self.target_directory}")
+        if len(self.target_directories) == 1:
+            print(f"Target Directory: {self.target_directory}")
+        else:
+            print(f"Target Directories: {len(self.target_directories)}")
         
         print(f"\n📊 Statistics:")
         print(f"  Files Scanned: {self.stats.files_scanned:,}")
         print(f"  Directories Scanned: {self.stats.directories_scanned:,}")
+        if self.incremental:
+            print(f"    From Index Cache: {self.stats.directories_from_cache:,}")
+            print(f"    Rescanned: {self.stats.directories_rescanned:,}")
         print(f"  Large Files Found: {self.stats.large_files_found:,}")
+        if self.find_duplicates:
+            print(f"  Duplicate Groups: {self.stats.duplicate_groups:,} "
+                  f"({self.stats.duplicate_files:,} redundant copies, "
+                  f"{self.format_size(self.stats.reclaimable_duplicate_bytes)} reclaimable)")
+        if self.watch:
+            print(f"  Watch Events: {self.stats.watch_events:,}")
+        if len(self.stats.devices) > 1:
+            print(f"  Devices: {len(self.stats.devices)}")
+            for device in self.stats.devices:
+                print(f"    {device['mount_point']}: {device['directories']:,} directories, "
+                      f"{device['files']:,} files, {self.format_size(device['bytes_scanned'])}")
+        if len(self.stats.roots) > 1:
+            print(f"  Roots: {len(self.stats.roots)}")
+            for root in self.stats.roots:
+                print(f"    {root['root']}: {root['directories']:,} directories, "
+                      f"{root['files']:,} files, {self.format_size(root['bytes_scanned'])}, "
+                      f"{root['large_files']:,} large ({self.format_size(root['large_bytes'])})")
+        if self.has_age_filters:
+            print(f"  Too Recent (age filters): {self.stats.age_filtered:,}")
+        if self.has_type_filters:
+            print(f"  Skipped By Type (not stat'ed): {self.stats.type_filtered:,}")
+        if self.one_file_system:
+            print(f"  Mount Points Skipped: {self.stats.mount_points_skipped:,}")
+        if self.stats.hard_links_skipped:
+            print(f"  Extra Hard Links Skipped: {self.stats.hard_links_skipped:,}")
         print(f"  Files Deleted: {self.stats.files_deleted:,}")
-        print(f"  Space Freed: {self.format_size(self.stats.bytes_freed)}")
+        print(f"  Space Freed: {self.format_size(self.stats.bytes_freed)} "
+              f"(logical size deleted: {self.format_size(self.stats.logical_bytes_deleted)})")
+        if self.stats.shared_links_deleted:
+            print(f"  Hard Links Removed Without Freeing Space: {self.stats.shared_links_deleted:,}")
+        if self.quarantine is not None:
+            print(f"  Files Quarantined: {self.stats.files_quarantined:,} "
+                  f"({self.format_size(self.stats.bytes_quarantined)} freed once purged)")
+            for run_dir in self.stats.quarantine_dirs:
+                print(f"    {run_dir} (undo with --restore-quarantine {run_dir})")
+        if self.stats.files_purged:
+            print(f"  Purged From Quarantine: {self.stats.files_purged:,} "
+                  f"({self.format_size(self.stats.bytes_purged)})")
         
         if self.stats.errors_encountered > 0:
             print(f"\n⚠️  Errors Encountered:")
@@ -545,28 +5285,424 @@ class MacOSFileCleanup:
             print(f"  Other Errors: {self.stats.other_errors}")
             print(f"  Total Errors: {self.stats.errors_encountered}")
         
+        self.stats.phases = self.phase_summary()
+        if self.stats.phases:
+            print(f"\n⏱️  Phases (seconds summed over threads):")
+            for name, phase in sorted(self.stats.phases.items(), key=lambda item: -item[1]["seconds"]):
+                line = f"  {name:<11} {phase['seconds']:>9.3f}s {phase['calls']:>12,} calls"
+                if "p50_us" in phase:
+                    line += f"  p50 {phase['p50_us']:,.1f}µs  p99 {phase['p99_us']:,.1f}µs"
+                print(line)
+        
+        if self.stats.file_types:
+            total = sum(totals[2] for totals in self.stats.file_types.values()) or 1
+            print(f"\n📂 Space by File Type:")
+            for category, (files, apparent, allocated) in sorted(self.stats.file_types.items(),
+                                                                  key=lambda item: item[1][2], reverse=True):
+                print(f"  {category:<12} {self.format_size(allocated):>12} {allocated * 100 / total:5.1f}%  "
+                      f"{files:,} files")
+            if self.classifier.files_sniffed:
+                print(f"  ({self.classifier.files_sniffed:,} files without an extension sniffed)")
+        
+        self.stats.throttling = self.throttle_summary()
+        if self.stats.throttling:
+            print(f"\n🚦 Throttling:")
+            for name, value in self.stats.throttling.items():
+                if name.endswith("_wait_seconds"):
+                    print(f"  {name[:-len('_wait_seconds')].title()} Limit Waits: {value:.2f}s (summed over threads)")
+                else:
+                    print(f"  Worker Cap Changes: {value:,}")
+        
+        if self.stats.resumed_from:
+            print(f"\n⏩ Resumed From: {self.stats.resumed_from}")
+            print(f"  Skipped Directories: {self.stats.resumed_directories:,}")
+            print(f"  Skipped Files: {self.stats.resumed_files:,} "
+                  f"({self.format_size(self.stats.resumed_bytes)})")
+        
         if self.stats.interrupted:
             print(f"\n⚠️  Operation was interrupted")
         
-        print(f"\n📝 Log File: {self.log_file_path}")
+        if self.log_file_path is not None:
+            print(f"\n📝 Log File: {self.log_file_path}")
         print("="*60)
         
         # Log summary to file
+        import json
         self.logger.info("CLEANUP SUMMARY:")
         self.logger.info(json.dumps(self.stats.to_dict(), indent=2))
         
-        # Save summary as JSON
+        # Save summary as JSON next to the log file, when there is one
+        if self.log_file_path is None:
+            return
         summary_file = self.log_file_path.parent / f"summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        summary = self.stats.to_dict()
         try:
             with open(summary_file, 'w') as f:
-                json.dump(self.stats.to_dict(), f, indent=2)
+                json.dump(summary, f, indent=2)
             print(f"📄 Summary JSON: {summary_file}")
         except Exception as e:
             self.logger.error(f"Failed to save summary JSON: {str(e)}")
+            summary_file = None
+        if self.log_archive is not None:
+            try:
+                self.log_archive.record_run(summary, summary_file, self.log_file_path,
+                                            [str(root) for root in self.target_directories])
+            except OSError as e:
+                self.logger.error(f"Failed to update the run index: {str(e)}")
+
+
+class ScanAgent:
+    """
+    Host side of --coordinate: one scan request in on stdin, NDJSON frames out on stdout.
+    
+    The request is a single JSON line: ``{"type": "scan", "version": 1,
+    "roots": [...], "options": {...}, "top_k": K}``, where options are
+    limited to ``OPTIONS`` and the age strings in ``AGE_OPTIONS`` (parsed
+    against this host's clock). The scan is always a dry run. Frames are
+    ``hello`` first, ``progress`` every ``progress_interval`` seconds, then
+    the host's top K matches (every match as it is found when top_k is
+    null), and ``summary`` with the run stats, or ``error``. Logs go to
+    stderr so stdout carries nothing but frames.
+    """
+    
+    PROTOCOL_VERSION = 1
+    OPTIONS = ('min_size_gb', 'workers', 'one_file_system', 'incremental', 'include_types', 'exclude_types',
+               'sniff_types', 'max_stats_per_sec', 'niceness', 'io_priority', 'adaptive_workers')
+    AGE_OPTIONS = {'older_than': 'modified_before', 'not_accessed_since': 'accessed_before'}
+    MATCH_FIELDS = ('path', 'size', 'allocated_size', 'modified_time', 'accessed_time', 'uid')
+    
+    def __init__(self, instream=None, outstream=None, progress_interval: float = 1.0):
+        self.instream = instream or sys.stdin
+        self.outstream = outstream or sys.stdout
+        self.progress_interval = progress_interval
+        self.cleanup: Optional[MacOSFileCleanup] = None
+        self._lock = threading.Lock()
+    
+    def send(self, frame_type: str, **fields):
+        """Write one frame; a coordinator that hung up stops the scan."""
+        import json
+        line = json.dumps({"type": frame_type, **fields}, ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                self.outstream.write(line)
+                self.outstream.flush()
+            except (BrokenPipeError, ValueError):
+                if self.cleanup is not None:
+                    self.cleanup.cancel.cancel()
+    
+    def _build(self, request: Any) -> Tuple['MacOSFileCleanup', Optional[int]]:
+        """Validate a scan request and construct its cleanup."""
+        if not isinstance(request, dict) or request.get("type") != "scan":
+            raise ValueError("Expected a scan request")
+        if request.get("version") != self.PROTOCOL_VERSION:
+            raise ValueError(f"Unsupported protocol version {request.get('version')}, "
+                             f"this agent speaks {self.PROTOCOL_VERSION}")
+        options = request.get("options") or {}
+        unknown = set(options) - set(self.OPTIONS) - set(self.AGE_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown scan options: {', '.join(sorted(unknown))}")
+        kwargs = {name: options[name] for name in self.OPTIONS if name in options}
+        now = time.time()
+        for name, kwarg in self.AGE_OPTIONS.items():
+            if options.get(name):
+                kwargs[kwarg] = parse_age_cutoff(options[name], now)
+        
+        logger = logging.getLogger(__name__ + ".agent")
+        if not logger.handlers:
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.WARNING)
+            logger.propagate = False
+        top_k = request.get("top_k")
+        if top_k is not None and (not isinstance(top_k, int) or top_k < 1):
+            raise ValueError("top_k must be a positive integer or null")
+        return MacOSFileCleanup(request["roots"], interactive=False, dry_run=True, logger=logger,
+                                **kwargs), top_k
+    
+    def _progress(self, done: threading.Event):
+        stats = self.cleanup.stats
+        while not done.wait(self.progress_interval):
+            self.send("progress", files_scanned=stats.files_scanned, directories_scanned=stats.directories_scanned,
+                      bytes_scanned=stats.bytes_scanned, large_files_found=stats.large_files_found)
+    
+    def serve(self) -> int:
+        """
+        Answer one scan request.
+        
+        Returns:
+            Process exit status: 0 after a summary, 1 after an error frame
+        """
+        import json
+        import socket
+        self.send("hello", version=self.PROTOCOL_VERSION, host=socket.gethostname(), pid=os.getpid())
+        try:
+            self.cleanup, top_k = self._build(json.loads(self.instream.readline() or "null"))
+            self.cleanup.validate_roots()
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            self.send("error", message=str(e))
+            return 1
+        if threading.current_thread() is threading.main_thread():
+            self.cleanup.install_signal_handlers()
+        self.cleanup.apply_priority()
+        
+        heap: List[Tuple[int, int, FileInfo]] = []
+        sequence = itertools.count()
+        done = threading.Event()
+        ticker = threading.Thread(target=self._progress, args=(done,), name="agent-progress", daemon=True)
+        ticker.start()
+        try:
+            for file_info in self.cleanup.iter_scan():
+                if top_k is None:
+                    self.send("match", **{name: getattr(file_info, name) for name in self.MATCH_FIELDS})
+                elif len(heap) < top_k:
+                    heapq.heappush(heap, (file_info.size, next(sequence), file_info))
+                elif file_info.size > heap[0][0]:
+                    heapq.heapreplace(heap, (file_info.size, next(sequence), file_info))
+        except Exception as e:
+            self.send("error", message=f"Scan failed: {str(e)}")
+            return 1
+        finally:
+            done.set()
+            ticker.join()
+        
+        for _, _, file_info in sorted(heap, reverse=True):
+            self.send("match", **{name: getattr(file_info, name) for name in self.MATCH_FIELDS})
+        stats = self.cleanup.stats
+        stats.completion_status = "INTERRUPTED" if self.cleanup.cancel.cancelled else "COMPLETED"
+        stats.interrupted = self.cleanup.cancel.cancelled
+        self.send("summary", stats=stats.to_dict())
+        return 0
+
+
+class FleetCoordinator:
+    """
+    Runs one scan on many hosts through ScanAgents and merges what they send back.
+    
+    Each host gets ``command`` with ``{host}`` replaced in every argument,
+    e.g. ``ssh {host} python3 macos_file_cleanup.py --agent``; the default
+    runs this script's agent locally, so hosts can be stood in for by local
+    subprocesses. At most ``max_hosts`` agents run at once. Matches are
+    merged into one fleet-wide top-K heap as they stream in: the fleet's
+    top K is always within the union of every host's own top K, so agents
+    only send theirs. A host that fails, times out or is cancelled is
+    reported as such and does not hold up the others.
+    """
+    
+    HOST_FIELDS = ('files_scanned', 'bytes_scanned', 'allocated_bytes', 'directories_scanned',
+                   'large_files_found', 'large_bytes', 'errors')
+    
+    def __init__(self, hosts: List[str], roots: List[str], options: Optional[Dict[str, Any]] = None,
+                 command: Optional[List[str]] = None, max_hosts: int = 8, top_k: int = 20,
+                 host_timeout: Optional[float] = None, logger: Optional[logging.Logger] = None,
+                 cancel: Optional[CancelToken] = None):
+        if max_hosts < 1:
+            raise ValueError("Host concurrency must be at least 1")
+        self.hosts = list(dict.fromkeys(hosts))
+        self.command = command or [sys.executable, os.path.abspath(__file__), '--agent']
+        self.max_hosts = max_hosts
+        self.top_k = top_k
+        self.host_timeout = host_timeout
+        self.logger = logger or logging.getLogger(__name__)
+        self.cancel = cancel or CancelToken()
+        self.request = {"type": "scan", "version": ScanAgent.PROTOCOL_VERSION, "roots": list(roots),
+                        "options": options or {}, "top_k": top_k}
+        self.lock = threading.Lock()
+        self.progress: Dict[str, Dict[str, Any]] = {}
+        self._heap: List[Tuple[int, int, Dict[str, Any]]] = []
+        self._sequence = itertools.count()
+        # host -> (process, started); hosts killed for running too long
+        self._running: Dict[str, Tuple[Any, float]] = {}
+        self._timed_out: set = set()
+    
+    def run(self) -> Dict[str, Any]:
+        """
+        Scan every host and merge the results.
+        
+        Returns:
+            Fleet report: totals, per-host breakdown and the fleet top-K files
+        """
+        started = time.monotonic()
+        self.logger.info(f"🛰️  Scanning {len(self.hosts):,} hosts, at most {self.max_hosts} at once")
+        with ThreadPoolExecutor(max_workers=self.max_hosts, thread_name_prefix="fleet") as pool:
+            futures = [pool.submit(self._scan_host, host) for host in self.hosts]
+            while not all(future.done() for future in futures):
+                time.sleep(0.1)
+                self._reap()
+            results = [future.result() for future in futures]
+        return self._report(results, time.monotonic() - started)
+    
+    def _reap(self):
+        """Stop agents past ``host_timeout``, or all of them once cancelled."""
+        now = time.monotonic()
+        with self.lock:
+            for host, (process, started) in self._running.items():
+                overdue = self.host_timeout is not None and now - started > self.host_timeout
+                if (overdue or self.cancel.cancelled) and process.poll() is None:
+                    if overdue:
+                        self._timed_out.add(host)
+                    process.terminate()
+    
+    def _scan_host(self, host: str) -> Dict[str, Any]:
+        """Run one host's agent to completion and log the outcome."""
+        result = {"host": host, "status": "failed", "agent_host": None, "error": None, "summary": None,
+                  "matches": 0, "seconds": 0.0}
+        if self.cancel.cancelled:
+            result["status"] = "skipped"
+            return result
+        self._run_agent(host, result)
+        
+        if result["status"] == "ok":
+            summary = result["summary"]
+            self.logger.info(f"✅ {host}: {summary['files_scanned']:,} files, {summary['large_files_found']:,} large "
+                             f"in {result['seconds']:.1f}s")
+        else:
+            self.logger.warning(f"❌ {host}: {result['status']}" + (f" - {result['error']}" if result['error'] else ""))
+        return result
+    
+    def _run_agent(self, host: str, result: Dict[str, Any]):
+        import json
+        import subprocess
+        import tempfile
+        
+        started = time.monotonic()
+        with tempfile.TemporaryFile() as stderr:
+            try:
+                process = subprocess.Popen([part.replace('{host}', host) for part in self.command],
+                                           stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr)
+            except OSError as e:
+                result["error"] = f"Could not start agent: {str(e)}"
+                return
+            with self.lock:
+                self._running[host] = (process, started)
+            try:
+                try:
+                    process.stdin.write((json.dumps(self.request) + "\n").encode('utf-8'))
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                for line in process.stdout:
+                    try:
+                        frame = json.loads(line)
+                    except ValueError:
+                        raise ValueError(f"not a JSON frame: {line[:80]!r}") from None
+                    self._handle(host, frame, result)
+            except ValueError as e:
+                result["error"] = f"Protocol error: {str(e)}"
+                process.kill()
+            finally:
+                process.stdout.close()
+                returncode = process.wait()
+                with self.lock:
+                    del self._running[host]
+            
+            result["seconds"] = time.monotonic() - started
+            if host in self._timed_out:
+                result["status"] = "timeout"
+                result["error"] = f"No result after {self.host_timeout:g}s"
+            elif result["summary"] is not None and result["error"] is None:
+                result["status"] = "interrupted" if result["summary"].get("interrupted") else "ok"
+            elif self.cancel.cancelled:
+                result["status"] = "cancelled"
+            elif result["error"] is None:
+                stderr.seek(0)
+                tail = stderr.read().decode('utf-8', 'replace').strip().splitlines()[-3:]
+                result["error"] = f"Agent exited with status {returncode}" + (f": {' | '.join(tail)}" if tail else "")
+    
+    def _handle(self, host: str, frame: Dict[str, Any], result: Dict[str, Any]):
+        """Apply one frame from ``host``'s agent."""
+        frame_type = frame.get("type")
+        if frame_type == "match":
+            record = {"host": host, **{name: frame.get(name) for name in ScanAgent.MATCH_FIELDS}}
+            item = (record["size"], next(self._sequence), record)
+            with self.lock:
+                if len(self._heap) < self.top_k:
+                    heapq.heappush(self._heap, item)
+                elif item[0] > self._heap[0][0]:
+                    heapq.heapreplace(self._heap, item)
+            result["matches"] += 1
+        elif frame_type == "progress":
+            self.progress[host] = frame
+        elif frame_type == "hello":
+            if frame.get("version") != ScanAgent.PROTOCOL_VERSION:
+                raise ValueError(f"agent speaks protocol version {frame.get('version')}")
+            result["agent_host"] = frame.get("host")
+        elif frame_type == "summary":
+            result["summary"] = frame["stats"]
+        elif frame_type == "error":
+            result["error"] = frame.get("message")
+        else:
+            raise ValueError(f"unknown frame type {frame_type!r}")
+    
+    def _report(self, results: List[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+        hosts = []
+        totals = dict.fromkeys(self.HOST_FIELDS, 0)
+        file_types: Dict[str, Dict[str, int]] = {}
+        for result in results:
+            summary = result["summary"] or {}
+            row = {"host": result["host"], "status": result["status"], "agent_host": result["agent_host"],
+                   "error": result["error"], "seconds": result["seconds"],
+                   "files_scanned": summary.get("files_scanned", 0),
+                   "bytes_scanned": summary.get("bytes_scanned", 0),
+                   "allocated_bytes": summary.get("allocated_bytes_scanned", 0),
+                   "directories_scanned": summary.get("directories_scanned", 0),
+                   "large_files_found": summary.get("large_files_found", 0),
+                   "large_bytes": sum(root["large_bytes"] for root in summary.get("roots", [])),
+                   "errors": summary.get("errors", {}).get("total", 0),
+                   "file_types": summary.get("file_types", {})}
+            hosts.append(row)
+            for name in self.HOST_FIELDS:
+                totals[name] += row[name]
+            for category, values in row["file_types"].items():
+                merged = file_types.setdefault(category, dict.fromkeys(values, 0))
+                for name, value in values.items():
+                    merged[name] = merged.get(name, 0) + value
+        
+        return {
+            "generated_at": datetime.now().isoformat(),
+            "runtime_seconds": seconds,
+            "request": self.request,
+            "hosts_total": len(results),
+            "hosts_ok": sum(1 for r in results if r["status"] == "ok"),
+            "hosts_failed": sum(1 for r in results if r["status"] != "ok"),
+            "totals": totals,
+            "file_types": dict(sorted(file_types.items(), key=lambda item: item[1].get("allocated_bytes", 0),
+                                      reverse=True)),
+            "hosts": sorted(hosts, key=lambda row: row["large_bytes"], reverse=True),
+            "top_files": [record for _, _, record in sorted(self._heap, key=lambda item: item[:2], reverse=True)],
+        }
+    
+    @staticmethod
+    def display(report: Dict[str, Any], count: int = 10):
+        """Print the fleet totals, top files and per-host breakdown."""
+        format_size = MacOSFileCleanup.format_size
+        totals = report["totals"]
+        print("\n" + "="*60)
+        print("🛰️  FLEET SUMMARY")
+        print("="*60)
+        print(f"  Hosts: {report['hosts_total']:,} ({report['hosts_ok']:,} ok, {report['hosts_failed']:,} not)")
+        print(f"  Runtime: {report['runtime_seconds']:.1f}s")
+        print(f"  Files Scanned: {totals['files_scanned']:,} ({format_size(totals['bytes_scanned'])})")
+        print(f"  Large Files Found: {totals['large_files_found']:,} ({format_size(totals['large_bytes'])})")
+        print(f"  Errors: {totals['errors']:,}")
+        
+        if report["top_files"]:
+            print(f"\n📊 Fleet Top {min(count, len(report['top_files']))} Largest Files:")
+            for i, record in enumerate(report["top_files"][:count], 1):
+                print(f"  {i:2d}. {format_size(record['size']):>10}  {record['host']}:{record['path']}")
+        
+        print(f"\n🖥️  Per-Host Breakdown (by large bytes):")
+        for row in report["hosts"]:
+            if row["status"] == "ok":
+                print(f"  {row['host']:<24} {format_size(row['large_bytes']):>10} in {row['large_files_found']:,} "
+                      f"large files, {row['files_scanned']:,} scanned, {row['seconds']:.1f}s")
+            else:
+                print(f"  {row['host']:<24} {row['status'].upper()}" + (f": {row['error']}" if row['error'] else ""))
 
 
 def main():
     """Main entry point with argument parsing."""
+    import argparse
     parser = argparse.ArgumentParser(
         description="macOS File Cleanup Tool - Find and clean up large files",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -575,12 +5711,51 @@ Examples:
   python macos_file_cleanup.py /Users/username/Downloads
   python macos_file_cleanup.py /Users/username --size 2.5 --non-interactive
   python macos_file_cleanup.py /Volumes/ExternalDrive --dry-run
+  python macos_file_cleanup.py /Volumes/Archive --dry-run --workers 8
+  python macos_file_cleanup.py / --dry-run --one-file-system
+  python macos_file_cleanup.py ~/Downloads ~/Movies /Volumes/Archive --dry-run --workers 4
+  python macos_file_cleanup.py --roots-file scan_roots.txt --dry-run --top-k 100
+  python macos_file_cleanup.py /Volumes/Archive --dry-run --incremental
+  python macos_file_cleanup.py ~ --size 0.01 --dry-run --top-k 100 --output matches.ndjson
+  python macos_file_cleanup.py /Volumes/Archive --size 0.1 --dry-run --top-k 20 --output archive.parquet
+  python macos_file_cleanup.py ~/Movies --size 0.1 --find-duplicates --dry-run
+  python macos_file_cleanup.py /Volumes/NAS/scratch --non-interactive --delete-workers 16
+  python macos_file_cleanup.py ~/Developer --size 0.1 --rules cleanup_rules.json --dry-run
+  python macos_file_cleanup.py /Volumes/Archive --dry-run --progress-json 3 3>progress.ndjson
+  python macos_file_cleanup.py /Volumes/Archive --dry-run --checkpoint archive.ckpt
+  python macos_file_cleanup.py /Volumes/Archive --dry-run --resume archive.ckpt
+  python macos_file_cleanup.py ~ --dry-run --aggregate-dirs 30
+  python macos_file_cleanup.py ~ --size 0.1 --dry-run --older-than 180d --not-accessed-since 90d
+  python macos_file_cleanup.py /Volumes/Archive --dry-run --rank-by staleness --top-k 50
+  python macos_file_cleanup.py ~/Library/Caches --dry-run --timings --profile scan.pstats
+  python macos_file_cleanup.py ~/Downloads --size 0.5 --non-interactive --quarantine
+  python macos_file_cleanup.py /srv --dry-run --workers 8 --max-stats-per-sec 2000 --nice 10 --io-priority idle
+  python macos_file_cleanup.py /srv/build --workers 8 --adaptive-workers --max-unlinks-per-sec 50 -n
+  python macos_file_cleanup.py ~ --size 0.1 --dry-run --include-type video,vm_image,disk_image
+  python macos_file_cleanup.py / --size 0 --dry-run --sniff-types --exclude-type source
+  python macos_file_cleanup.py --restore-quarantine ~/.cleanup_quarantine/20250101_120000
+  python macos_file_cleanup.py ~/Library/Caches --dry-run --log-segment-mb 10 --log-retention 7d --log-max-total-mb 100
+  python macos_file_cleanup.py --list-runs 20
+  python macos_file_cleanup.py /Users /Volumes/Data --size 5 --coordinate hosts.txt --max-hosts 20 \\
+      --agent-command "ssh -o BatchMode=yes {host} python3 /usr/local/bin/macos_file_cleanup.py --agent"
+  python macos_file_cleanup.py ~ /Volumes/Archive --purge-quarantine --quarantine-retention 14d --purge-rate 20
+  python macos_file_cleanup.py /Volumes/Scratch --watch --top-k 20 --progress-json 3 3>events.ndjson
         """
     )
     
     parser.add_argument(
-        'directory',
-        help='Target directory to scan for large files'
+        'directories',
+        nargs='*',
+        metavar='directory',
+        help='Target directories to scan for large files; roots inside another '
+             'root are scanned once'
+    )
+    
+    parser.add_argument(
+        '--roots-file',
+        metavar='FILE',
+        help='Also scan the directories listed in FILE, one per line '
+             '(blank lines and lines starting with # are ignored)'
     )
     
     parser.add_argument(
@@ -602,24 +5777,559 @@ Examples:
         help='Show what would be deleted without actually deleting'
     )
     
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=1,
+        help='Number of parallel scan workers per device; each mounted device found '
+             'gets its own pool of this size (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--one-file-system', '-x',
+        action='store_true',
+        help='Do not descend into directories on other devices (mount points)'
+    )
+    
+    parser.add_argument(
+        '--incremental', '-i',
+        action='store_true',
+        help='Reuse results for directories unchanged since the last indexed scan'
+    )
+    
+    parser.add_argument(
+        '--index-path',
+        help='Scan index file for --incremental (default: cleanup_logs/scan_index.sqlite3); '
+             'implies --incremental'
+    )
+    
+    parser.add_argument(
+        '--top-k', '-k',
+        type=int,
+        help='Keep only the K largest files in memory; only those are displayed '
+             'and offered for deletion'
+    )
+    
+    parser.add_argument(
+        '--output', '-o',
+        help='Stream every matching file (path, size, mtime, allocated size, device, inode, '
+             'link count, uid and owner) to this NDJSON, CSV or Parquet file as it is found'
+    )
+    
+    parser.add_argument(
+        '--output-format',
+        choices=MatchSink.FORMATS,
+        help='Format for --output (default: from the file extension, else ndjson); '
+             'parquet needs pyarrow'
+    )
+    
+    parser.add_argument(
+        '--find-duplicates', '-D',
+        action='store_true',
+        help='Find files with identical content among the large files and '
+             'delete all but the oldest copy in each group'
+    )
+    
+    parser.add_argument(
+        '--hash-workers',
+        type=int,
+        default=4,
+        help='Threads used to hash duplicate candidates (default: 4)'
+    )
+    
+    parser.add_argument(
+        '--delete-workers',
+        type=int,
+        default=8,
+        help='Threads used for bulk deletion in non-interactive mode (default: 8)'
+    )
+    
+    parser.add_argument(
+        '--rules',
+        help='JSON file with extra allow/deny glob and regex safety rules'
+    )
+    
+    parser.add_argument(
+        '--progress-interval',
+        type=float,
+        default=1.0,
+        help='Seconds between progress samples (default: 1.0)'
+    )
+    
+    parser.add_argument(
+        '--progress-json',
+        type=int,
+        metavar='FD',
+        help='Write JSON progress frames, one per line, to this file descriptor'
+    )
+    
+    parser.add_argument(
+        '--verbose', '-v',
+        action='store_true',
+        help='Log every large file as it is found'
+    )
+    
+    parser.add_argument(
+        '--checkpoint',
+        metavar='PATH',
+        help='Periodically save the scan frontier and partial results to this file '
+             '(also saved on SIGINT/SIGTERM)'
+    )
+    
+    parser.add_argument(
+        '--checkpoint-interval',
+        type=float,
+        default=60.0,
+        help='Seconds between checkpoints (default: 60)'
+    )
+    
+    parser.add_argument(
+        '--checkpoint-every',
+        type=int,
+        default=10000,
+        metavar='DIRS',
+        help='Also checkpoint after this many scanned directories (default: 10000)'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        metavar='CHECKPOINT',
+        help='Continue an interrupted scan from a checkpoint file; '
+             'checkpoints keep going to the same file unless --checkpoint is given'
+    )
+    
+    parser.add_argument(
+        '--aggregate-dirs',
+        type=int,
+        nargs='?',
+        const=20,
+        metavar='N',
+        help='Also roll up apparent and allocated bytes per directory and list the '
+             'N heaviest subtrees (default N: 20)'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='After the initial scan, keep tracking large files from filesystem events '
+             '(inotify on Linux, otherwise index polling) until interrupted; never deletes'
+    )
+    
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=60.0,
+        help='Seconds between re-walks when --watch has to poll (default: 60)'
+    )
+    
+    parser.add_argument(
+        '--older-than',
+        metavar='AGE',
+        help='Only match files last modified before AGE ago, e.g. 90d, 12h, 6w, 1y '
+             '(a bare number is days), or before a date such as 2024-01-31'
+    )
+    
+    parser.add_argument(
+        '--not-accessed-since',
+        metavar='AGE',
+        help='Only match files neither read nor modified since AGE ago or since a date; '
+             'with --incremental, access times of unchanged directories come from the index'
+    )
+    
+    parser.add_argument(
+        '--rank-by',
+        choices=('size', 'staleness'),
+        default='size',
+        help='Rank the displayed files, --top-k and interactive deletion by size or by '
+             'reclaimable bytes x idle days (default: size)'
+    )
+    
+    parser.add_argument(
+        '--age-weight',
+        type=float,
+        default=1.0,
+        help='Exponent on idle days in the staleness score; 0 ranks by reclaimable '
+             'bytes alone (default: 1.0)'
+    )
+    
+    parser.add_argument(
+        '--timings',
+        action='store_true',
+        help='Time every stat, index lookup, safety check, unlink and log write, and '
+             'add call counts and p50/p99 latencies to the summary'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        metavar='PATH',
+        help='Write cProfile stats for the main thread to PATH (inspect with pstats or snakeviz); '
+             'use --workers 1 to cover the whole scan'
+    )
+    
+    parser.add_argument(
+        '--max-stats-per-sec',
+        type=float,
+        metavar='N',
+        help='Limit metadata calls (file stats and directory reads) to N per second across all workers'
+    )
+    
+    parser.add_argument(
+        '--max-unlinks-per-sec',
+        type=float,
+        metavar='N',
+        help='Limit deletions (or quarantine renames) to N per second across all workers'
+    )
+    
+    parser.add_argument(
+        '--max-hash-mb-per-sec',
+        type=float,
+        metavar='MB',
+        help='Limit duplicate detection to hashing MB megabytes per second across all workers'
+    )
+    
+    parser.add_argument(
+        '--nice',
+        type=int,
+        metavar='N',
+        help='Lower CPU priority by N (1-19), like nice'
+    )
+    
+    parser.add_argument(
+        '--io-priority',
+        choices=('idle', 'low'),
+        help='Lower disk priority like ionice: idle only uses the disk when nothing else does, '
+             'low is the lowest best-effort level (Linux ioprio, macOS I/O policy)'
+    )
+    
+    parser.add_argument(
+        '--adaptive-workers',
+        action='store_true',
+        help='Park scan workers while metadata latency is well above its best, and bring them '
+             'back as it recovers (with --workers 2 or more)'
+    )
+    
+    parser.add_argument(
+        '--include-type',
+        action='append',
+        metavar='TYPE[,TYPE]',
+        help='Only consider files of these types: ' + ', '.join(FileClassifier.CATEGORIES) +
+             '. Files whose name rules them out are skipped before the stat'
+    )
+    
+    parser.add_argument(
+        '--exclude-type',
+        action='append',
+        metavar='TYPE[,TYPE]',
+        help='Skip files of these types (same names as --include-type)'
+    )
+    
+    parser.add_argument(
+        '--sniff-types',
+        action='store_true',
+        help='Read the first bytes of files without an extension to classify them by magic number '
+             '(instead of counting them as "other")'
+    )
+    
+    parser.add_argument(
+        '--coordinate',
+        metavar='HOSTS_FILE',
+        help='Scan the given directories on every host listed in HOSTS_FILE (one per line) through '
+             '--agent-command, then print and save a merged fleet report; never deletes'
+    )
+    
+    parser.add_argument(
+        '--agent-command',
+        metavar='CMD',
+        help='Command that starts an agent for {host}, e.g. "ssh {host} python3 macos_file_cleanup.py --agent" '
+             '(default: run this script\'s agent locally for each host)'
+    )
+    
+    parser.add_argument(
+        '--max-hosts',
+        type=int,
+        default=8,
+        metavar='N',
+        help='Hosts scanned at once with --coordinate (default: 8)'
+    )
+    
+    parser.add_argument(
+        '--host-timeout',
+        type=float,
+        metavar='SECONDS',
+        help='Give up on a host whose agent has not finished after SECONDS'
+    )
+    
+    parser.add_argument(
+        '--agent',
+        action='store_true',
+        help='Serve one scan request from a coordinator: a JSON line on stdin, '
+             'NDJSON frames on stdout'
+    )
+    
+    parser.add_argument(
+        '--quarantine',
+        action='store_true',
+        help='Instead of deleting, rename files into a .cleanup_quarantine directory on their '
+             'own volume (in your home directory or at the mount point) and record them in a '
+             'manifest; expired quarantined files are purged in the background'
+    )
+    
+    parser.add_argument(
+        '--quarantine-retention',
+        metavar='AGE',
+        default='7d',
+        help='How long quarantined files are kept before purging, e.g. 36h or 14d (default: 7d)'
+    )
+    
+    parser.add_argument(
+        '--purge-rate',
+        type=float,
+        default=50.0,
+        metavar='MB',
+        help='Purge at most this many MB of reclaimable space per second (default: 50)'
+    )
+    
+    parser.add_argument(
+        '--purge-quarantine',
+        action='store_true',
+        help='Only purge expired quarantined files on the volumes of the given directories, '
+             'then exit (e.g. from launchd or cron)'
+    )
+    
+    parser.add_argument(
+        '--restore-quarantine',
+        metavar='DIR',
+        help='Move every file recorded in a quarantine run directory, or in all runs under a '
+             '.cleanup_quarantine directory, back to its original path, then exit'
+    )
+    
+    parser.add_argument(
+        '--log-segment-mb',
+        type=float,
+        default=50.0,
+        metavar='MB',
+        help='Start a new log segment when the current one reaches MB; closed segments are '
+             'compressed in the background (default: 50)'
+    )
+    
+    parser.add_argument(
+        '--log-retention',
+        metavar='AGE',
+        help='Delete logs and summaries in cleanup_logs older than AGE, e.g. 30d, including ones '
+             'written before this option existed; earlier runs\' logs are compressed first '
+             '(default: keep everything)'
+    )
+    
+    parser.add_argument(
+        '--log-max-total-mb',
+        type=float,
+        metavar='MB',
+        help='Delete the oldest logs and summaries until cleanup_logs fits in MB, after compressing '
+             'earlier runs\' logs (default: no limit)'
+    )
+    
+    parser.add_argument(
+        '--log-compression',
+        choices=LogArchive.COMPRESSIONS,
+        default='auto',
+        help='Compression for closed log segments; auto uses zstd when the zstandard module is '
+             'installed, else gzip (default: auto)'
+    )
+    
+    parser.add_argument(
+        '--list-runs',
+        type=int,
+        nargs='?',
+        const=10,
+        metavar='N',
+        help='List the last N runs (default 10) from the cleanup_logs run index, then exit'
+    )
+    
     args = parser.parse_args()
+    if args.index_path:
+        args.incremental = True
+    if args.agent:
+        sys.exit(ScanAgent().serve())
     
     try:
         # Validate arguments
         if args.size <= 0:
             raise ValueError("File size must be greater than 0")
+        if args.workers < 1:
+            raise ValueError("Worker count must be at least 1")
+        if args.top_k is not None and args.top_k < 1:
+            raise ValueError("Top-K must be at least 1")
+        if args.hash_workers < 1:
+            raise ValueError("Hash worker count must be at least 1")
+        if args.delete_workers < 1:
+            raise ValueError("Delete worker count must be at least 1")
+        if args.progress_interval <= 0:
+            raise ValueError("Progress interval must be greater than 0")
+        if args.checkpoint_interval <= 0:
+            raise ValueError("Checkpoint interval must be greater than 0")
+        if args.checkpoint_every < 1:
+            raise ValueError("Checkpoint directory count must be at least 1")
+        if args.aggregate_dirs is not None and args.aggregate_dirs < 1:
+            raise ValueError("Aggregate directory count must be at least 1")
+        if args.watch_interval <= 0:
+            raise ValueError("Watch interval must be greater than 0")
+        if args.watch and args.resume:
+            raise ValueError("--watch cannot be combined with --resume")
+        if args.resume and not Path(args.resume).expanduser().is_file():
+            raise ValueError(f"Checkpoint file not found: {args.resume}")
+        if args.age_weight < 0:
+            raise ValueError("Age weight cannot be negative")
+        if args.purge_rate <= 0:
+            raise ValueError("Purge rate must be greater than 0")
+        for limit in (args.max_stats_per_sec, args.max_unlinks_per_sec, args.max_hash_mb_per_sec):
+            if limit is not None and limit <= 0:
+                raise ValueError("Rate limits must be greater than 0")
+        if args.nice is not None and not 1 <= args.nice <= 19:
+            raise ValueError("--nice must be between 1 and 19")
+        if args.max_hosts < 1:
+            raise ValueError("Host concurrency must be at least 1")
+        if args.log_segment_mb <= 0 or (args.log_max_total_mb is not None and args.log_max_total_mb <= 0):
+            raise ValueError("Log size limits must be greater than 0")
+        if args.host_timeout is not None and args.host_timeout <= 0:
+            raise ValueError("Host timeout must be greater than 0")
+        include_types = [t.strip() for value in args.include_type or [] for t in value.split(',') if t.strip()]
+        exclude_types = [t.strip() for value in args.exclude_type or [] for t in value.split(',') if t.strip()]
+        now = time.time()
+        quarantine_retention = now - parse_age_cutoff(args.quarantine_retention, now)
+        if quarantine_retention < 0:
+            raise ValueError("Quarantine retention cannot be negative")
+        log_retention = None
+        if args.log_retention is not None:
+            log_retention = now - parse_age_cutoff(args.log_retention, now)
+            if log_retention < 0:
+                raise ValueError("Log retention cannot be negative")
+        if args.list_runs is not None:
+            runs = LogArchive.recent_runs(MacOSFileCleanup.LOG_DIRECTORY, args.list_runs)
+            if not runs:
+                print(f"No runs recorded in {MacOSFileCleanup.LOG_DIRECTORY / LogArchive.INDEX_NAME}")
+            for run in runs:
+                summary = run['summary'] or '-'
+                if run['summary'] and not (MacOSFileCleanup.LOG_DIRECTORY / run['summary']).exists():
+                    summary += ' (pruned)'
+                print(f"{run['time'].replace('T', ' ')}  {run['status']:<10} {run['runtime_seconds']:>8.1f}s  "
+                      f"{run['files_scanned']:>10,} files  {run['large_files_found']:>7,} large  "
+                      f"{run['files_deleted']:>6,} deleted ({MacOSFileCleanup.format_size(run['bytes_freed'])})  "
+                      f"{', '.join(run['roots'])}  {summary}")
+            return
+        if args.restore_quarantine:
+            restored, skipped = Quarantine.restore(args.restore_quarantine)
+            print(f"♻️  Restored {restored:,} files from {args.restore_quarantine}"
+                  + (f"; {skipped:,} left in quarantine" if skipped else ""))
+            return
+        modified_before = parse_age_cutoff(args.older_than) if args.older_than else None
+        accessed_before = parse_age_cutoff(args.not_accessed_since) if args.not_accessed_since else None
+        
+        directories = list(args.directories)
+        if args.roots_file:
+            with open(Path(args.roots_file).expanduser(), 'r', encoding='utf-8') as f:
+                directories.extend(line.strip() for line in f
+                                   if line.strip() and not line.lstrip().startswith('#'))
+        if not directories:
+            raise ValueError("No target directory given")
         
-        target_dir = Path(args.directory).expanduser().resolve()
+        if args.coordinate:
+            import json
+            import shlex
+            with open(Path(args.coordinate).expanduser(), 'r', encoding='utf-8') as f:
+                hosts = [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+            if not hosts:
+                raise ValueError(f"No hosts listed in {args.coordinate}")
+            # Roots are resolved on each host, not here
+            options = {"min_size_gb": args.size, "workers": args.workers, "one_file_system": args.one_file_system,
+                       "incremental": args.incremental, "include_types": include_types or None,
+                       "exclude_types": exclude_types or None, "sniff_types": args.sniff_types,
+                       "max_stats_per_sec": args.max_stats_per_sec, "niceness": args.nice,
+                       "io_priority": args.io_priority, "adaptive_workers": args.adaptive_workers,
+                       "older_than": args.older_than, "not_accessed_since": args.not_accessed_since}
+            logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+            coordinator = FleetCoordinator(hosts, directories, options,
+                                           command=shlex.split(args.agent_command) if args.agent_command else None,
+                                           max_hosts=args.max_hosts, top_k=args.top_k or 20,
+                                           host_timeout=args.host_timeout)
+            signal.signal(signal.SIGINT, lambda signum, frame: coordinator.cancel.cancel())
+            signal.signal(signal.SIGTERM, lambda signum, frame: coordinator.cancel.cancel())
+            report = coordinator.run()
+            FleetCoordinator.display(report)
+            MacOSFileCleanup.LOG_DIRECTORY.mkdir(exist_ok=True)
+            report_path = MacOSFileCleanup.LOG_DIRECTORY / f"fleet_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"\n📄 Fleet report saved to: {report_path}")
+            if report["hosts_failed"]:
+                sys.exit(1)
+            return
+        
+        target_dirs, overlapping = collapse_roots(directories)
+        
+        if args.purge_quarantine:
+            purging = MacOSFileCleanup(directories, quarantine_retention=quarantine_retention,
+                                       purge_rate=args.purge_rate * 1024 * 1024)
+            purging.install_signal_handlers()
+            files, freed = purging.purge_quarantine()
+            print(f"🧽 Purged {files:,} quarantined files ({purging.format_size(freed)}) "
+                  f"older than {args.quarantine_retention}")
+            return
         
         print("🧹 macOS File Cleanup Tool")
         print("="*40)
-        print(f"Target Directory: {target_dir}")
+        if len(target_dirs) == 1:
+            print(f"Target Directory: {target_dirs[0]}")
+        else:
+            print(f"Target Directories: {', '.join(str(d) for d in target_dirs)}")
+        if overlapping:
+            print(f"Overlapping Roots Skipped: {len(overlapping)}")
         print(f"Minimum File Size: {args.size} GB")
         print(f"Interactive Mode: {not args.non_interactive}")
         print(f"Dry Run: {args.dry_run}")
+        print(f"Scan Workers: {args.workers} per device")
+        if args.one_file_system:
+            print("One File System: True")
+        if args.max_stats_per_sec or args.max_unlinks_per_sec or args.max_hash_mb_per_sec:
+            print(f"Rate Limits: {args.max_stats_per_sec or '-'} stats/s, "
+                  f"{args.max_unlinks_per_sec or '-'} unlinks/s, {args.max_hash_mb_per_sec or '-'} MB/s hashed")
+        if args.nice or args.io_priority:
+            print(f"Priority: nice +{args.nice or 0}, I/O {args.io_priority or 'unchanged'}")
+        if args.adaptive_workers:
+            print("Adaptive Workers: True")
+        if include_types or exclude_types:
+            print(f"Types: include {', '.join(include_types) or 'all'}, exclude {', '.join(exclude_types) or 'none'}")
+        if args.sniff_types:
+            print("Sniff Types: True")
+        print(f"Incremental: {args.incremental}")
+        if args.top_k:
+            print(f"Top-K In Memory: {args.top_k}")
+        if args.output:
+            print(f"Output: {args.output}")
+        if args.find_duplicates:
+            print("Find Duplicates: True")
+        if args.quarantine:
+            print(f"Quarantine: True (kept {args.quarantine_retention})")
+        if args.aggregate_dirs:
+            print(f"Aggregate Directories: top {args.aggregate_dirs}")
+        if args.older_than:
+            print(f"Older Than: {args.older_than}")
+        if args.not_accessed_since:
+            print(f"Not Accessed Since: {args.not_accessed_since}")
+        if args.rank_by != 'size':
+            print(f"Rank By: {args.rank_by} (age weight {args.age_weight:g})")
+        if args.timings:
+            print("Timings: True")
+        if args.profile:
+            print(f"Profile: {args.profile}")
+        if args.watch:
+            print("Watch: True")
+        if args.resume:
+            print(f"Resume From: {args.resume}")
+        if args.checkpoint:
+            print(f"Checkpoint: {args.checkpoint}")
         print("="*40)
         
-        if not args.dry_run and not args.non_interactive:
+        if not args.dry_run and not args.non_interactive and not args.watch:
             confirm = input("\nProceed with cleanup? (y/N): ").lower().strip()
             if confirm != 'y':
                 print("Cleanup cancelled.")
@@ -627,11 +6337,57 @@ Examples:
         
         # Create and run cleanup
         cleanup = MacOSFileCleanup(
-            target_directory=str(target_dir),
+            target_directory=directories,
             min_size_gb=args.size,
             interactive=not args.non_interactive,
-            dry_run=args.dry_run
+            dry_run=args.dry_run,
+            workers=args.workers,
+            incremental=args.incremental,
+            index_path=args.index_path,
+            top_k=args.top_k,
+            output_path=args.output,
+            output_format=args.output_format,
+            find_duplicates=args.find_duplicates,
+            hash_workers=args.hash_workers,
+            delete_workers=args.delete_workers,
+            rules_path=args.rules,
+            progress_interval=args.progress_interval,
+            progress_fd=args.progress_json,
+            verbose=args.verbose,
+            checkpoint_path=args.checkpoint,
+            checkpoint_interval=args.checkpoint_interval,
+            checkpoint_every=args.checkpoint_every,
+            resume_path=args.resume,
+            aggregate_dirs=args.aggregate_dirs,
+            watch=args.watch,
+            watch_interval=args.watch_interval,
+            one_file_system=args.one_file_system,
+            modified_before=modified_before,
+            accessed_before=accessed_before,
+            rank_by=args.rank_by,
+            age_weight=args.age_weight,
+            timings=args.timings,
+            profile_path=args.profile,
+            quarantine=args.quarantine,
+            quarantine_retention=quarantine_retention,
+            purge_rate=args.purge_rate * 1024 * 1024,
+            max_stats_per_sec=args.max_stats_per_sec,
+            max_unlinks_per_sec=args.max_unlinks_per_sec,
+            max_hash_bytes_per_sec=args.max_hash_mb_per_sec * 1024 * 1024 if args.max_hash_mb_per_sec else None,
+            niceness=args.nice,
+            io_priority=args.io_priority,
+            adaptive_workers=args.adaptive_workers,
+            include_types=include_types or None,
+            exclude_types=exclude_types or None,
+            sniff_types=args.sniff_types,
+            log_segment_bytes=int(args.log_segment_mb * 1024 * 1024),
+            log_retention=log_retention,
+            log_max_total_bytes=(int(args.log_max_total_mb * 1024 * 1024)
+                                 if args.log_max_total_mb is not None else None),
+            log_compression=args.log_compression
         )
+        cleanup.setup_logging()
+        cleanup.install_signal_handlers()
         
         cleanup.run_cleanup()
         
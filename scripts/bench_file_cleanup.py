@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for macos_file_cleanup.py
+
+Usage:
+  python scripts/bench_file_cleanup.py memory
+  python scripts/bench_file_cleanup.py memory --entries 1000000 10000000 --stores compact
+  python scripts/bench_file_cleanup.py memory --json memory_bench.json
+  python scripts/bench_file_cleanup.py rules --paths 1000000
+  python scripts/bench_file_cleanup.py scan --files 200000 --json scan_bench.json
+  python scripts/bench_file_cleanup.py scan --shapes wide tiny --workers 1 8 --baseline scan_bench.json
+  python scripts/bench_file_cleanup.py startup --repeat 50
+
+Benchmarks:
+  memory   Peak RSS of holding N large-file results as FileInfo dataclasses
+           versus the CompactFileStore used by the scanner. Each measurement
+           runs in its own interpreter so results don't leak into each other.
+  rules    Per-path cost of the deletion safety rules: the original per-call
+           list scan versus SafetyRules, one path at a time and in batches.
+           Permission probes are off so only rule evaluation is timed.
+  scan     Dry-run scans of synthetic trees generated from a seed in a temp
+           directory: deep/narrow, wide/flat, many tiny files, few huge
+           sparse files, symlink loops and permission-denied subtrees.
+           Records wall time, files/s, peak RSS and, where strace is
+           installed, syscalls per file (interpreter start-up subtracted via
+           a run over an empty tree). --baseline prints the change against
+           an earlier --json report. Permission-denied subtrees are readable
+           when run as root.
+  startup  Import and construction cost of the module as a library, each
+           in a fresh interpreter: median import and MacOSFileCleanup()
+           times, total process wall time against a bare interpreter, the
+           CLI's --help, which lazily imported modules got loaded anyway,
+           and whether construction left files in the working directory.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import py_compile
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+STORES = ('dataclass', 'compact')
+SHAPES = ('deep', 'wide', 'tiny', 'sparse', 'symlinks', 'denied')
+RESULT_PREFIX = "BENCH_RESULT "
+# Modules the cleanup module only imports on first use
+LAZY_MODULES = ('argparse', 'csv', 'ctypes', 'hashlib', 'json', 'mmap', 'select', 'sqlite3', 'struct',
+                'logging.handlers')
+# Run with ``python -c``: nothing but the module under test is imported
+# before the clock stops
+STARTUP_PROBE = '''
+import sys, time
+started = time.perf_counter()
+import macos_file_cleanup
+imported = time.perf_counter()
+macos_file_cleanup.MacOSFileCleanup(sys.argv[1], interactive=False, dry_run=True)
+constructed = time.perf_counter()
+loaded = sorted(set(sys.modules))
+import json
+print(%r + json.dumps({"import_seconds": imported - started, "construct_seconds": constructed - imported,
+                       "modules": loaded}))
+''' % RESULT_PREFIX
+
+
+def max_rss_bytes() -> int:
+    """Peak resident set size of this process in bytes."""
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def synthetic_rows(count: int):
+    """Yield (path, size, mtime) rows spread over ~50 files per directory."""
+    base = "/Volumes/Archive/projects"
+    now = time.time()
+    for i in range(count):
+        directory = f"{base}/client_{i // 5000:05d}/exports_{i // 50:07d}"
+        yield f"{directory}/render_{i:09d}.mov", 1_073_741_824 + i, now - i
+
+
+def measure_memory(store: str, count: int) -> Dict[str, Any]:
+    """Build ``count`` results in ``store`` layout inside this process."""
+    import macos_file_cleanup as cleanup_module
+
+    baseline = max_rss_bytes()
+    started = time.perf_counter()
+
+    if store == 'dataclass':
+        results = [cleanup_module.FileInfo(path=path, size=size, modified_time=mtime)
+                   for path, size, mtime in synthetic_rows(count)]
+    else:
+        results = cleanup_module.CompactFileStore()
+        for path, size, mtime in synthetic_rows(count):
+            results.append(path, size, mtime)
+
+    build_seconds = time.perf_counter() - started
+    peak = max_rss_bytes()
+
+    # Touch the API the cleanup tool relies on so views are exercised too
+    started = time.perf_counter()
+    largest = max(results, key=lambda f: f.size)
+    scan_seconds = time.perf_counter() - started
+    assert largest.path.endswith(f"render_{count - 1:09d}.mov")
+
+    return {
+        "store": store,
+        "entries": count,
+        "rss_delta_bytes": peak - baseline,
+        "bytes_per_entry": (peak - baseline) / count,
+        "build_seconds": build_seconds,
+        "full_scan_seconds": scan_seconds,
+    }
+
+
+def legacy_is_safe_to_delete(file_path: Path):
+    """The rule checks of the original is_safe_to_delete, minus the open() probe."""
+    path_str = str(file_path).lower()
+    critical_paths = [
+        '/system/', '/usr/bin/', '/usr/sbin/', '/bin/', '/sbin/',
+        '/library/application support/', '/library/frameworks/',
+        '/library/system/', '/private/var/db/', '/private/etc/',
+        '/applications/', '/library/preferences/'
+    ]
+    for critical_path in critical_paths:
+        if critical_path in path_str:
+            return False, f"File in critical system directory: {critical_path}"
+    system_extensions = {'.dylib', '.framework', '.kext', '.plist'}
+    if file_path.suffix.lower() in system_extensions:
+        return False, f"System file type: {file_path.suffix}"
+    if file_path.name.startswith('.'):
+        return False, "Hidden system file"
+    return True, "Safe to delete"
+
+
+def synthetic_paths(count: int) -> List[str]:
+    """Mixed user, build-cache and system paths."""
+    prefixes = [
+        "/Users/dev/Movies/exports", "/Users/dev/Developer/app/node_modules/pkg/dist",
+        "/Users/dev/Library/Developer/Xcode/DerivedData/App-abc/Build",
+        "/Library/Application Support/Vendor", "/Users/dev/Downloads",
+        "/Volumes/Archive/projects/client/renders", "/System/Library/Caches",
+    ]
+    names = ["render.mov", "bundle.js", "libfoo.dylib", ".DS_Store", "disk.dmg", "Info.plist"]
+    return [f"{prefixes[i % len(prefixes)]}/{i // 97}/{names[i % len(names)]}" for i in range(count)]
+
+
+def run_rules_benchmark(args) -> List[Dict[str, Any]]:
+    import macos_file_cleanup as cleanup_module
+
+    paths = synthetic_paths(args.paths)
+    rules = cleanup_module.SafetyRules(
+        deny_globs=["*/Photos Library.photoslibrary/*"],
+        allow_globs=["*/node_modules/*", "*/.next/*", "*/Library/Developer/Xcode/DerivedData/*"],
+    )
+
+    def legacy():
+        for path in paths:
+            legacy_is_safe_to_delete(Path(path))
+
+    def single():
+        for path in paths:
+            rules.evaluate(path, check_access=False)
+
+    def batched():
+        for start in range(0, len(paths), args.batch_size):
+            rules.evaluate_batch(paths[start:start + args.batch_size], check_access=False)
+
+    results = []
+    for name, fn in (("legacy", legacy), ("rules_single", single), ("rules_batch", batched)):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        result = {"variant": name, "paths": len(paths), "seconds": elapsed,
+                  "ns_per_path": elapsed / len(paths) * 1e9}
+        results.append(result)
+        print(f"⏱️  {name:<13} {result['ns_per_path']:>8,.0f} ns/path ({elapsed:.2f}s total)")
+    return results
+
+
+def _write_file(path: Path, size: int, sparse: bool = False):
+    with open(path, 'wb') as f:
+        if sparse:
+            f.truncate(size)
+        else:
+            f.write(b'x' * size)
+
+
+def generate_tree(root: Path, shape: str, files: int, seed: int) -> Dict[str, int]:
+    """
+    Build a reproducible synthetic tree of about ``files`` files under ``root``.
+
+    Returns:
+        Dict with the number of directories, files and symlinks created
+    """
+    rng = random.Random(f"{shape}:{files}:{seed}")
+    counts = {"directories": 0, "files": 0, "symlinks": 0}
+
+    def make_dir(path: Path):
+        path.mkdir(parents=True, exist_ok=True)
+        counts["directories"] += 1
+
+    def make_files(directory: Path, count: int, max_size: int, sparse: bool = False):
+        for i in range(count):
+            _write_file(directory / f"f{i:05d}.bin", rng.randint(0, max_size), sparse)
+        counts["files"] += count
+
+    if shape == 'deep':
+        # Chains 200 directories deep with 5 files per level
+        levels = max(1, files // 5)
+        for chain in range(0, levels, 200):
+            directory = root / f"chain{chain // 200:03d}"
+            for _ in range(min(200, levels - chain)):
+                make_dir(directory)
+                make_files(directory, 5, 4096)
+                directory = directory / "d"
+    elif shape == 'wide':
+        # A single level of directories holding up to 5,000 files each
+        for index in range(max(1, -(-files // 5000))):
+            directory = root / f"wide{index:04d}"
+            make_dir(directory)
+            make_files(directory, min(5000, files - index * 5000), 4096)
+    elif shape == 'tiny':
+        # Fan-out 10, three levels, files of at most 64 bytes
+        leaves = [root / f"a{a}" / f"b{b}" / f"c{c}" for a in range(10) for b in range(10) for c in range(10)]
+        per_leaf, extra = divmod(files, len(leaves))
+        for index, leaf in enumerate(leaves):
+            count = per_leaf + (1 if index < extra else 0)
+            if count:
+                make_dir(leaf)
+                make_files(leaf, count, 64)
+    elif shape == 'sparse':
+        # Few huge files with no allocated blocks
+        make_dir(root / "images")
+        for i in range(max(1, min(files, 50))):
+            _write_file(root / "images" / f"disk{i:03d}.img", rng.randint(1, 8) * 1024**3, sparse=True)
+            counts["files"] += 1
+    elif shape == 'symlinks':
+        # Directory links pointing back up the tree, dangling links and file links
+        for index in range(max(1, files // 100)):
+            directory = root / f"s{index // 10:03d}" / f"t{index % 10}"
+            make_dir(directory)
+            make_files(directory, 100, 4096)
+            for name, target in (("loop_up", ".."), ("loop_self", "."), ("loop_root", str(root)),
+                                 ("dangling", "missing/target"), ("file_link", "f00000.bin")):
+                os.symlink(target, directory / name)
+                counts["symlinks"] += 1
+    elif shape == 'denied':
+        # Every other subtree is unreadable (ignored when running as root)
+        for index in range(max(2, files // 100)):
+            directory = root / f"p{index:04d}"
+            make_dir(directory)
+            make_files(directory, 100, 4096)
+            if index % 2:
+                os.chmod(directory, 0)
+    else:
+        raise ValueError(f"Unknown shape: {shape}")
+    return counts
+
+
+def remove_tree(root: Path):
+    """rmtree that first restores permissions taken away by the 'denied' shape."""
+    for directory, subdirs, _ in os.walk(root):
+        for name in subdirs:
+            path = os.path.join(directory, name)
+            if not os.path.islink(path):
+                os.chmod(path, 0o755)
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def measure_scan(root: str, workers: int, size_gb: float) -> Dict[str, Any]:
+    """Dry-run scan of ``root`` inside this process."""
+    import logging
+    import macos_file_cleanup as cleanup_module
+
+    baseline = max_rss_bytes()
+    cleanup = cleanup_module.MacOSFileCleanup(root, min_size_gb=size_gb, interactive=False,
+                                              dry_run=True, workers=workers)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    matches = cleanup.scan_directory(Path(root))
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    started = time.perf_counter()
+    cleanup.check_safety_batch([f.path for f in matches])
+    safety_seconds = time.perf_counter() - started
+
+    stats = cleanup.stats
+    return {
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "files": stats.files_scanned,
+        "directories": stats.directories_scanned,
+        "matches": len(matches),
+        "errors": stats.errors_encountered,
+        "files_per_second": stats.files_scanned / wall if wall else 0.0,
+        "safety_check_seconds": safety_seconds,
+        "peak_rss_bytes": max_rss_bytes(),
+        "rss_delta_bytes": max_rss_bytes() - baseline,
+    }
+
+
+def strace_syscalls(output_path: Path) -> Dict[str, int]:
+    """Per-syscall call counts from an ``strace -c`` summary."""
+    calls: Dict[str, int] = {}
+    with open(output_path) as f:
+        for line in f:
+            parts = line.split()
+            if (len(parts) >= 5 and parts[-1] != 'total' and
+                    parts[0].replace('.', '', 1).isdigit() and parts[3].isdigit()):
+                calls[parts[-1]] = int(parts[3])
+    return calls
+
+
+def run_scan_once(root: Path, workers: int, size_gb: float, workdir: Path,
+                  strace: Optional[str]) -> Dict[str, Any]:
+    """One scan in a fresh interpreter, optionally under strace."""
+    command = [sys.executable, __file__, '_measure-scan', str(root), str(workers), str(size_gb)]
+    trace_path = workdir / "strace.txt"
+    if strace:
+        command = [strace, '-f', '-c', '-o', str(trace_path)] + command
+    # Anything the scan writes stays in the temp directory
+    proc = subprocess.run(command, capture_output=True, text=True, cwd=workdir)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError((proc.stderr.strip().splitlines() or ["scan failed"])[-1])
+
+    result = json.loads(lines[-1][len(RESULT_PREFIX):])
+    if strace:
+        result["syscalls"] = strace_syscalls(trace_path)
+    return result
+
+
+def run_scan_benchmark(args) -> List[Dict[str, Any]]:
+    strace = shutil.which('strace') if not args.no_strace else None
+    if strace is None and not args.no_strace:
+        print("ℹ️  strace not found; syscalls per file are not recorded")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="cleanup_bench_", dir=args.tmpdir) as tmp:
+        workdir = Path(tmp)
+        startup_calls = 0
+        if strace:
+            empty = workdir / "empty"
+            empty.mkdir()
+            startup = run_scan_once(empty, 1, args.size, workdir, strace)
+            startup_calls = sum(startup["syscalls"].values())
+
+        for shape in args.shapes:
+            root = workdir / shape
+            root.mkdir()
+            started = time.perf_counter()
+            tree = generate_tree(root, shape, args.files, args.seed)
+            generate_seconds = time.perf_counter() - started
+            try:
+                for workers in args.workers:
+                    print(f"⏱️  {shape:<9} {tree['files']:>9,} files, {workers:>2} worker(s) ...",
+                          end="", flush=True)
+                    try:
+                        runs = [run_scan_once(root, workers, args.size, workdir, strace)
+                                for _ in range(args.repeat)]
+                    except RuntimeError as e:
+                        print(" failed")
+                        results.append({"shape": shape, "workers": workers, "error": str(e)})
+                        continue
+
+                    best = min(runs, key=lambda r: r["wall_seconds"])
+                    result = {
+                        "shape": shape,
+                        "workers": workers,
+                        "seed": args.seed,
+                        "tree": tree,
+                        "generate_seconds": generate_seconds,
+                        "repeat": args.repeat,
+                        "median_wall_seconds": statistics.median(r["wall_seconds"] for r in runs),
+                        **best,
+                    }
+                    if strace:
+                        calls = result.pop("syscalls")
+                        scan_calls = max(0, sum(calls.values()) - startup_calls)
+                        result["syscalls"] = scan_calls
+                        result["syscalls_per_file"] = scan_calls / max(1, best["files"])
+                        result["top_syscalls"] = dict(sorted(calls.items(), key=lambda kv: -kv[1])[:8])
+                    results.append(result)
+
+                    line = (f" {result['files_per_second']:>10,.0f} files/s,"
+                            f" {result['median_wall_seconds']:.2f}s median,"
+                            f" {result['peak_rss_bytes'] / 1024**2:.1f} MB peak RSS")
+                    if "syscalls_per_file" in result:
+                        line += f", {result['syscalls_per_file']:.2f} syscalls/file"
+                    print(line)
+            finally:
+                remove_tree(root)
+    return results
+
+
+def timed_run(command: List[str], workdir: Path) -> Tuple[float, str]:
+    """Wall time of a fresh interpreter running ``command``, and its stdout."""
+    started = time.perf_counter()
+    proc = subprocess.run(command, capture_output=True, text=True, cwd=workdir)
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError((proc.stderr.strip().splitlines() or ["command failed"])[-1])
+    return wall, proc.stdout
+
+
+def run_startup_benchmark(args) -> List[Dict[str, Any]]:
+    # Time the import from bytecode, as an installed copy would run
+    module_path = REPO_ROOT / "macos_file_cleanup.py"
+    py_compile.compile(str(module_path), cfile=importlib.util.cache_from_source(str(module_path)),
+                       doraise=True)
+    env_path = os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get('PYTHONPATH')]))
+    os.environ['PYTHONPATH'] = env_path
+
+    imports, constructs, probe_walls, bare_walls, help_walls = [], [], [], [], []
+    modules: List[str] = []
+    with tempfile.TemporaryDirectory(prefix="cleanup_bench_") as tmp:
+        workdir = Path(tmp)
+        for _ in range(args.repeat):
+            bare_walls.append(timed_run([sys.executable, '-c', 'pass'], workdir)[0])
+            wall, stdout = timed_run([sys.executable, '-c', STARTUP_PROBE, str(workdir)], workdir)
+            result = json.loads([line for line in stdout.splitlines()
+                                 if line.startswith(RESULT_PREFIX)][-1][len(RESULT_PREFIX):])
+            probe_walls.append(wall)
+            imports.append(result["import_seconds"])
+            constructs.append(result["construct_seconds"])
+            modules = result["modules"]
+            help_walls.append(timed_run([sys.executable, str(module_path), '--help'], workdir)[0])
+        files_created = sorted(os.listdir(workdir))
+
+    result = {
+        "repeat": args.repeat,
+        "import_seconds": statistics.median(imports),
+        "construct_seconds": statistics.median(constructs),
+        "process_seconds": statistics.median(probe_walls),
+        "bare_interpreter_seconds": statistics.median(bare_walls),
+        "cli_help_seconds": statistics.median(help_walls),
+        "modules_loaded": len(modules),
+        "lazy_modules_loaded": [name for name in LAZY_MODULES if name in modules],
+        "files_created": files_created,
+    }
+    print(f"⏱️  import {result['import_seconds'] * 1000:.1f} ms, "
+          f"construct {result['construct_seconds'] * 1000:.2f} ms, "
+          f"process {result['process_seconds'] * 1000:.1f} ms "
+          f"(bare interpreter {result['bare_interpreter_seconds'] * 1000:.1f} ms), "
+          f"--help {result['cli_help_seconds'] * 1000:.1f} ms")
+    print(f"   {result['modules_loaded']} modules loaded; lazy modules imported anyway: "
+          f"{', '.join(result['lazy_modules_loaded']) or 'none'}")
+    if files_created:
+        print(f"⚠️  Construction left files behind: {', '.join(files_created)}")
+    return [result]
+
+
+def compare_to_baseline(results: List[Dict[str, Any]], baseline_path: str):
+    """Print the change in files/s (and syscalls/file) against an earlier scan report."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["shape"], r["workers"]): r for r in baseline.get("results", []) if "error" not in r}
+    print(f"\n📈 Compared with {baseline_path} ({baseline.get('revision') or 'unknown revision'}):")
+    for result in results:
+        before = previous.get((result["shape"], result.get("workers")))
+        if before is None or "error" in result:
+            continue
+        change = (result["files_per_second"] / before["files_per_second"] - 1) * 100 if before["files_per_second"] else 0.0
+        line = f"  {result['shape']:<9} {result['workers']:>2} worker(s): {change:+6.1f}% files/s"
+        if "syscalls_per_file" in result and "syscalls_per_file" in before:
+            line += f", syscalls/file {before['syscalls_per_file']:.2f} → {result['syscalls_per_file']:.2f}"
+        print(line)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        proc = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=REPO_ROOT)
+    except OSError:
+        return None
+    return proc.stdout.strip() or None
+
+
+def run_memory_benchmark(args) -> List[Dict[str, Any]]:
+    results = []
+    for count in args.entries:
+        for store in args.stores:
+            print(f"⏱️  {store:<10} {count:>12,} entries ...", end="", flush=True)
+            proc = subprocess.run(
+                [sys.executable, __file__, '_measure-memory', store, str(count)],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                print(" failed")
+                results.append({"store": store, "entries": count,
+                                "error": proc.stderr.strip().splitlines()[-1:]})
+                continue
+
+            result = json.loads(proc.stdout)
+            results.append(result)
+            print(f" {result['rss_delta_bytes'] / 1024**2:>9,.1f} MB"
+                  f" ({result['bytes_per_entry']:.0f} B/entry,"
+                  f" build {result['build_seconds']:.1f}s)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="macos_file_cleanup.py benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    memory = subparsers.add_parser('memory', help='Result storage memory benchmark')
+    memory.add_argument('--entries', type=int, nargs='+', default=[1_000_000, 10_000_000],
+                        help='Entry counts to measure (default: 1M and 10M)')
+    memory.add_argument('--stores', nargs='+', choices=STORES, default=list(STORES),
+                        help='Storage layouts to measure (default: all)')
+    memory.add_argument('--json', help='Write results to this JSON file')
+
+    rules = subparsers.add_parser('rules', help='Safety rule evaluation microbenchmark')
+    rules.add_argument('--paths', type=int, default=1_000_000,
+                       help='Number of synthetic paths (default: 1M)')
+    rules.add_argument('--batch-size', type=int, default=4096,
+                       help='Paths per evaluate_batch call (default: 4096)')
+    rules.add_argument('--json', help='Write results to this JSON file')
+
+    scan = subparsers.add_parser('scan', help='Dry-run scans of synthetic trees')
+    scan.add_argument('--shapes', nargs='+', choices=SHAPES, default=list(SHAPES),
+                      help='Tree shapes to generate (default: all)')
+    scan.add_argument('--files', type=int, default=50_000,
+                      help='Approximate files per tree; sparse trees cap at 50 (default: 50k)')
+    scan.add_argument('--workers', type=int, nargs='+', default=[1, 4],
+                      help='Scan worker counts to measure (default: 1 and 4)')
+    scan.add_argument('--size', type=float, default=0.000001,
+                      help='--size threshold in GB, small so matches are exercised (default: ~1 KB)')
+    scan.add_argument('--repeat', type=int, default=3,
+                      help='Scans per measurement; the fastest is reported (default: 3)')
+    scan.add_argument('--seed', type=int, default=1,
+                      help='Seed for the tree generator (default: 1)')
+    scan.add_argument('--tmpdir', help='Where to build the trees (default: system temp dir)')
+    scan.add_argument('--no-strace', action='store_true', help='Do not count syscalls')
+    scan.add_argument('--baseline', help='Earlier scan --json report to compare against')
+    scan.add_argument('--json', help='Write results to this JSON file')
+
+    startup = subparsers.add_parser('startup', help='Library import and construction time')
+    startup.add_argument('--repeat', type=int, default=20,
+                         help='Fresh interpreters per measurement; medians are reported (default: 20)')
+    startup.add_argument('--json', help='Write results to this JSON file')
+
+    # Internal: one measurement per interpreter
+    measure = subparsers.add_parser('_measure-memory')
+    measure.add_argument('store', choices=STORES)
+    measure.add_argument('count', type=int)
+
+    measure_scan_parser = subparsers.add_parser('_measure-scan')
+    measure_scan_parser.add_argument('root')
+    measure_scan_parser.add_argument('workers', type=int)
+    measure_scan_parser.add_argument('size', type=float)
+
+    args = parser.parse_args()
+
+    if args.command == '_measure-memory':
+        json.dump(measure_memory(args.store, args.count), sys.stdout)
+        return
+    if args.command == '_measure-scan':
+        result = measure_scan(args.root, args.workers, args.size)
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+        return
+
+    if args.command == 'memory':
+        results = run_memory_benchmark(args)
+    elif args.command == 'scan':
+        results = run_scan_benchmark(args)
+        if args.baseline:
+            compare_to_baseline(results, args.baseline)
+    elif args.command == 'startup':
+        results = run_startup_benchmark(args)
+    else:
+        results = run_rules_benchmark(args)
+    report = {
+        "benchmark": args.command,
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Results JSON: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Regression tests for duplicate detection in macos_file_cleanup.
+
+Run with: python -m unittest discover tests (or pytest tests)
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import macos_file_cleanup as cleanup_module  # noqa: E402
+
+
+class DuplicateFinderTest(unittest.TestCase):
+    """Symlinks and hard links must never be treated as independent copies."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, name: str, data: bytes, mtime: float = None) -> str:
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def find(self):
+        cleanup = cleanup_module.MacOSFileCleanup(self.root, min_size_gb=1e-9, interactive=False)
+        files = list(cleanup.iter_scan())
+        return cleanup, cleanup_module.DuplicateFinder(cleanup, workers=2).find(files)
+
+    def test_symlink_is_not_a_duplicate_of_its_target(self):
+        real = self.write('realfile.bin', os.urandom(60000))
+        os.symlink('realfile.bin', os.path.join(self.root, 'a.bin'))
+
+        cleanup, groups = self.find()
+        self.assertEqual(groups, [])
+        cleanup.delete_duplicates(groups)
+        self.assertTrue(os.path.isfile(real))
+
+    def test_symlink_is_dropped_from_a_real_duplicate_group(self):
+        data = os.urandom(60000)
+        original = self.write('realfile.bin', data, mtime=1_000_000_000)
+        copy = self.write('copy.bin', data)
+        os.symlink('realfile.bin', os.path.join(self.root, 'a.bin'))
+
+        cleanup, groups = self.find()
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(sorted(f.path for f in groups[0].files), sorted([copy, original]))
+        cleanup.delete_duplicates(groups)
+        self.assertTrue(os.path.isfile(original))
+        self.assertFalse(os.path.exists(copy))
+        self.assertEqual(os.path.realpath(os.path.join(self.root, 'a.bin')), os.path.realpath(original))
+
+    def test_hard_links_count_as_one_file(self):
+        data = os.urandom(60000)
+        original = self.write('realfile.bin', data)
+        os.link(original, os.path.join(self.root, 'link.bin'))
+
+        finder = cleanup_module.DuplicateFinder(cleanup_module.MacOSFileCleanup(self.root), workers=1)
+        files = [cleanup_module.FileInfo(path=os.path.join(self.root, name), size=len(data), modified_time=0.0)
+                 for name in ('realfile.bin', 'link.bin')]
+        self.assertEqual(finder.find(files), [])
+
+    def test_large_duplicates_are_hashed_in_full(self):
+        data = os.urandom(3 * 1024 * 1024)
+        self.write('a.bin', data)
+        self.write('b.bin', data)
+        self.write('c.bin', data[:-1] + bytes([data[-1] ^ 1]))
+
+        _, groups = self.find()
+        self.assertEqual([sorted(os.path.basename(f.path) for f in g.files) for g in groups], [['a.bin', 'b.bin']])
+
+    def test_group_is_skipped_when_keeper_is_no_longer_a_regular_file(self):
+        data = os.urandom(60000)
+        keeper = self.write('keeper.bin', data, mtime=1_000_000_000)
+        copy = self.write('copy.bin', data)
+
+        cleanup, groups = self.find()
+        self.assertEqual(groups[0].split_keeper()[0].path, keeper)
+        os.unlink(keeper)
+        os.symlink('copy.bin', keeper)
+        cleanup.delete_duplicates(groups)
+        self.assertTrue(os.path.isfile(copy))
+
+
+if __name__ == '__main__':
+    unittest.main()
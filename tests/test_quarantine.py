@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Regression tests for quarantine mode in macos_file_cleanup.
+
+Run with: python -m unittest discover tests (or pytest tests)
+"""
+
+import errno
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import macos_file_cleanup as cleanup_module  # noqa: E402
+
+
+class QuarantineTest(unittest.TestCase):
+    """Quarantined files must never overwrite each other and must restore to their own paths."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        home = os.path.join(self.root, 'home')
+        os.makedirs(home)
+        self._home = mock.patch.dict(os.environ, {'HOME': home})
+        self._home.start()
+        self.base = os.path.join(home, cleanup_module.Quarantine.DIRECTORY_NAME)
+
+    def tearDown(self):
+        self._home.stop()
+        self._tmp.cleanup()
+
+    def write(self, name: str, data: str) -> str:
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(data)
+        return path
+
+    def read(self, path: str) -> str:
+        with open(path) as f:
+            return f.read()
+
+    def stash(self, quarantine: 'cleanup_module.Quarantine', path: str) -> str:
+        return str(quarantine.stash(cleanup_module.FileInfo(path=path, size=os.path.getsize(path),
+                                                            modified_time=0.0)))
+
+    def test_two_runs_in_the_same_second_keep_separate_files(self):
+        first_path = self.write('a/x.log', 'first')
+        second_path = self.write('b/x.log', 'second')
+        first = cleanup_module.Quarantine(run_id='20250101_120000')
+        second = cleanup_module.Quarantine(run_id='20250101_120000')
+        first_staged = self.stash(first, first_path)
+        second_staged = self.stash(second, second_path)
+        first.close()
+        second.close()
+
+        self.assertNotEqual(os.path.dirname(first_staged), os.path.dirname(second_staged))
+        self.assertEqual(self.read(first_staged), 'first')
+        self.assertEqual(self.read(second_staged), 'second')
+        self.assertEqual(cleanup_module.Quarantine.restore(self.base), (2, 0))
+        self.assertEqual(self.read(first_path), 'first')
+        self.assertEqual(self.read(second_path), 'second')
+
+    def test_move_never_replaces_the_target(self):
+        source = self.write('source', 'source')
+        target = self.write('target', 'target')
+        with self.assertRaises(FileExistsError):
+            cleanup_module.Quarantine.move_no_replace(source, target)
+        self.assertEqual(self.read(source), 'source')
+        self.assertEqual(self.read(target), 'target')
+
+    def test_move_without_hard_link_support(self):
+        source = self.write('source', 'source')
+        target = self.write('target', 'target')
+        no_links = OSError(errno.EPERM, "Operation not permitted")
+        with mock.patch.object(cleanup_module.os, 'link', side_effect=no_links):
+            with self.assertRaises(FileExistsError):
+                cleanup_module.Quarantine.move_no_replace(source, target)
+            free = os.path.join(self.root, 'free')
+            cleanup_module.Quarantine.move_no_replace(source, free)
+        self.assertEqual(self.read(free), 'source')
+        self.assertFalse(os.path.exists(source))
+        self.assertEqual(self.read(target), 'target')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the compiled deletion safety rules in macos_file_cleanup.
+
+Run with: python -m unittest discover tests (or pytest tests)
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import macos_file_cleanup as cleanup_module  # noqa: E402
+
+
+class SafetyRulesBatchTest(unittest.TestCase):
+    """evaluate_batch() must decide every path exactly as evaluate() does on its own."""
+
+    SEGMENTS = ('tmp', 'secret', 'Secret', 'cache', 'a b', 'x', '.hidden', 'System', 'Library',
+                'data.plist', 'movie.mov', 'lib.dylib', '', ' ', '-')
+
+    def random_paths(self, count: int, seed: int = 7):
+        rng = random.Random(seed)
+        paths = []
+        for _ in range(count):
+            parts = [rng.choice(self.SEGMENTS) for _ in range(rng.randint(1, 5))]
+            tail = rng.choice(('', ' ', '/', ' /secret', 'secret '))
+            paths.append('/' + '/'.join(parts) + tail)
+        return paths
+
+    def assert_batch_matches_single(self, rules: 'cleanup_module.SafetyRules', paths):
+        batch = rules.evaluate_batch(paths, check_access=False)
+        single = [rules.evaluate(path, check_access=False) for path in paths]
+        mismatches = [(path, b, s) for path, b, s in zip(paths, batch, single) if b != s]
+        self.assertEqual(mismatches[:5], [], f"{len(mismatches)} of {len(paths)} paths differ")
+
+    def test_regexes_that_can_match_the_joining_newline(self):
+        rules = cleanup_module.SafetyRules(deny_regex=[r'\s*/secret', r'[^a-z]*secret', r'\W+tmp'],
+                                           allow_regex=[r'\s+cache$', r'[^/]*\n?x'])
+        self.assert_batch_matches_single(rules, self.random_paths(5000))
+
+    def test_globs_and_anchored_regexes(self):
+        rules = cleanup_module.SafetyRules(deny_globs=['*/tmp/*', '/Library/*', '*.mov'],
+                                           deny_regex=[r'^/secret', r'cache$'],
+                                           allow_globs=['*/x'], allow_regex=[r'/a b/'])
+        self.assert_batch_matches_single(rules, self.random_paths(5000, seed=11))
+
+    def test_spanning_match_does_not_hide_the_next_path(self):
+        rules = cleanup_module.SafetyRules(deny_regex=[r'\s*/secret'])
+        self.assertEqual(rules.evaluate_batch(['/data/a', '/secret/b'], check_access=False),
+                         [(True, "Safe to delete"), (False, r"Denied by rule: \s*/secret")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the incremental scan index in macos_file_cleanup.
+
+Run with: python -m unittest discover tests (or pytest tests)
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import macos_file_cleanup as cleanup_module  # noqa: E402
+
+
+class ScanIndexTest(unittest.TestCase):
+    """A scan served from the index must report the same totals as a full listing."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self._tmp.name, 'tree')
+        self.index_path = os.path.join(self._tmp.name, 'index.db')
+        for name in ('a', 'b', 'c'):
+            os.makedirs(os.path.join(self.root, name))
+        self.write('a/small.txt', 1000)
+        os.link(self.path('a/small.txt'), self.path('b/small-link.txt'))
+        self.write('a/big.bin', 50000)
+        os.link(self.path('a/big.bin'), self.path('c/big-link.bin'))
+        self.write('b/mid.bin', 30000)
+        os.link(self.path('b/mid.bin'), self.path('c/mid-link.bin'))
+        # Directories changed just before a scan are never served from the index
+        for directory, _, _ in os.walk(self.root):
+            os.utime(directory, (1_000_000_000, 1_000_000_000))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def write(self, name: str, size: int):
+        with open(self.path(name), 'wb') as f:
+            f.write(os.urandom(size))
+
+    def scan(self, min_size: int, **kwargs):
+        cleanup = cleanup_module.MacOSFileCleanup(self.root, min_size_gb=min_size / (1024 ** 3), **kwargs)
+        matches = sorted(os.path.basename(f.path) for f in cleanup.iter_scan())
+        stats = cleanup.stats
+        return (stats.files_scanned, stats.bytes_scanned, stats.allocated_bytes,
+                stats.hard_links_skipped, matches), stats.directories_from_cache
+
+    def test_cached_directories_count_hard_links_once(self):
+        full, _ = self.scan(20000)
+        self.scan(20000, incremental=True, index_path=self.index_path)
+        cached, from_cache = self.scan(20000, incremental=True, index_path=self.index_path)
+        self.assertEqual(from_cache, 4)
+        self.assertEqual(cached, full)
+
+    def test_cached_directories_with_a_higher_threshold(self):
+        self.scan(20000, incremental=True, index_path=self.index_path)
+        cached, from_cache = self.scan(40000, incremental=True, index_path=self.index_path)
+        full, _ = self.scan(40000)
+        self.assertEqual(from_cache, 4)
+        self.assertEqual(cached, full)
+
+
+if __name__ == '__main__':
+    unittest.main()